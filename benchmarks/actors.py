@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import logging
+from collections import deque
+from queue import Empty
+
+import numpy as np
+
+from improv.actor import Actor
+from improv.store import RedisStoreInterface
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class Source(Actor):
+    """Puts n_items payloads of payload_bytes random bytes into the store
+    and sends their keys, with the time they were sent, to its targets.
+
+    On a frames link the payload itself goes into the link's frame buffer
+    instead, with the time it was sent in its first 8 bytes.
+    """
+
+    def __init__(
+        self,
+        *args,
+        payload_bytes=1024,
+        n_items=1000,
+        rate=0,
+        consumers=1,
+        window=16,
+        **kwargs,
+    ):
+        """
+        Args:
+            payload_bytes (int): size of each item
+            n_items (int): number of items to send
+            rate (float): items per second, 0 to send as fast as the
+                targets take them
+            consumers (int): number of targets, each releasing every item
+            window (int): most items in a Redis store not yet released
+        """
+        super().__init__(*args, **kwargs)
+        self.payload_bytes = int(payload_bytes)
+        self.n_items = int(n_items)
+        self.rate = rate
+        self.consumers = consumers
+        self.window = window
+        self.sent = 0
+
+    def setup(self):
+        rng = np.random.default_rng(0)
+        self.payload = rng.integers(0, 255, size=self.payload_bytes, dtype=np.uint8)
+        self.frames = hasattr(self.q_out, "frames")
+        self.sent = 0
+        self.started = None
+        self.outstanding = deque()
+        self.redis = isinstance(self.client, RedisStoreInterface)
+
+    def runStep(self):
+        if self.sent >= self.n_items:
+            time.sleep(0.01)
+            return
+        if self.started is None:
+            self.started = time.perf_counter()
+        if self.rate:
+            wait = self.started + self.sent / self.rate - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+
+        if self.frames:
+            frame = self.q_out.frames.claim()
+            frame[:] = self.payload
+            frame[:8].view(np.float64)[0] = time.time()
+            self.q_out.put(self.q_out.frames.publish())
+        else:
+            if self.store_full():
+                time.sleep(0.0005)
+                return
+            key = self.client.put(self.payload, consumers=self.consumers)
+            if key is None:
+                # the store is full until the targets catch up
+                time.sleep(0.001)
+                return
+            if self.redis:
+                self.outstanding.append(key)
+            self.q_out.put((key, time.time()))
+        self.sent += 1
+
+    def store_full(self):
+        """Whether window items are still waiting to be released.
+
+        Only for Redis: its put logs an error and carries on when Redis is
+        out of memory, while the shm store's put returns None.
+        """
+        if not self.redis or len(self.outstanding) < self.window:
+            return False
+        while self.outstanding and not self.client.client.exists(self.outstanding[0]):
+            self.outstanding.popleft()
+        return len(self.outstanding) >= self.window
+
+
+class Sink(Actor):
+    """Gets n_items items from a Source and writes the latency of each,
+    from being sent to being read back from the store, to results.
+    """
+
+    def __init__(self, *args, n_items=1000, results=None, **kwargs):
+        """
+        Args:
+            n_items (int): number of items to wait for
+            results (str): JSON file to write once they have all come
+        """
+        super().__init__(*args, **kwargs)
+        self.n_items = int(n_items)
+        self.results = results
+
+    def setup(self):
+        self.frames = hasattr(self.q_in, "frames")
+        self.latencies = []
+        self.first = None
+        self.last = None
+        self.nbytes = 0
+
+    def runStep(self):
+        if len(self.latencies) >= self.n_items:
+            time.sleep(0.01)
+            return
+        try:
+            item = self.q_in.get(timeout=0.05)
+        except Empty:
+            return
+
+        if self.frames:
+            data = self.q_in.frames.read(item)
+            sent = data[:8].view(np.float64)[0]
+        else:
+            key, sent = item
+            data = self.client.get(key)
+        now = time.time()
+        if not self.frames:
+            self.client.release(key)
+
+        self.latencies.append(now - sent)
+        self.nbytes += data.nbytes
+        if self.first is None:
+            self.first = now
+        self.last = now
+        if len(self.latencies) == self.n_items:
+            self.report()
+
+    def report(self):
+        """Write the latencies and timing of the items received"""
+        # write then rename, so the file only appears once complete
+        with open(self.results + ".tmp", "w") as f:
+            json.dump(
+                {
+                    "name": self.name,
+                    "items": len(self.latencies),
+                    "bytes": self.nbytes,
+                    "first": self.first,
+                    "last": self.last,
+                    "latencies": self.latencies,
+                },
+                f,
+            )
+        os.replace(self.results + ".tmp", self.results)
+        logger.info("{} received {} items".format(self.name, len(self.latencies)))
@@ -0,0 +1,169 @@
+"""Store benchmarks: latency of Redis calls over TCP and over a Unix
+domain socket.
+
+One redis-server is started listening on both a port and a Unix socket,
+as Nexus starts it, and for every payload size one client put and then
+gets payloads through each. Results are written as JSON:
+
+    python -m benchmarks.connection --sizes 0 1K 64K 1M -o connection.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from benchmarks.durability import default_items, start_redis
+from benchmarks.run import free_port, metadata, parse_size
+from improv.store import RedisStoreInterface
+
+TRANSPORTS = ("tcp", "unix")
+SIZES = ("0", "1K", "64K", "1M")
+# room for what the server uses itself, besides the payloads
+MIN_MAXMEMORY = 64 * 1024 * 1024
+
+
+def measure(store, payload, n_items):
+    """Time n_items puts of a payload, then a get of each
+
+    Returns:
+        dict: put and get latencies and throughput
+    """
+    puts = np.empty(n_items)
+    gets = np.empty(n_items)
+    keys = []
+    for i in range(n_items):
+        t = time.perf_counter()
+        keys.append(store.put(payload))
+        puts[i] = time.perf_counter() - t
+    for i, key in enumerate(keys):
+        t = time.perf_counter()
+        store.get(key)
+        gets[i] = time.perf_counter() - t
+    store.delete(keys)
+    return {
+        "put_p50": float(np.percentile(puts, 50)),
+        "put_p99": float(np.percentile(puts, 99)),
+        "get_p50": float(np.percentile(gets, 50)),
+        "get_p99": float(np.percentile(gets, 99)),
+        "ops_per_second": 2 * n_items / (puts.sum() + gets.sum()),
+    }
+
+
+def run(sizes, n_items=None, transports=TRANSPORTS):
+    """Measure every transport at every size against one server
+
+    Args:
+        sizes (list): payload sizes in bytes
+        n_items (int): puts per case; by default 128 MB worth
+        transports (list): which of TRANSPORTS to measure
+
+    Returns:
+        list: a dict per case with its results, or the error that
+        stopped it
+    """
+    workdir = tempfile.mkdtemp(prefix="improv_connection_")
+    path = os.path.join(workdir, "redis.sock")
+    port = free_port()
+    items = {size: n_items or default_items(max(size, 1)) for size in sizes}
+    p = start_redis(
+        "none",
+        port,
+        workdir,
+        maxmemory=MIN_MAXMEMORY
+        + max(4 * n * (size + 1024) for size, n in items.items()),
+        options=["--unixsocket", path, "--unixsocketperm", "700"],
+    )
+    results = []
+    try:
+        stores = {
+            "tcp": RedisStoreInterface(server_port_num=port),
+            "unix": RedisStoreInterface(server_port_num=port, unix_socket_path=path),
+        }
+        for size in sizes:
+            payload = np.random.randint(0, 255, size, dtype=np.uint8)
+            for transport in transports:
+                result = {"transport": transport, "size": size, "items": items[size]}
+                try:
+                    result.update(
+                        status="ok", **measure(stores[transport], payload, items[size])
+                    )
+                except Exception as e:
+                    result.update(status="error", error=str(e))
+                print(_format(result), flush=True)
+                results.append(result)
+    finally:
+        p.terminate()
+        try:
+            p.wait(10)
+        except subprocess.TimeoutExpired:
+            p.kill()
+            p.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def speedup(results):
+    """Latency over TCP divided by latency over the Unix socket, for each
+    size, to show what the socket saves"""
+    tcp = {
+        r["size"]: r for r in results if r["transport"] == "tcp" and r["status"] == "ok"
+    }
+    for r in results:
+        base = tcp.get(r["size"])
+        if r["transport"] == "unix" and r["status"] == "ok" and base:
+            r["put_p50_speedup"] = base["put_p50"] / r["put_p50"]
+            r["get_p50_speedup"] = base["get_p50"] / r["get_p50"]
+    return results
+
+
+ROW = "{}  put p50 {:7.1f} us  p99 {:7.1f} us  get p50 {:7.1f} us  p99 {:7.1f} us"
+
+
+def _format(result):
+    case = "{transport:>5} {size:>9}".format(**result)
+    if result["status"] != "ok":
+        return "{}  {}".format(case, result["error"])
+    return ROW.format(
+        case,
+        1e6 * result["put_p50"],
+        1e6 * result["put_p99"],
+        1e6 * result["get_p50"],
+        1e6 * result["get_p99"],
+    )
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Measure Redis call latency over TCP and a Unix socket"
+    )
+    parser.add_argument(
+        "--transports", nargs="+", default=list(TRANSPORTS), choices=TRANSPORTS
+    )
+    parser.add_argument(
+        "--sizes", nargs="+", default=SIZES, help="payload sizes, e.g. 0 1K 64K 1M"
+    )
+    parser.add_argument(
+        "--items", type=int, help="puts per case; by default 128 MB worth"
+    )
+    parser.add_argument("-o", "--output", default="connection_results.json")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    results = run([parse_size(s) for s in args.sizes], args.items, args.transports)
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": speedup(results)}, f, indent=2)
+    print("Wrote results to {}".format(args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Store benchmarks: latency and throughput of puts to a local Redis
+server under each durability mode a pipeline can run with.
+
+For every mode and payload size, a fresh redis-server is started the way
+Nexus starts it, and one client puts payloads as fast as it can. In the
+snapshot mode, a fraction of the payloads are put with persisted keys and
+a snapshot of them is taken every --snapshot-interval seconds on another
+thread, as Nexus does. Results are written as JSON:
+
+    python -m benchmarks.durability --sizes 64K 1M -o durability.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+
+import numpy as np
+from redis import Redis
+from redis.exceptions import RedisError
+
+from benchmarks.run import free_port, metadata, parse_size
+from improv.store import PERSIST_PREFIX, RedisStoreInterface
+
+# name of each mode, and the redis-server options it adds
+MODES = {
+    "none": [],
+    "snapshot": [],
+    "aof-no": ["--appendonly", "yes", "--appendfsync", "no"],
+    "aof-everysec": ["--appendonly", "yes", "--appendfsync", "everysec"],
+    "aof-always": ["--appendonly", "yes", "--appendfsync", "always"],
+}
+SIZES = ("1K", "64K", "1M")
+
+# how much data a case puts, unless --items is given
+BYTES_PER_CASE = 128 * 1024 * 1024
+MIN_ITEMS = 100
+MAX_ITEMS = 5000
+
+START_TIMEOUT = 10.0  # seconds
+
+
+def default_items(payload_bytes):
+    return int(np.clip(BYTES_PER_CASE // payload_bytes, MIN_ITEMS, MAX_ITEMS))
+
+
+def start_redis(mode, port, workdir, maxmemory, options=()):
+    """Start redis-server for a mode, with its files in workdir
+
+    Args:
+        options (list): more redis-server options
+    """
+    command = (
+        [
+            "redis-server",
+            "--port",
+            str(port),
+            "--dir",
+            workdir,
+            "--maxmemory",
+            str(maxmemory),
+            "--save",
+            '""',
+        ]
+        + MODES[mode]
+        + list(options)
+    )
+    p = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = Redis(port=port)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            client.ping()
+            return p
+        except RedisError:
+            if p.poll() is not None:
+                break
+            time.sleep(0.01)
+    p.kill()
+    raise RuntimeError("redis-server did not start for mode {}".format(mode))
+
+
+def run_case(mode, size, n_items, persist_fraction=0.1, snapshot_interval=1.0):
+    """Put n_items payloads of size bytes under a durability mode
+
+    Returns:
+        dict: the case and its results, or the error that stopped it
+    """
+    result = {"mode": mode, "size": size, "items": n_items}
+    workdir = tempfile.mkdtemp(prefix="improv_durability_")
+    p = None
+    try:
+        port = free_port()
+        p = start_redis(mode, port, workdir, maxmemory=4 * n_items * (size + 1024))
+        store = RedisStoreInterface(server_port_num=port)
+        payload = np.random.randint(0, 255, size, dtype=np.uint8)
+        persist_every = round(1 / persist_fraction) if persist_fraction else 0
+
+        stop = threading.Event()
+        snapshots = []
+
+        def take_snapshots():
+            snapshot_store = RedisStoreInterface(server_port_num=port)
+            filename = os.path.join(workdir, "snapshot.pkl")
+            while not stop.wait(snapshot_interval):
+                t = time.perf_counter()
+                snapshot_store.snapshot(filename, [PERSIST_PREFIX])
+                snapshots.append(time.perf_counter() - t)
+
+        snapshotter = None
+        if mode == "snapshot":
+            snapshotter = threading.Thread(target=take_snapshots, daemon=True)
+            snapshotter.start()
+
+        latencies = np.empty(n_items)
+        start = time.perf_counter()
+        for i in range(n_items):
+            persist = mode == "snapshot" and bool(persist_every)
+            persist = persist and i % persist_every == 0
+            t = time.perf_counter()
+            store.put(payload, persist=persist)
+            latencies[i] = time.perf_counter() - t
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        if snapshotter is not None:
+            snapshotter.join()
+        result.update(
+            status="ok",
+            put_p50=float(np.percentile(latencies, 50)),
+            put_p99=float(np.percentile(latencies, 99)),
+            put_max=float(latencies.max()),
+            throughput=n_items / elapsed,
+            bytes_per_second=n_items * size / elapsed,
+            snapshots=len(snapshots),
+            snapshot_seconds=float(np.mean(snapshots)) if snapshots else None,
+        )
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    finally:
+        if p is not None:
+            # not kill, so redis-server stops any AOF rewrite it started
+            p.terminate()
+            try:
+                p.wait(START_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                p.kill()
+                p.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def relative(results):
+    """Throughput of each case as a fraction of the same size with no
+    durability, to show what each mode costs"""
+    base = {
+        r["size"]: r["throughput"]
+        for r in results
+        if r["mode"] == "none" and r["status"] == "ok"
+    }
+    for r in results:
+        if r["status"] == "ok" and base.get(r["size"]):
+            r["relative_throughput"] = r["throughput"] / base[r["size"]]
+    return results
+
+
+def _format(result):
+    case = "{mode:>12} {size:>9}".format(**result)
+    if result["status"] != "ok":
+        return "{}  {}".format(case, result["error"])
+    return "{}  p50 {:8.3f} ms  p99 {:8.3f} ms  {:9.1f} puts/s  {:7.1f} MB/s".format(
+        case,
+        1000 * result["put_p50"],
+        1000 * result["put_p99"],
+        result["throughput"],
+        result["bytes_per_second"] / 1024**2,
+    )
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Measure Redis put latency and throughput by durability mode"
+    )
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument(
+        "--sizes", nargs="+", default=SIZES, help="payload sizes, e.g. 1K 64K 1M"
+    )
+    parser.add_argument(
+        "--items", type=int, help="puts per case; by default 128 MB worth"
+    )
+    parser.add_argument(
+        "--persist-fraction",
+        type=float,
+        default=0.1,
+        help="fraction of puts with persisted keys in the snapshot mode",
+    )
+    parser.add_argument(
+        "--snapshot-interval",
+        type=float,
+        default=1.0,
+        help="seconds between snapshots in the snapshot mode",
+    )
+    parser.add_argument("-o", "--output", default="durability_results.json")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    results = []
+    for size in args.sizes:
+        size = parse_size(size)
+        for mode in args.modes:
+            result = run_case(
+                mode,
+                size,
+                args.items or default_items(size),
+                persist_fraction=args.persist_fraction,
+                snapshot_interval=args.snapshot_interval,
+            )
+            print(_format(result), flush=True)
+            results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": relative(results)}, f, indent=2)
+    print("Wrote results to {}".format(args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,438 @@
+"""Pipeline benchmarks: latency, throughput and CPU of a Source actor
+sending payloads to one or more Sink actors, for every combination of
+store, link type, payload size and fan-out asked for.
+
+Each case runs in its own improv server. Results are written as JSON,
+and can be compared against an earlier results file:
+
+    python -m benchmarks.run --output new.json --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import itertools
+import subprocess
+import tempfile
+
+import numpy as np
+import psutil
+import yaml
+import zmq
+
+import improv
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+STORES = ("redis", "shm")
+LINK_TYPES = ("manager", "shm", "zmq", "frames")
+SIZES = ("1K", "64K", "1M", "16M")
+FANOUTS = (1, 4)
+
+# most items waiting on a link, so the store never holds more than a few
+LINK_MAXSIZE = 8
+# how much data a case sends, unless --items is given
+BYTES_PER_CASE = 256 * 1024 * 1024
+MIN_ITEMS = 100
+MAX_ITEMS = 2000
+
+SETUP_TIMEOUT = 60.0  # seconds
+QUIT_TIMEOUT = 30.0  # seconds
+
+# metrics compared by --compare, and whether bigger is better
+COMPARED = {
+    "latency_p50": False,
+    "latency_p99": False,
+    "throughput": True,
+    "cpu_seconds": False,
+}
+
+
+def parse_size(size):
+    """Bytes in a size such as 512, 64K or 16M"""
+    units = {"K": 1024, "M": 1024**2, "G": 1024**3}
+    size = str(size).strip().upper().rstrip("B")
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+def default_items(payload_bytes):
+    return int(np.clip(BYTES_PER_CASE // payload_bytes, MIN_ITEMS, MAX_ITEMS))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_config(case, workdir, n_items, rate=0):
+    """Pipeline config for a case, as a dict
+
+    Args:
+        case (dict): store, link, size (bytes) and fanout
+        workdir (str): where the sinks write their results
+        n_items (int): items to send
+        rate (float): items per second, 0 for as fast as possible
+    """
+    size = case["size"]
+    sinks = ["Sink{}".format(i) for i in range(case["fanout"])]
+    actors = {
+        "Source": {
+            "package": "benchmarks.actors",
+            "class": "Source",
+            "payload_bytes": size,
+            "n_items": n_items,
+            "rate": rate,
+            "consumers": len(sinks),
+            "window": 2 * LINK_MAXSIZE,
+        }
+    }
+    for name in sinks:
+        actors[name] = {
+            "package": "benchmarks.actors",
+            "class": "Sink",
+            "n_items": n_items,
+            "results": os.path.join(workdir, name + ".json"),
+        }
+
+    link_type = case["link"]
+    if link_type == "shm" and len(sinks) > 1:
+        link_type = "broadcast"
+    connection = {
+        "targets": [name + ".q_in" for name in sinks],
+        "type": link_type,
+        "maxsize": LINK_MAXSIZE,
+    }
+    if link_type in ("shm", "broadcast"):
+        connection["capacity"] = max(8 * 1024**2, 2 * LINK_MAXSIZE * (size + 1024))
+    elif link_type == "frames":
+        connection.update(shape=[size], dtype="uint8", slots=4 * LINK_MAXSIZE)
+
+    config = {
+        "settings": {
+            # twice what the source's window holds
+            "store_size": max(64 * 1024**2, 4 * LINK_MAXSIZE * size),
+            "metrics_file": os.path.join(workdir, "metrics.json"),
+        },
+        "actors": actors,
+        "connections": {"Source.q_out": connection},
+    }
+    if case["store"] == "shm":
+        config["shm_config"] = {"n_slots": 1024}
+    return config
+
+
+def _request(socket, msg, timeout):
+    socket.send_string(msg)
+    if not socket.poll(timeout * 1000):
+        raise TimeoutError("No reply from the server to {}".format(msg))
+    return socket.recv_string()
+
+
+def _wait_for(predicate, timeout, interval=0.1):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def _cpu_seconds(proc):
+    """CPU time used so far by a process and all its children"""
+    total = 0.0
+    for p in [proc] + proc.children(recursive=True):
+        try:
+            times = p.cpu_times()
+            total += times.user + times.system
+        except psutil.NoSuchProcess:
+            pass
+    return total
+
+
+def summarize(sinks, cpu_seconds, wall_seconds):
+    """Latency percentiles (in seconds), throughput and CPU use of a case
+
+    Args:
+        sinks (list): the results each Sink wrote
+        cpu_seconds (float): CPU time used by the server and its actors
+            while the items were sent
+        wall_seconds (float): how long that took
+    """
+    latencies = np.concatenate([s["latencies"] for s in sinks])
+    first = min(s["first"] for s in sinks)
+    last = max(s["last"] for s in sinks)
+    items = min(s["items"] for s in sinks)
+    elapsed = last - first
+    return {
+        "items": items,
+        "latency_p50": float(np.percentile(latencies, 50)),
+        "latency_p90": float(np.percentile(latencies, 90)),
+        "latency_p99": float(np.percentile(latencies, 99)),
+        "latency_max": float(latencies.max()),
+        "throughput": (items - 1) / elapsed if elapsed > 0 else None,
+        "bytes_per_second": (
+            sum(s["bytes"] for s in sinks) / elapsed if elapsed > 0 else None
+        ),
+        "cpu_seconds": cpu_seconds,
+        "cpu_percent": 100 * cpu_seconds / wall_seconds if wall_seconds else None,
+    }
+
+
+def run_case(case, n_items=None, rate=0, timeout=300.0, keep=False):
+    """Run one case in its own server and measure it
+
+    Args:
+        case (dict): store, link, size (bytes) and fanout
+        n_items (int): items to send; by default enough for BYTES_PER_CASE
+        rate (float): items per second, 0 for as fast as possible
+        timeout (float): seconds to wait for the sinks to get every item
+        keep (bool): leave the case's config, log and results on disk
+
+    Returns:
+        dict: the case and its results, or the error that stopped it
+    """
+    n_items = n_items or default_items(case["size"])
+    workdir = tempfile.mkdtemp(prefix="improv_bench_")
+    config_file = os.path.join(workdir, "bench.yaml")
+    logfile = os.path.join(workdir, "server.log")
+    with open(config_file, "w") as f:
+        yaml.safe_dump(make_config(case, workdir, n_items, rate), f)
+
+    control_port, output_port, logging_port = free_port(), free_port(), free_port()
+    server = subprocess.Popen(
+        [
+            "improv",
+            "server",
+            "-c",
+            str(control_port),
+            "-o",
+            str(output_port),
+            "-l",
+            str(logging_port),
+            "-f",
+            logfile,
+            "-a",
+            REPO_DIR,
+            config_file,
+        ],
+        cwd=workdir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    proc = psutil.Process(server.pid)
+    ctx = zmq.Context()
+    control = ctx.socket(zmq.REQ)
+    control.setsockopt(zmq.LINGER, 0)
+    control.connect("tcp://127.0.0.1:{}".format(control_port))
+
+    def logged(text):
+        if not os.path.exists(logfile):
+            return False
+        with open(logfile) as f:
+            return text in f.read()
+
+    sink_files = [
+        os.path.join(workdir, "Sink{}.json".format(i)) for i in range(case["fanout"])
+    ]
+    result = dict(case, n_items=n_items, rate=rate)
+    try:
+        _request(control, "setup", SETUP_TIMEOUT)
+        if not _wait_for(lambda: logged("Allowing start"), SETUP_TIMEOUT):
+            raise TimeoutError("Actors were not ready in time")
+
+        cpu = _cpu_seconds(proc)
+        t = time.perf_counter()
+        _request(control, "run", SETUP_TIMEOUT)
+        if not _wait_for(lambda: all(map(os.path.exists, sink_files)), timeout):
+            raise TimeoutError("Sinks did not get every item in time")
+        wall = time.perf_counter() - t
+        cpu = _cpu_seconds(proc) - cpu
+
+        sinks = []
+        for path in sink_files:
+            with open(path) as f:
+                sinks.append(json.load(f))
+        result.update(summarize(sinks, cpu, wall))
+        result["status"] = "ok"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    finally:
+        try:
+            _request(control, "quit", 5)
+        except Exception:
+            pass
+        try:
+            server.wait(QUIT_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            for p in proc.children(recursive=True):
+                p.kill()
+            server.kill()
+            server.wait()
+        control.close()
+        ctx.term()
+
+    metrics_file = os.path.join(workdir, "metrics.json")
+    if os.path.exists(metrics_file):
+        with open(metrics_file) as f:
+            counters = json.load(f)["summary"]["counters"]
+        result["dropped"] = sum(
+            n for name, n in counters.items() if name.endswith(".dropped")
+        )
+    if keep:
+        result["workdir"] = workdir
+    else:
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+    return result
+
+
+def cases(stores=STORES, links=LINK_TYPES, sizes=SIZES, fanouts=FANOUTS):
+    """Every combination of the given parameters, as dicts
+
+    zmq links are only run with the Redis store, since the point of them
+    is to reach other machines, where the shm store is not available.
+    """
+    for store, link, size, fanout in itertools.product(stores, links, sizes, fanouts):
+        if link == "zmq" and store != "redis":
+            continue
+        yield {"store": store, "link": link, "size": parse_size(size), "fanout": fanout}
+
+
+def metadata():
+    """Where and when the benchmarks ran"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "improv": getattr(improv, "__version__", None),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _key(result):
+    return (result["store"], result["link"], result["size"], result["fanout"])
+
+
+def compare(baseline, results, tolerance=0.2):
+    """Find the cases that got worse than in a baseline
+
+    Args:
+        baseline (list): results from an earlier run
+        results (list): results from this run
+        tolerance (float): relative change to accept, e.g. 0.2 for 20%
+
+    Returns:
+        list: (case, metric, old value, new value) for every metric that
+        is more than tolerance worse
+    """
+    old = {_key(r): r for r in baseline if r.get("status") == "ok"}
+    regressions = []
+    for r in results:
+        if r.get("status") != "ok" or _key(r) not in old:
+            continue
+        for metric, higher_is_better in COMPARED.items():
+            before, after = old[_key(r)].get(metric), r.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append((_key(r), metric, before, after))
+    return regressions
+
+
+def _format(result):
+    case = "{store:>5} {link:>8} {size:>9} x{fanout}".format(**result)
+    if result["status"] != "ok":
+        return "{}  {}".format(case, result["error"])
+    return (
+        "{}  p50 {:8.3f} ms  p99 {:8.3f} ms  {:9.1f} items/s  "
+        "{:7.1f} MB/s  cpu {:5.0f}%".format(
+            case,
+            1000 * result["latency_p50"],
+            1000 * result["latency_p99"],
+            result["throughput"] or 0,
+            (result["bytes_per_second"] or 0) / 1024**2,
+            result["cpu_percent"] or 0,
+        )
+    )
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description="Measure latency, throughput and CPU use of improv pipelines"
+    )
+    parser.add_argument("--stores", nargs="+", default=STORES, choices=STORES)
+    parser.add_argument("--links", nargs="+", default=LINK_TYPES, choices=LINK_TYPES)
+    parser.add_argument(
+        "--sizes", nargs="+", default=SIZES, help="payload sizes, e.g. 1K 64K 16M"
+    )
+    parser.add_argument("--fanouts", nargs="+", type=int, default=FANOUTS)
+    parser.add_argument(
+        "--items", type=int, help="items per case; by default 256 MB worth"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=0, help="items per second; 0 for no limit"
+    )
+    parser.add_argument("-o", "--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="results file to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative change that counts as a regression",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="keep each case's config and logs"
+    )
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    args = parse_args(args)
+    results = []
+    for case in cases(args.stores, args.links, args.sizes, args.fanouts):
+        result = run_case(case, n_items=args.items, rate=args.rate, keep=args.keep)
+        print(_format(result), flush=True)
+        results.append(result)
+
+    with open(args.output, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+    print("Wrote results to {}".format(args.output))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(baseline, results, args.tolerance)
+        for case, metric, before, after in regressions:
+            print(
+                "Regression in {} {}: {:.4g} -> {:.4g}".format(
+                    case, metric, before, after
+                )
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
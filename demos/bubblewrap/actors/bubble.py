@@ -75,16 +75,17 @@ class Bubble(Actor):
 
     def putOutput(self):
         """Function for putting updated results into the store"""
-        ids = []
-        ids.append(self.client.put(np.array(self.bw.A), "A" + str(self.frame_number)))
-        ids.append(self.client.put(np.array(self.bw.L), "L" + str(self.frame_number)))
-        ids.append(self.client.put(np.array(self.bw.mu), "mu" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.n_obs), "n_obs" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.pred), "pred" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.entropy_list), "entropy" + str(self.frame_number)))
-        ids.append(self.client.put(
-                    np.array(self.bw.dead_nodes), "dead_nodes" + str(self.frame_number)))
+        outputs = {
+            "A": self.bw.A,
+            "L": self.bw.L,
+            "mu": self.bw.mu,
+            "n_obs": self.bw.n_obs,
+            "pred": self.bw.pred,
+            "entropy": self.bw.entropy_list,
+            "dead_nodes": self.bw.dead_nodes,
+        }
+        ids = self.client.put_many(
+            [np.array(v) for v in outputs.values()],
+            [name + str(self.frame_number) for name in outputs],
+        )
         self.q_out.put([self.frame_number, ids])
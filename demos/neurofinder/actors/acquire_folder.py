@@ -8,6 +8,7 @@ import random
 from pathlib import Path
 from skimage.io import imread
 from improv.actor import Actor, Spike, RunManager
+from improv.readers import FolderReader, Prefetcher
 from queue import Empty
 
 import logging
@@ -40,16 +41,22 @@ class FolderAcquirer(Actor):
         pass
 
     def saveImgs(self):
-        self.imgs = []
-        files = {f for f in self.path.iterdir() if f.suffix in [".tif", ".tiff"]}
-        files = sorted(list(files))
-        for file in files:
-            img = self.get_tiff(file)
-            self.imgs.append(img)
-        self.imgs = np.array(self.imgs)
-        f = h5py.File("output/sample.h5", "w", libver="latest")
-        f.create_dataset("default", data=self.imgs)
-        f.close()
+        """Copy every TIFF in the folder into output/sample.h5, a frame at
+        a time, so memory use does not grow with the recording"""
+        with Prefetcher(FolderReader(self.path)) as frames:
+            with h5py.File("output/sample.h5", "w", libver="latest") as f:
+                dset = None
+                for i, img in enumerate(frames):
+                    if dset is None:
+                        dset = f.create_dataset(
+                            "default",
+                            shape=(0,) + img.shape,
+                            maxshape=(None,) + img.shape,
+                            dtype=img.dtype,
+                            chunks=(1,) + img.shape,
+                        )
+                    dset.resize(i + 1, axis=0)
+                    dset[i] = img
 
     def run(self):
         """Triggered at Run
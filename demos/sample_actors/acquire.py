@@ -1,11 +1,12 @@
 import time
 import os
-import h5py
 import random
+from itertools import chain, repeat
+
 import numpy as np
-from skimage.io import imread
 
 from improv.actor import Actor
+from improv.readers import Prefetcher, TiffReader, open_reader
 
 import logging
 
@@ -23,7 +24,8 @@ class FileAcquirer(Actor):
     def __init__(self, *args, filename=None, framerate=30, **kwargs):
         super().__init__(*args, **kwargs)
         self.frame_num = 0
-        self.data = None
+        self.reader = None
+        self.frames = None
         self.done = False
         self.flag = False
         self.filename = filename
@@ -32,19 +34,17 @@ class FileAcquirer(Actor):
     def setup(self):
         """Get file names from config or user input
          Also get specified framerate, or default is 10 Hz
-        Open file stream
-        #TODO: implement more than h5 files
+        Open file stream (HDF5 or TIFF), which is read ahead in the
+        background rather than loaded whole
         """
-        if os.path.exists(self.filename):
-            n, ext = os.path.splitext(self.filename)[:2]
-            if ext == ".h5" or ext == ".hdf5":
-                with h5py.File(self.filename, "r") as file:
-                    keys = list(file.keys())
-                    self.data = file[keys[0]][()]
-
-        else:
+        if not os.path.exists(self.filename):
             raise FileNotFoundError
 
+        self.reader = open_reader(self.filename)
+        self.n_frames = len(self.reader) * 5
+        # replay the file five times
+        self.frames = Prefetcher(chain.from_iterable(repeat(self.reader, 5)))
+
         self.total_times = []
         self.timestamp = []
 
@@ -72,17 +72,23 @@ class FileAcquirer(Actor):
 
         if self.done:
             pass
-        elif self.frame_num < len(self.data) * 5:
-            frame = self.getFrame(self.frame_num % len(self.data))
+        elif self.frame_num < self.n_frames:
+            frame = self.getFrame(self.frame_num)
             ## simulate frame-dropping
             # if self.frame_num > 1500 and self.frame_num < 1800:
             #     frame = None
             t = time.time()
-            id = self.client.put(frame, "acq_raw" + str(self.frame_num))
-            t1 = time.time()
+            # a frames link copies the frame into its shared buffer and
+            # sends only where it is, so it skips the store
+            frames = hasattr(self.q_out, "frames")
+            if not frames:
+                id = self.client.put(frame, "acq_raw" + str(self.frame_num))
             self.timestamp.append([time.time(), self.frame_num])
             try:
-                self.put([[id, str(self.frame_num)]], save=[True])
+                if frames:
+                    self.q_out.put(frame)
+                else:
+                    self.put([[id, str(self.frame_num)]], save=[True])
                 self.frame_num += 1
                 # also log to disk #TODO: spawn separate process here?
             except Exception as e:
@@ -93,15 +99,17 @@ class FileAcquirer(Actor):
 
         else:  # simulating a done signal from the source (eg, camera)
             logger.error("Done with all available frames: {0}".format(self.frame_num))
-            self.data = None
+            self.frames.close()
+            self.reader.close()
             self.q_comm.put(None)
             self.done = True  # stay awake in case we get e.g. a shutdown signal
             # if self.saving:
             #    self.f.close()
 
     def getFrame(self, num):
-        """Here just return frame from loaded data"""
-        return self.data[num, :, :]
+        """Here just return the next frame from the file; frames are
+        read in order, so this is frame num"""
+        return next(self.frames)
 
     def saveFrame(self, frame):
         """Save each frame via h5 dset"""
@@ -233,14 +241,13 @@ class TiffAcquirer(Actor):
         self.t_per_frame = list()
 
     def setup(self):
-        self.imgs = imread(self.filename)
-        print(self.imgs.shape)
+        # stream the pages instead of loading the whole file
+        self.imgs = Prefetcher(TiffReader(self.filename))
+        print(self.imgs.frames.shape)
 
     def runStep(self):
         t0 = time.time()
-        id_store = self.client.put(
-            self.imgs[self.n_frame], "acq_raw" + str(self.n_frame)
-        )
+        id_store = self.client.put(next(self.imgs), "acq_raw" + str(self.n_frame))
         self.q_out.put([[id_store, str(self.n_frame)]])
         self.n_frame += 1
 
@@ -177,40 +177,17 @@ class MeanAnalysis(Actor):
     def putAnalysis(self):
         """Throw things to DS and put IDs in queue for Visual"""
         t = time.time()
-        ids = []
-        ids.append(
-            [self.client.put(self.Cx, "Cx" + str(self.frame)), "Cx" + str(self.frame)]
-        )
-        ids.append(
-            [
-                self.client.put(self.Call, "Call" + str(self.frame)),
-                "Call" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.Cpop, "Cpop" + str(self.frame)),
-                "Cpop" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.tune, "tune" + str(self.frame)),
-                "tune" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.color, "color" + str(self.frame)),
-                "color" + str(self.frame),
-            ]
-        )
-        ids.append(
-            [
-                self.client.put(self.coordDict, "analys_coords" + str(self.frame)),
-                "analys_coords" + str(self.frame),
-            ]
-        )
+        outputs = {
+            "Cx" + str(self.frame): self.Cx,
+            "Call" + str(self.frame): self.Call,
+            "Cpop" + str(self.frame): self.Cpop,
+            "tune" + str(self.frame): self.tune,
+            "color" + str(self.frame): self.color,
+            "analys_coords" + str(self.frame): self.coordDict,
+        }
+        # one round trip to the store for all outputs of this frame
+        keys = self.client.put_dict(outputs)
+        ids = [[keys[name], name] for name in outputs]
         ids.append([self.frame, str(self.frame)])
 
         self.put(ids, save=[False, False, False, False, False, True, False])
@@ -76,6 +76,40 @@ class CaimanProcessor(Actor):
         self.timestamp = []
         self.counter = 0
 
+    # what setup creates and runStep updates; see get_state
+    STATE = (
+        "params",
+        "opts",
+        "onAc",
+        "max_shifts_online",
+        "frame_number",
+        "dropped_frames",
+        "coords",
+        "ests",
+        "A",
+        "counter",
+        "total_times",
+        "timestamp",
+        "fitframe_time",
+        "putAnalysis_time",
+        "procFrame_time",
+    )
+
+    def get_state(self):
+        """The OnACID model and progress so far, so that a restarted
+        processor need not initialize OnACID again
+        """
+        return {name: getattr(self, name) for name in self.STATE}
+
+    def set_state(self, state):
+        logger.info("Restoring {} at frame {}".format(self.name, state["frame_number"]))
+        self.__dict__.update(state)
+        self.done = False
+        self.saving = True
+        self.flag = False
+        self.detect_time = []
+        self.shape_time = []
+
     def stop(self):
         print(
             "Processor broke, avg time per frame: ", np.mean(self.total_times, axis=0)
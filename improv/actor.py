@@ -1,17 +1,30 @@
+import os
 import time
+import pickle
 import signal
 import asyncio
+import functools
 import traceback
 from queue import Empty
 
 import improv.store
 from improv.store import StoreInterface
+from improv.metrics import registry
+from improv.journal import COMM_LINKS, JournalWriter, RecordingStore
 
 import logging
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# while running, how often run managers check q_sig for new signals
+SIGNAL_INTERVAL = 0.01  # seconds
+# while not running, how long run managers block on q_sig at a time
+IDLE_TIMEOUT = 1.0  # seconds
+# while running, how often run managers save the state of actors that
+# have a checkpoint_file and whose get_state returns something
+CHECKPOINT_INTERVAL = 60.0  # seconds
+
 
 class AbstractActor:
     """Base class for an actor that Nexus
@@ -34,6 +47,21 @@ class AbstractActor:
         self.store_loc = store_loc
         self.lower_priority = False
         self.store_port_num = store_port_num
+        # where the Redis store is, for actors on other machines
+        self.store_hostname = "localhost"
+        # the Redis server's Unix socket, used if it is on this machine
+        self.store_socket = None
+        # the Redis server's password, if it requires one
+        self.store_password = None
+        self.signal_interval = kwargs.get("signal_interval", SIGNAL_INTERVAL)
+        # where checkpoint() saves the actor's state; set by Nexus
+        self.checkpoint_file = None
+        self.checkpoint_interval = kwargs.get(
+            "checkpoint_interval", CHECKPOINT_INTERVAL
+        )
+        # where startJournal records what the actor receives; set by Nexus
+        self.journal_file = None
+        self.journal = None
 
         # Start with no explicit data queues.
         # q_in and q_out are reserved for passing ID information
@@ -61,8 +89,18 @@ class AbstractActor:
         # TODO: Where do we require this be run? Add a Signal and include in RM?
         if not self.client:
             store = None
-            if StoreInterface == improv.store.RedisStoreInterface:
-                store = StoreInterface(self.name, self.store_port_num)
+            if self.store_loc and self.store_loc.startswith(
+                improv.store.SHM_STORE_PREFIX
+            ):
+                store = improv.store.ShmStoreInterface(self.name, self.store_loc)
+            elif StoreInterface == improv.store.RedisStoreInterface:
+                store = StoreInterface(
+                    self.name,
+                    self.store_port_num,
+                    self.store_hostname,
+                    unix_socket_path=self.store_socket,
+                    password=self.store_password,
+                )
             else:
                 store = StoreInterface(self.name, self.store_loc)
             self.setStoreInterface(store)
@@ -174,6 +212,86 @@ class AbstractActor:
         """
         pass
 
+    def get_state(self):
+        """State to restore the actor from if its process is restarted
+
+        Override this, together with set_state, to skip setup when the
+        actor is restarted (e.g. after a crash): while running, the
+        returned object is pickled to checkpoint_file every
+        checkpoint_interval seconds, as well as on stop.
+
+        Returns:
+            picklable object, or None (the default) not to checkpoint
+        """
+        return None
+
+    def set_state(self, state):
+        """Restore the actor from a state returned by get_state
+
+        Called in a restarted process in place of setup, so it must
+        leave the actor ready to run, e.g. by reconnecting to devices.
+
+        Args:
+            state: as returned by get_state
+        """
+        pass
+
+    def checkpoint(self):
+        """Save the actor's state to checkpoint_file, if it has both
+
+        The file is replaced in one step, so a crash while saving leaves
+        the previous checkpoint in place.
+
+        Returns:
+            bool: whether a checkpoint was saved
+        """
+        if not self.checkpoint_file:
+            return False
+        state = self.get_state()
+        if state is None:
+            return False
+        with registry.timer("actor.{}.checkpoint".format(self.name)):
+            with open(self.checkpoint_file + ".tmp", "wb") as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(self.checkpoint_file + ".tmp", self.checkpoint_file)
+        return True
+
+    def restore(self):
+        """Restore the actor from its last checkpoint, if there is one
+
+        Returns:
+            bool: whether set_state was called; if not, the actor still
+            needs to be set up
+        """
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return False
+        with open(self.checkpoint_file, "rb") as f:
+            state = pickle.load(f)
+        self.set_state(state)
+        logger.info("Restored {} from {}".format(self.name, self.checkpoint_file))
+        return True
+
+    def startJournal(self):
+        """Record the messages this actor receives on its links, and the
+        objects it gets from the store, to journal_file, if it has one
+
+        See improv.journal; a Nexus can replay the journal to the actor
+        later without the rest of the pipeline.
+        """
+        if not self.journal_file:
+            return
+        self.journal = JournalWriter(self.journal_file)
+        for key, link in self.links.items():
+            if key not in COMM_LINKS and str(link.end).split(".")[0] == self.name:
+                link.journal = functools.partial(self.journal.message, key)
+        if self.client is not None:
+            self.client = RecordingStore(self.client, self.journal)
+
+    def stopJournal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+
     def changePriority(self):
         """Try to lower this process' priority
         Only changes priority if lower_priority is set
@@ -198,10 +316,22 @@ class ManagedActor(AbstractActor):
         self.actions["setup"] = self.setup
         self.actions["run"] = self.runStep
         self.actions["stop"] = self.stop
+        self.actions["checkpoint"] = self.checkpoint
+        self.actions["restore"] = self.restore
 
     def run(self):
-        with RunManager(self.name, self.actions, self.links):
-            pass
+        self.startJournal()
+        try:
+            with RunManager(
+                self.name,
+                self.actions,
+                self.links,
+                signal_interval=self.signal_interval,
+                checkpoint_interval=self.checkpoint_interval,
+            ):
+                pass
+        finally:
+            self.stopJournal()
 
     def runStep(self):
         raise NotImplementedError
@@ -216,14 +346,67 @@ class AsyncActor(AbstractActor):
         self.actions["setup"] = self.setup
         self.actions["run"] = self.runStep
         self.actions["stop"] = self.stop
+        self.actions["checkpoint"] = self.checkpoint
+        self.actions["restore"] = self.restore
+
+        # awaitable interface to the store, made on first use
+        self._async_client = None
 
     def run(self):
         """Run the actor in an async loop"""
-        result = asyncio.run(
-            AsyncRunManager(self.name, self.actions, self.links).run_actor()
-        )
+        self.startJournal()
+        try:
+            result = asyncio.run(self._run())
+        finally:
+            self.stopJournal()
         return result
 
+    async def _run(self):
+        try:
+            return await AsyncRunManager(
+                self.name,
+                self.actions,
+                self.links,
+                signal_interval=self.signal_interval,
+                checkpoint_interval=self.checkpoint_interval,
+            ).run_actor()
+        finally:
+            if self._async_client is not None:
+                await self._async_client.close()
+                self._async_client = None
+
+    @property
+    def async_client(self):
+        """The actor's awaitable store interface, see
+        createAsyncStoreInterface
+
+        It is made the first time it is used, so actors that connect to
+        the store in setup, as those in a process of their own do, get
+        one too. None while the actor has no client.
+        """
+        if self._async_client is None:
+            self._async_client = self.createAsyncStoreInterface()
+        return self._async_client
+
+    def createAsyncStoreInterface(self):
+        """An interface to the actor's store whose calls are awaited, so
+        the event loop keeps running other tasks while they wait
+
+        For a Redis store, it is an AsyncRedisStoreInterface, with a pool
+        of connections of its own; for any other store, or a client that
+        records or replays what the actor gets, calls go to the client
+        on a thread.
+
+        Returns:
+            improv.store.AsyncRedisStoreInterface or
+            improv.store.AsyncStoreAdapter: None if the actor has no client
+        """
+        if self.client is None:
+            return None
+        if isinstance(self.client, improv.store.RedisStoreInterface):
+            return improv.store.AsyncRedisStoreInterface.from_interface(self.client)
+        return improv.store.AsyncStoreAdapter(self.client)
+
     async def setup(self):
         """Essenitally the registration process
         Can also be an initialization for the actor
@@ -242,11 +425,66 @@ class AsyncActor(AbstractActor):
 Actor = ManagedActor
 
 
-class RunManager:
-    def __init__(self, name, actions, links, runStoreInterface=None, timeout=1e-6):
+class _SignalHandler:
+    """The run state of RunManager and AsyncRunManager, and how signals
+    from Nexus change it"""
+
+    def handleSignal(self, signal):
+        """Update the run state for a signal from Nexus
+
+        Returns:
+            bool: False once the actor should quit
+        """
+        logger.debug("{} received Signal {}".format(self.actorName, signal))
+        if signal == Signal.run():
+            self.run = True
+            logger.warning("Received run signal, begin running")
+        elif signal == Signal.setup():
+            self.config = True
+        elif signal == Signal.restore():
+            self.restore = True
+        elif signal == Signal.stop():
+            self.run = False
+            self.stop = True
+            logger.warning(f"actor {self.actorName} received stop signal")
+        elif signal == Signal.quit():
+            logger.warning("Received quit signal, aborting")
+            report_metrics(self.q_comm)
+            return False
+        elif signal == Signal.pause():
+            logger.warning("Received pause signal, pending...")
+            self.run = False
+        elif signal == Signal.resume():  # currently treat as same as run
+            logger.warning("Received resume signal, resuming")
+            self.run = True
+        return True
+
+
+class RunManager(_SignalHandler):
+    """
+    Runs an actor's actions in response to signals from Nexus on q_sig.
+
+    While running, the run action is called back to back and q_sig is
+    checked every signal_interval seconds. Otherwise the manager blocks
+    on q_sig, so an idle or paused actor uses no CPU.
+    """
+
+    def __init__(
+        self,
+        name,
+        actions,
+        links,
+        runStoreInterface=None,
+        timeout=1e-6,
+        metrics_interval=1.0,
+        signal_interval=SIGNAL_INTERVAL,
+        idle_timeout=IDLE_TIMEOUT,
+        checkpoint_interval=CHECKPOINT_INTERVAL,
+    ):
         self.run = False
         self.stop = False
         self.config = False
+        self.restore = False
 
         self.actorName = name
         logger.debug("RunManager for {} created".format(self.actorName))
@@ -258,16 +496,25 @@ class RunManager:
 
         self.runStoreInterface = runStoreInterface
         self.timeout = timeout
+        self.metrics_interval = metrics_interval
+        self.signal_interval = signal_interval
+        self.idle_timeout = idle_timeout
+        self.checkpoint_interval = checkpoint_interval
 
     def __enter__(self):
         self.start = time.time()
         an = self.actorName
+        # forked actors inherit whatever Nexus recorded before the fork
+        registry.reset()
+        last_report = last_checkpoint = time.perf_counter()
+        last_signal_check = 0.0
 
         while True:
             # Run any actions given a received Signal
             if self.run:
                 try:
-                    self.actions["run"]()
+                    with registry.timer("actor.{}.runStep".format(an)):
+                        self.actions["run"]()
                 except Exception as e:
                     logger.error("Actor {} error in run: {}".format(an, e))
                     logger.error(traceback.format_exc())
@@ -277,40 +524,41 @@ class RunManager:
                 except Exception as e:
                     logger.error("Actor {} error in stop: {}".format(an, e))
                     logger.error(traceback.format_exc())
+                checkpoint(an, self.actions)
                 self.stop = False  # Run once
-            elif self.config:
+            elif self.config or self.restore:
                 try:
                     if self.runStoreInterface:
                         self.runStoreInterface()
-                    self.actions["setup"]()
+                    if not (self.restore and restore(an, self.actions)):
+                        self.actions["setup"]()
                     self.q_comm.put([Signal.ready()])
                 except Exception as e:
                     logger.error("Actor {} error in setup: {}".format(an, e))
                     logger.error(traceback.format_exc())
-                self.config = False
-
-            # Check for new Signals received from Nexus
+                self.config = self.restore = False
+
+            now = time.perf_counter()
+            if self.run and now - last_checkpoint >= self.checkpoint_interval:
+                last_checkpoint = now
+                checkpoint(an, self.actions)
+            if now - last_report >= self.metrics_interval:
+                last_report = now
+                report_metrics(self.q_comm)
+
+            # Check for new Signals received from Nexus: at most every
+            # signal_interval while running, otherwise wait for one
+            if self.run:
+                if now - last_signal_check < self.signal_interval:
+                    continue
+                last_signal_check = now
+                timeout = self.timeout
+            else:
+                timeout = self.idle_timeout
             try:
-                signal = self.q_sig.get(timeout=self.timeout)
-                logger.debug("{} received Signal {}".format(self.actorName, signal))
-                if signal == Signal.run():
-                    self.run = True
-                    logger.warning("Received run signal, begin running")
-                elif signal == Signal.setup():
-                    self.config = True
-                elif signal == Signal.stop():
-                    self.run = False
-                    self.stop = True
-                    logger.warning(f"actor {self.actorName} received stop signal")
-                elif signal == Signal.quit():
-                    logger.warning("Received quit signal, aborting")
+                signal = self.q_sig.get(timeout=timeout)
+                if not self.handleSignal(signal):
                     break
-                elif signal == Signal.pause():
-                    logger.warning("Received pause signal, pending...")
-                    self.run = False
-                elif signal == Signal.resume():  # currently treat as same as run
-                    logger.warning("Received resume signal, resuming")
-                    self.run = True
             except KeyboardInterrupt:
                 break
             except Empty:
@@ -324,17 +572,31 @@ class RunManager:
         return None
 
 
-class AsyncRunManager:
+class AsyncRunManager(_SignalHandler):
     """
     Asynchronous run manager. Communicates with nexus core using q_sig and q_comm.
     To be used with [async with]
     Afterwards, the run manager listens for signals without blocking.
+    As with RunManager, q_sig is checked every signal_interval seconds while
+    running, and waited on otherwise.
     """
 
-    def __init__(self, name, actions, links, runStore=None, timeout=1e-6):
+    def __init__(
+        self,
+        name,
+        actions,
+        links,
+        runStore=None,
+        timeout=1e-6,
+        metrics_interval=1.0,
+        signal_interval=SIGNAL_INTERVAL,
+        idle_timeout=IDLE_TIMEOUT,
+        checkpoint_interval=CHECKPOINT_INTERVAL,
+    ):
         self.run = False
         self.config = False
         self.stop = False
+        self.restore = False
         self.actorName = name
         logger.debug("AsyncRunManager for {} created".format(self.actorName))
         self.actions = actions
@@ -345,6 +607,10 @@ class AsyncRunManager:
 
         self.runStore = runStore
         self.timeout = timeout
+        self.metrics_interval = metrics_interval
+        self.signal_interval = signal_interval
+        self.idle_timeout = idle_timeout
+        self.checkpoint_interval = checkpoint_interval
 
         self.loop = asyncio.get_event_loop()
         self.start = time.time()
@@ -355,11 +621,15 @@ class AsyncRunManager:
 
     async def run_actor(self):
         an = self.actorName
+        registry.reset()
+        last_report = last_checkpoint = time.perf_counter()
+        last_signal_check = 0.0
         while True:
             # Run any actions given a received Signal
             if self.run:
                 try:
-                    await self.actions["run"]()
+                    with registry.timer("actor.{}.runStep".format(an)):
+                        await self.actions["run"]()
                 except Exception as e:
                     logger.error("Actor {} error in run: {}".format(an, e))
                     logger.error(traceback.format_exc())
@@ -369,43 +639,56 @@ class AsyncRunManager:
                 except Exception as e:
                     logger.error("Actor {} error in stop: {}".format(an, e))
                     logger.error(traceback.format_exc())
+                checkpoint(an, self.actions)
                 self.stop = False  # Run once
-            elif self.config:
+            elif self.config or self.restore:
                 try:
                     if self.runStore:
                         self.runStore()
-                    await self.actions["setup"]()
+                    if not (self.restore and restore(an, self.actions)):
+                        await self.actions["setup"]()
                     self.q_comm.put([Signal.ready()])
                 except Exception as e:
                     logger.error("Actor {} error in setup: {}".format(an, e))
                     logger.error(traceback.format_exc())
-                self.config = False
-
-            # Check for new Signals received from Nexus
+                self.config = self.restore = False
+
+            now = time.perf_counter()
+            if self.run and now - last_checkpoint >= self.checkpoint_interval:
+                last_checkpoint = now
+                checkpoint(an, self.actions)
+            if now - last_report >= self.metrics_interval:
+                last_report = now
+                report_metrics(self.q_comm)
+
+            # Check for new Signals received from Nexus: at most every
+            # signal_interval while running, otherwise wait for one on the
+            # event loop so other tasks keep running
             try:
-                signal = self.q_sig.get(timeout=self.timeout)
-                logger.debug("{} received Signal {}".format(self.actorName, signal))
-                if signal == Signal.run():
-                    self.run = True
-                    logger.warning("Received run signal, begin running")
-                elif signal == Signal.setup():
-                    self.config = True
-                elif signal == Signal.stop():
-                    self.run = False
-                    self.stop = True
-                    logger.warning(f"actor {self.actorName} received stop signal")
-                elif signal == Signal.quit():
-                    logger.warning("Received quit signal, aborting")
+                if self.run:
+                    if now - last_signal_check < self.signal_interval:
+                        await asyncio.sleep(0)
+                        continue
+                    last_signal_check = now
+                    signal = self.q_sig.get(timeout=self.timeout)
+                elif getattr(self.q_sig, "selectable", False):
+                    # waits on the link's file descriptor, so a wait that
+                    # times out leaves no thread behind
+                    signal = await asyncio.wait_for(
+                        self.q_sig.get_async(), self.idle_timeout
+                    )
+                    if signal is None:  # get_async returns None if cancelled
+                        raise Empty
+                else:
+                    signal = await asyncio.get_running_loop().run_in_executor(
+                        None,
+                        functools.partial(self.q_sig.get, timeout=self.idle_timeout),
+                    )
+                if not self.handleSignal(signal):
                     break
-                elif signal == Signal.pause():
-                    logger.warning("Received pause signal, pending...")
-                    self.run = False
-                elif signal == Signal.resume():  # currently treat as same as run
-                    logger.warning("Received resume signal, resuming")
-                    self.run = True
             except KeyboardInterrupt:
                 break
-            except Empty:
+            except (Empty, asyncio.TimeoutError):
                 pass  # No signal from Nexus
 
         return None
@@ -420,6 +703,46 @@ class AsyncRunManager:
         return None
 
 
+def checkpoint(name, actions):
+    """Run an actor's checkpoint action, if it has one, logging errors"""
+    if "checkpoint" not in actions:
+        return
+    try:
+        actions["checkpoint"]()
+    except Exception as e:
+        logger.error("Actor {} error in checkpoint: {}".format(name, e))
+        logger.error(traceback.format_exc())
+
+
+def restore(name, actions):
+    """Run an actor's restore action, if it has one
+
+    Returns:
+        bool: whether the actor was restored; if not, including when
+        restoring fails, it should be set up instead
+    """
+    if "restore" not in actions:
+        return False
+    try:
+        return actions["restore"]()
+    except Exception as e:
+        logger.error("Actor {} error in restore: {}".format(name, e))
+        logger.error(traceback.format_exc())
+        return False
+
+
+def report_metrics(q_comm):
+    """Send what this process recorded in improv.metrics since the last
+    report to Nexus, if anything.
+    """
+    if registry.empty():
+        return
+    try:
+        q_comm.put([Signal.metrics(), registry.snapshot(reset=True)])
+    except Exception as e:
+        logger.warning("Could not send metrics: {}".format(e))
+
+
 class Signal:
     """Class containing definition of signals Nexus uses
     to communicate with its actors
@@ -454,6 +777,10 @@ class Signal:
     def setup():
         return "setup"
 
+    @staticmethod
+    def restore():
+        return "restore"
+
     @staticmethod
     def ready():
         return "ready"
@@ -473,3 +800,11 @@ class Signal:
     @staticmethod
     def stop_success():
         return "stop success"
+
+    @staticmethod
+    def metrics():
+        return "metrics"
+
+    @staticmethod
+    def register():
+        return "register"
@@ -3,6 +3,7 @@ import os.path
 import re
 import argparse
 import signal
+import socket
 import subprocess
 import sys
 import psutil
@@ -12,6 +13,7 @@ from zmq import SocketOption
 from zmq.log.handlers import PUBHandler
 from improv.tui import TUI
 from improv.nexus import Nexus
+from improv.worker import Worker
 
 MAX_PORT = 2**16 - 1
 DEFAULT_CONTROL_PORT = "0"
@@ -181,6 +183,53 @@ def parse_cli_args(args):
     )
     server_parser.set_defaults(func=run_server)
 
+    worker_parser = subparsers.add_parser(
+        "worker", description="Start a worker that runs actors for a server"
+    )
+    worker_parser.add_argument(
+        "-c",
+        "--control-port",
+        type=is_valid_ip_addr,
+        default=DEFAULT_CONTROL_PORT,
+        help="address on which the server receives control signals",
+    )
+    worker_parser.add_argument(
+        "-n",
+        "--name",
+        default=socket.gethostname(),
+        help="name that actors' host option refers to; defaults to the hostname",
+    )
+    worker_parser.add_argument(
+        "--hostname",
+        default="127.0.0.1",
+        help="address at which the server can reach this machine",
+    )
+    worker_parser.add_argument(
+        "-p",
+        "--port",
+        type=is_valid_port,
+        default=0,
+        help="local port on which requests from the server are received",
+    )
+    worker_parser.add_argument(
+        "--token",
+        default=os.environ.get("IMPROV_WORKER_TOKEN"),
+        help="the server's settings: worker_token; defaults to the "
+        "IMPROV_WORKER_TOKEN environment variable",
+    )
+    worker_parser.add_argument(
+        "-f", "--logfile", default="worker.log", help="name of log file"
+    )
+    worker_parser.add_argument(
+        "-a",
+        "--actor-path",
+        type=path_exists,
+        action="append",
+        default=[],
+        help="search path to add to sys.path when looking for actors",
+    )
+    worker_parser.set_defaults(func=run_worker)
+
     list_parser = subparsers.add_parser(
         "list", description="List running improv processes"
     )
@@ -252,9 +301,27 @@ def run_server(args):
         sys.path.remove(os.path.dirname(args.configfile))
 
 
+def run_worker(args):
+    """
+    Runs actors for an improv server, until the server quits.
+    """
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format="%(name)s %(message)s",
+        handlers=[logging.FileHandler(args.logfile)],
+    )
+    sys.path.extend(args.actor_path)
+
+    worker = Worker(args.name, args.control_port, args.hostname, args.port, args.token)
+    print(f"Worker {args.name} registering with server at {args.control_port}.")
+    worker.run()
+
+
 def run_list(args, printit=True):
     out_list = []
-    pattern = re.compile(r"(improv (run|client|server)|plasma_store|redis-server)")
+    pattern = re.compile(
+        r"(improv (run|client|server|worker)|plasma_store|redis-server)"
+    )
     #    mp_pattern = re.compile(r"-c from multiprocessing") # TODO is this right?
     for proc in psutil.process_iter(["pid", "name", "cmdline"]):
         if proc.info["cmdline"]:
@@ -43,6 +43,7 @@ class Config:
 
         self.actors = {}
         self.connections = {}
+        self.connection_options = {}
         self.hasGUI = False
 
     def createConfig(self):
@@ -59,6 +60,14 @@ class Config:
             packagename = actor.pop("package")
             classname = actor.pop("class")
 
+            if "host" in actor:
+                # runs on a worker, which may be the only place the
+                # actor's package can be imported
+                self.actors.update(
+                    {name: ConfigModule(name, packagename, classname, options=actor)}
+                )
+                continue
+
             try:
                 __import__(packagename, fromlist=[classname])
                 mod = import_module(packagename)
@@ -107,6 +116,13 @@ class Config:
             if name in self.connections.keys():
                 raise RepeatedConnectionsError(name)
 
+            # a connection is either a list of targets or a dict giving the
+            # targets along with options for the link, e.g. its type
+            if isinstance(conn, dict):
+                options = dict(conn)
+                conn = options.pop("targets")
+                self.connection_options.update({name: options})
+
             self.connections.update({name: conn})
 
         if "datastore" in cfg.keys():
@@ -132,6 +148,61 @@ class Config:
     def use_plasma(self):
         return "plasma_config" in self.config.keys()
 
+    def use_shm(self):
+        return "shm_config" in self.config.keys()
+
+    def get_shm_slots(self):
+        shm_config = self.config.get("shm_config") or {}
+        return shm_config.get("n_slots", 65536)
+
+    def get_comm_link_type(self):
+        return self.settings.get("comm_link_type", "shm")
+
+    def get_metrics_file(self):
+        return self.settings.get("metrics_file")
+
+    def get_checkpoint_dir(self):
+        return self.settings.get("checkpoint_dir")
+
+    def get_watcher_file(self):
+        return self.settings.get("watcher_file")
+
+    def get_journal_dir(self):
+        return self.settings.get("journal_dir")
+
+    def get_replay(self):
+        """The replay settings, or None to run the pipeline normally
+
+        Returns:
+            dict: the journal directory to replay from, the actors to
+            replay to (all that have a journal there if not given), and
+            the speed, None for as fast as possible
+        """
+        replay = self.settings.get("replay")
+        if not replay:
+            return None
+        if isinstance(replay, str):
+            replay = {"journal": replay}
+        speed = replay.get("speed", 1.0)
+        return {
+            "journal": replay["journal"],
+            "actors": replay.get("actors"),
+            "speed": None if speed in (None, "max") else float(speed),
+        }
+
+    def get_hostname(self):
+        return self.settings.get("hostname", "127.0.0.1")
+
+    def has_remote_actors(self):
+        """Whether any actor runs on a worker, i.e. has a host option"""
+        actors = self.config.get("actors") or {}
+        return any("host" in (actor or {}) for actor in actors.values())
+
+    def get_worker_token(self):
+        """The secret that workers and Nexus send with their requests,
+        required when the hostname is not the loopback interface"""
+        return self.settings.get("worker_token")
+
     def get_redis_port(self):
         if self.redis_port_specified():
             return self.config["redis_config"]["port"]
@@ -179,6 +250,32 @@ class Config:
 
             return frequency
 
+    def get_redis_maxmemory_policy(self):
+        if "redis_config" in self.config.keys():
+            return (
+                self.config["redis_config"]["maxmemory_policy"]
+                if "maxmemory_policy" in self.config["redis_config"]
+                else None
+            )
+
+    def get_redis_unix_socket(self):
+        return self._redis_option("unix_socket")
+
+    def get_redis_durability(self):
+        return self._redis_option("durability")
+
+    def get_redis_persist_prefixes(self):
+        return self._redis_option("persist_prefixes")
+
+    def get_redis_snapshot_interval(self):
+        return self._redis_option("snapshot_interval")
+
+    def get_redis_snapshot_file(self):
+        return self._redis_option("snapshot_file")
+
+    def _redis_option(self, name):
+        return (self.config.get("redis_config") or {}).get(name)
+
     @staticmethod
     def get_default_redis_port():
         return "6379"
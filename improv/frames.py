@@ -0,0 +1,229 @@
+import struct
+import logging
+from collections import namedtuple
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_FRAME_SLOTS = 16
+
+# where a frame is in a FrameBuffer: the slot it was written to and its
+# sequence number, which tells whether the slot has been reused since
+FrameRef = namedtuple("FrameRef", ["slot", "seq"])
+
+
+class FrameOverwrittenError(Exception):
+    """Raised when reading a frame whose slot has been reused."""
+
+    def __init__(self, ref):
+        super().__init__()
+
+        self.name = "FrameOverwrittenError"
+        self.ref = ref
+        self.message = "Frame {} in slot {} has been overwritten".format(
+            ref.seq, ref.slot
+        )
+
+    def __str__(self):
+        return self.message
+
+
+class FrameBuffer(object):
+    """Fixed-slot ring of equally shaped frames in shared memory.
+
+    A single producer writes each frame straight into the next slot,
+    overwriting the oldest frame once all slots are used, and passes on
+    a FrameRef instead of the frame. Consumers in any process read the
+    slot as a numpy array backed by the shared segment, so frames are
+    never pickled or copied on the way.
+
+    Every slot records the sequence number of the frame in it (0 while
+    the producer is writing it). A consumer holding a FrameRef can check
+    with valid() that its frame is still there: a view returned by read()
+    changes under it once the producer comes round to that slot again.
+    """
+
+    # sequence number of the newest frame, on its own cache line
+    _HEAD = struct.Struct("Q")
+    _LINE = 64
+
+    def __init__(self, shape, dtype="uint16", slots=DEFAULT_FRAME_SLOTS):
+        """Create the shared segment.
+
+        Args:
+            shape (tuple): shape of every frame
+            dtype (str): numpy dtype of the frames
+            slots (int): number of frames held at once
+        """
+        self.shape = tuple(int(n) for n in np.atleast_1d(shape))
+        self.dtype = np.dtype(dtype).str
+        self.slots = int(slots)
+        if self.slots < 1:
+            raise ValueError("A frame buffer needs at least one slot")
+
+        self._shm = shared_memory.SharedMemory(create=True, size=self._size())
+        self._shm.buf[: self._frames_offset()] = bytes(self._frames_offset())
+        self.shm_name = self._shm.name
+        self._map()
+        self._pending = None
+
+    def _frame_bytes(self):
+        nbytes = int(np.prod(self.shape)) * np.dtype(self.dtype).itemsize
+        # start every slot on its own cache line
+        return -(-nbytes // self._LINE) * self._LINE
+
+    def _frames_offset(self):
+        seqs = self.slots * np.dtype(np.uint64).itemsize
+        return self._LINE + -(-seqs // self._LINE) * self._LINE
+
+    def _size(self):
+        return self._frames_offset() + self.slots * self._frame_bytes()
+
+    def _map(self):
+        buf = self._shm.buf
+        self._seqs = np.ndarray(
+            (self.slots,), dtype=np.uint64, buffer=buf, offset=self._LINE
+        )
+        self._frames = np.ndarray(
+            (self.slots,) + self.shape,
+            dtype=self.dtype,
+            buffer=buf,
+            offset=self._frames_offset(),
+            strides=(self._frame_bytes(),) + np.empty(self.shape, self.dtype).strides,
+        )
+
+    def __getstate__(self):
+        return {
+            "shape": self.shape,
+            "dtype": self.dtype,
+            "slots": self.slots,
+            "shm_name": self.shm_name,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        # the creating process owns the segment
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._map()
+        self._pending = None
+
+    def __repr__(self):
+        return "FrameBuffer {} of {} {} frames".format(
+            self.shm_name, self.slots, "x".join(str(n) for n in self.shape)
+        )
+
+    @property
+    def head(self):
+        """Sequence number of the newest frame, 0 before the first"""
+        return self._HEAD.unpack_from(self._shm.buf, 0)[0]
+
+    def latest(self):
+        """Reference to the newest frame, or None if nothing was written"""
+        seq = self.head
+        if seq == 0:
+            return None
+        return FrameRef((seq - 1) % self.slots, seq)
+
+    def claim(self):
+        """Take the next slot for writing, overwriting its frame.
+
+        Lets the producer fill the frame in place, e.g. by handing the
+        array to a camera driver, before publish() makes it readable.
+
+        Returns:
+            ndarray: writable view of the slot
+        """
+        seq = self.head + 1
+        slot = (seq - 1) % self.slots
+        self._seqs[slot] = 0
+        self._pending = FrameRef(slot, seq)
+        return self._frames[slot]
+
+    def publish(self):
+        """Make the frame in the slot from claim() readable.
+
+        Returns:
+            FrameRef: where consumers find the frame
+        """
+        if self._pending is None:
+            raise RuntimeError("No claimed slot to publish")
+        ref, self._pending = self._pending, None
+        self._seqs[ref.slot] = ref.seq
+        self._HEAD.pack_into(self._shm.buf, 0, ref.seq)
+        return ref
+
+    def write(self, frame):
+        """Copy a frame into the next slot and publish it.
+
+        Args:
+            frame (ndarray): frame of this buffer's shape
+
+        Returns:
+            FrameRef: where consumers find the frame
+        """
+        frame = np.asarray(frame)
+        if frame.shape != self.shape:
+            raise ValueError(
+                "Frame of shape {} does not fit slots of shape {}".format(
+                    frame.shape, self.shape
+                )
+            )
+        self.claim()[...] = frame
+        return self.publish()
+
+    def valid(self, ref):
+        """Whether the frame ref points to is still in its slot"""
+        return int(self._seqs[ref.slot]) == ref.seq
+
+    def read(self, ref, copy=False):
+        """Get the frame ref points to.
+
+        Args:
+            ref (FrameRef): from write() or publish()
+            copy (bool): return a copy, which stays valid after the slot
+                is reused, instead of a view of the slot
+
+        Raises:
+            FrameOverwrittenError: the slot holds a newer frame
+
+        Returns:
+            ndarray: the frame, read-only unless copied
+        """
+        if not self.valid(ref):
+            raise FrameOverwrittenError(ref)
+        frame = self._frames[ref.slot]
+        if copy:
+            frame = frame.copy()
+            # the producer may have come round while we copied
+            if not self.valid(ref):
+                raise FrameOverwrittenError(ref)
+            return frame
+        frame = frame.view()
+        frame.flags.writeable = False
+        return frame
+
+    def close(self):
+        """Release this process' handle on the buffer.
+
+        Views from read() keep the mapping alive until they are gone.
+        """
+        self._seqs = None
+        self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            logger.debug("Frames of {} are still in use".format(self.shm_name))
+
+    def unlink(self):
+        """Destroy the shared memory segment.
+
+        Should be called once, by the process that created the buffer.
+        """
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
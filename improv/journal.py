@@ -0,0 +1,337 @@
+import os
+import glob
+import heapq
+import pickle
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# kinds of journal records
+MESSAGE = 0
+OBJECT = 1
+
+# one entry per record, in the order they were written
+INDEX_DTYPE = np.dtype(
+    [("kind", "u1"), ("time", "<f8"), ("offset", "<i8"), ("size", "<i8")]
+)
+
+JOURNAL_SUFFIX = ".journal"
+INDEX_SUFFIX = ".index"
+
+# links that carry signals and metrics rather than data
+COMM_LINKS = ("q_sig", "q_comm", "q_watchout")
+
+
+def _index_file(filename):
+    return os.path.splitext(filename)[0] + INDEX_SUFFIX
+
+
+def remove_journal(filename):
+    """Remove a journal file and its index, if they exist"""
+    for f in (filename, _index_file(filename)):
+        if os.path.exists(f):
+            os.remove(f)
+
+
+class JournalWriter(object):
+    """Records what one actor receives to a journal file.
+
+    Every message taken off one of the actor's links is recorded with the
+    time it was put on the link, and every object the actor gets from
+    the store is recorded once, under its key. Records are pickled one
+    after another into <actor>.journal, and <actor>.index gets an entry
+    for each with its kind, time, offset and size, so a Journal can find
+    messages and objects without reading the whole file. Each record is
+    flushed before its index entry is written, so a journal cut short
+    when its actor is killed is still readable up to its last entry.
+    """
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): journal file to write; appended to if it
+                exists, as when a restarted actor records again
+        """
+        self.filename = str(filename)
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        self._data = open(self.filename, "ab")
+        self._index = open(_index_file(self.filename), "ab")
+        self._lock = threading.Lock()
+        self._keys = set()
+        self.n_messages = 0
+        self.n_objects = 0
+
+    def message(self, link, item, t=None):
+        """Record a message received on a link
+
+        Args:
+            link (str): name of the link in the actor's links, e.g. q_in
+            item: the message
+            t (float): when the message was sent; now if None
+        """
+        self._write(MESSAGE, time.time() if t is None else t, link, item)
+        self.n_messages += 1
+
+    def object(self, key, obj):
+        """Record an object got from the store, unless its key already was"""
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        self._write(OBJECT, time.time(), key, obj)
+        self.n_objects += 1
+
+    def close(self):
+        with self._lock:
+            if self._data.closed:
+                return
+            self._data.close()
+            self._index.close()
+        logger.info(
+            "Recorded {} messages and {} objects to {}".format(
+                self.n_messages, self.n_objects, self.filename
+            )
+        )
+
+    def _write(self, kind, t, name, obj):
+        # the name is pickled on its own so Journal can read it alone
+        header = pickle.dumps(name, protocol=pickle.HIGHEST_PROTOCOL)
+        payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._data.closed:
+                return
+            offset = self._data.tell()
+            self._data.write(header)
+            self._data.write(payload)
+            self._data.flush()
+            entry = np.array(
+                [(kind, t, offset, len(header) + len(payload))], dtype=INDEX_DTYPE
+            )
+            self._index.write(entry.tobytes())
+            self._index.flush()
+
+
+class Journal(object):
+    """Reads the journals recorded to a directory, one per actor."""
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): where the journals were recorded
+        """
+        self.directory = str(directory)
+        self._files = {}
+        self._entries = {}
+        # actor -> key -> offset of its object record; built on first get
+        self._objects = {}
+
+    def actors(self):
+        """Names of the actors with a journal in the directory"""
+        return sorted(
+            os.path.basename(f)[: -len(JOURNAL_SUFFIX)]
+            for f in glob.glob(os.path.join(self.directory, "*" + JOURNAL_SUFFIX))
+        )
+
+    def entries(self, actor):
+        """The index entries of an actor's journal, as an INDEX_DTYPE array
+
+        Raises:
+            FileNotFoundError: if the actor has no journal
+        """
+        if actor not in self._entries:
+            filename = os.path.join(self.directory, actor + JOURNAL_SUFFIX)
+            entries = np.fromfile(_index_file(filename), dtype=INDEX_DTYPE)
+            self._files[actor] = open(filename, "rb")
+            self._entries[actor] = entries
+        return self._entries[actor]
+
+    def messages(self, actor, links=None):
+        """Yield (time, link, message) for the messages an actor received,
+        in the order it received them
+
+        Args:
+            actor (str): name of the actor
+            links (list): names of the links to yield messages from;
+                all if None
+        """
+        entries = self.entries(actor)
+        for entry in entries[entries["kind"] == MESSAGE]:
+            link, item = self._read(actor, entry)
+            if links is None or link in links:
+                yield float(entry["time"]), link, item
+
+    def get(self, actor, key):
+        """An object an actor got from the store
+
+        Raises:
+            KeyError: if the actor's journal has none under key
+        """
+        if actor not in self._objects:
+            entries = self.entries(actor)
+            f = self._files[actor]
+            offsets = {}
+            for entry in entries[entries["kind"] == OBJECT]:
+                f.seek(int(entry["offset"]))
+                offsets[pickle.load(f)] = entry
+            self._objects[actor] = offsets
+        return self._read(actor, self._objects[actor][key])[1]
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        self._entries = {}
+        self._objects = {}
+
+    def _read(self, actor, entry):
+        f = self._files[actor]
+        f.seek(int(entry["offset"]))
+        name = pickle.load(f)
+        return name, pickle.load(f)
+
+
+class RecordingStore(object):
+    """Store interface that records the objects got through it.
+
+    Everything else is passed to the store interface it wraps.
+    """
+
+    def __init__(self, client, journal):
+        """
+        Args:
+            client (improv.store.StoreInterface): the store interface
+            journal (JournalWriter): where to record objects
+        """
+        self.client = client
+        self.journal = journal
+
+    def __getattr__(self, name):
+        if name in ("client", "journal"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def get(self, key):
+        obj = self.client.get(key)
+        self.journal.object(key, obj)
+        return obj
+
+    def getID(self, key):
+        obj = self.client.getID(key)
+        self.journal.object(key, obj)
+        return obj
+
+    def get_many(self, keys, *args, **kwargs):
+        objs = self.client.get_many(keys, *args, **kwargs)
+        for key, obj in zip(keys, objs):
+            if obj is not None:
+                self.journal.object(key, obj)
+        return objs
+
+
+class ReplayStore(object):
+    """Store interface that answers gets from an actor's journal.
+
+    Objects the actor got from the store when it was recorded are read
+    from its journal; anything else, such as objects the actor puts
+    itself, is passed to the store interface it wraps.
+    """
+
+    def __init__(self, client, directory, actor):
+        """
+        Args:
+            client (improv.store.StoreInterface): the store interface
+            directory (str): where the journals were recorded
+            actor (str): name of the actor being replayed
+        """
+        self.client = client
+        self.directory = directory
+        self.actor = actor
+        self._journal = None
+
+    def __getattr__(self, name):
+        if name in ("client", "directory", "actor", "_journal"):
+            raise AttributeError(name)
+        return getattr(self.client, name)
+
+    def __getstate__(self):
+        # open files stay behind; the journal is opened again when needed
+        return dict(self.__dict__, _journal=None)
+
+    @property
+    def journal(self):
+        if self._journal is None:
+            self._journal = Journal(self.directory)
+        return self._journal
+
+    def get(self, key):
+        try:
+            return self.journal.get(self.actor, key)
+        except (KeyError, TypeError):
+            return self.client.get(key)
+
+    def getID(self, key):
+        return self.get(key)
+
+    def get_many(self, keys, *args, **kwargs):
+        return [self.get(key) for key in keys]
+
+
+class Replayer(object):
+    """Feeds links with the messages recorded in a Journal.
+
+    Messages for several actors are merged by the time they were sent,
+    and each actor's come in the order it received them. At speed 1 they
+    are put on their links at the pace they were recorded, at speed 2
+    twice as fast; with no speed they are put as fast as the links take
+    them.
+    """
+
+    def __init__(self, journal, links, speed=1.0):
+        """
+        Args:
+            journal (Journal): the recorded messages
+            links (dict): for each replayed actor, a dict of the links to
+                feed by their names in the actor's links, e.g. q_in
+            speed (float): how much faster than recorded to replay;
+                as fast as possible if None or 0
+        """
+        self.journal = journal
+        self.links = links
+        self.speed = speed
+        self.sent = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Put every recorded message on its link, then return
+
+        Returns:
+            int: how many messages were put
+        """
+        streams = [
+            (
+                (t, actor, link, item)
+                for t, link, item in self.journal.messages(actor, list(links))
+            )
+            for actor, links in self.links.items()
+        ]
+        start = first = None
+        for t, actor, link, item in heapq.merge(*streams, key=lambda m: m[0]):
+            if first is None:
+                start, first = time.perf_counter(), t
+            if self.speed:
+                delay = start + (t - first) / self.speed - time.perf_counter()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            if self._stop.is_set():
+                break
+            self.links[actor][link].put(item)
+            self.sent += 1
+        logger.info("Replayed {} messages".format(self.sent))
+        return self.sent
@@ -1,14 +1,66 @@
+import os
+import time
+import select
+import struct
+import pickle
 import asyncio
 import logging
-from multiprocessing import Manager, cpu_count
+import tempfile
+import threading
+import uuid
+from queue import Empty, Full
+from multiprocessing import Manager, cpu_count, shared_memory, resource_tracker
 from concurrent.futures import ThreadPoolExecutor
 from concurrent.futures._base import CancelledError
 
+import zmq
+
+from improv.frames import (
+    DEFAULT_FRAME_SLOTS,
+    FrameBuffer,
+    FrameOverwrittenError,
+    FrameRef,
+)
+from improv.metrics import registry
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-
-def Link(name, start, end):
+DEFAULT_SHM_CAPACITY = 8 * 1024 * 1024  # bytes
+# frame links only carry small FrameRefs through their ring
+FRAME_REF_CAPACITY = 64 * 1024  # bytes
+
+# how long a broadcast consumer waits for the producer to finish updating
+# the log's header before checking that the producer is still alive
+WRITER_STALL_TIMEOUT = 1.0  # seconds
+
+# minimum time between samples of a link's depth; qsize on a Manager queue
+# is a round trip to the Manager process, so don't pay for it on every put
+DEPTH_SAMPLE_INTERVAL = 0.1  # seconds
+
+# what a put does when a link already holds maxsize items:
+#   block: wait for room (put_nowait raises Full)
+#   drop_oldest: discard the oldest queued item to make room
+#   drop_newest: discard the item being put
+#   latest: like drop_oldest with maxsize 1, so consumers only see the
+#       newest item
+POLICIES = ("block", "drop_oldest", "drop_newest", "latest")
+
+
+def _check_policy(policy, maxsize):
+    """Validate a backpressure policy and return the maxsize to use with it"""
+    if policy not in POLICIES:
+        raise ValueError(
+            "Unknown link policy {}; expected one of {}".format(policy, POLICIES)
+        )
+    if policy == "latest":
+        return 1
+    if policy != "block" and not maxsize:
+        raise ValueError("Link policy {} needs a maxsize".format(policy))
+    return maxsize
+
+
+def Link(name, start, end, manager=None, maxsize=0, policy="block"):
     """Function to construct a queue that Nexus uses for
     inter-process (actor) signaling and information passing.
 
@@ -18,16 +70,253 @@ def Link(name, start, end):
 
     Args:
         See AsyncQueue constructor
+        manager (SyncManager): running Manager to create the queue on;
+            a new Manager process is started if not given
+        maxsize (int): maximum number of queued items, 0 for no limit
+        policy (str): what a put does when the link is full; see POLICIES
 
     Returns:
         AsyncQueue: queue for communicating between actors and with Nexus
     """
-
-    m = Manager()
-    q = AsyncQueue(m.Queue(maxsize=0), name, start, end)
+    maxsize = _check_policy(policy, maxsize)
+    m = manager if manager is not None else Manager()
+    q = AsyncQueue(m.Queue(maxsize=maxsize), name, start, end, policy=policy)
     return q
 
 
+def ZmqLink(
+    name,
+    start,
+    end,
+    address=None,
+    bind=None,
+    maxsize=0,
+    policy="block",
+    producer_binds=False,
+):
+    """Function to construct a link over ZMQ PUSH/PULL sockets.
+
+    The consumer binds and the producer connects, so the consumer can
+    run on another machine: give the address to connect to, and the
+    endpoint to bind there if it differs (e.g. address
+    tcp://computebox:5600, bind tcp://*:5600). Without an address the
+    link uses an ipc:// endpoint, which only works on one host.
+
+    Args:
+        See AsyncQueue constructor
+        address (str): endpoint the producer connects to
+        bind (str): endpoint the consumer binds, defaults to address
+        maxsize (int): approximate maximum number of queued items
+        policy (str): what a put does when the link is full; drop_oldest
+            is not supported, since only the consumer can take items
+        producer_binds (bool): bind on the producer's side instead, for
+            when it is the consumer whose host is not known in advance
+
+    Returns:
+        AsyncQueue: queue for communicating between actors
+    """
+    if policy == "drop_oldest":
+        raise ValueError("ZMQ links do not support the drop_oldest policy")
+    maxsize = _check_policy(policy, maxsize)
+    if address is None:
+        address = "ipc://{}/improv-{}-{}".format(
+            tempfile.gettempdir(), name, uuid.uuid4().hex[:8]
+        )
+    conflate = policy == "latest"
+    q = ZmqQueue(address, bind, maxsize, conflate, producer_binds)
+    # a conflating socket replaces the item it holds rather than filling up
+    return AsyncQueue(q, name, start, end, policy="block" if conflate else policy)
+
+
+def ZmqMultiLink(name, start, end, address=None, bind=None, maxsize=0, policy="block"):
+    """Function to generate ZMQ links for the multi-output case.
+
+    Args:
+        See ZmqLink
+        address (list): endpoint to connect to for each consumer
+        bind (list): endpoint to bind for each consumer
+
+    Returns:
+        MultiAsyncQueue: Producer end of the queue
+        List: AsyncQueues for consumers
+    """
+    address = address or [None] * len(end)
+    bind = bind or [None] * len(end)
+    if len(address) != len(end) or len(bind) != len(end):
+        raise ValueError("Give one ZMQ address and bind per consumer")
+    q_out = [
+        ZmqLink(name, start, endpoint, a, b, maxsize, policy)
+        for endpoint, a, b in zip(end, address, bind)
+    ]
+
+    q = MultiAsyncQueue(None, q_out, name, start, end)
+
+    return q, q_out
+
+
+def InboxLink(address, name, start, end):
+    """Function to construct a link that sends to a ZMQ PULL socket.
+
+    Nexus binds one PULL socket as an inbox for the comm messages of all
+    actors; each actor's q_comm is one of these links. Items are sent
+    tagged with the link's name so Nexus can tell the senders apart.
+    Only the put side of the Link interface is available.
+
+    Args:
+        address (str): endpoint the PULL socket is bound to
+        See AsyncQueue constructor for the others
+
+    Returns:
+        AsyncQueue: sending end of the link
+    """
+    return AsyncQueue(ZmqPushQueue(address, name), name, start, end)
+
+
+class LinkFactory(object):
+    """Creates Links that share a small pool of Manager server processes.
+
+    Calling Link or MultiLink directly starts a new Manager, and so a new
+    server process, for every queue. Nexus instead owns a LinkFactory so
+    that all of a pipeline's Manager queues are served by n_managers
+    processes, handed out round-robin. The factory also keeps track of the
+    shared-memory queues it creates so they can be cleaned up together.
+    Links can be created from several threads at once.
+    """
+
+    def __init__(self, n_managers=1):
+        """Constructor for the factory. Managers are started on first use.
+
+        Args:
+            n_managers (int): number of Manager server processes to use
+        """
+        self.n_managers = max(1, int(n_managers))
+        self.managers = []
+        self.shm_queues = []
+        self.n_links = 0
+        self.elapsed = 0.0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _manager(self):
+        with self._lock:
+            i = self._next % self.n_managers
+            self._next += 1
+            if i == len(self.managers):
+                self.managers.append(Manager())
+            return self.managers[i]
+
+    def _created(self, t, queues=()):
+        """Count a link created since t, and its shared memory to unlink"""
+        with self._lock:
+            self.shm_queues.extend(queues)
+            self.n_links += 1
+            self.elapsed += time.perf_counter() - t
+
+    def Link(self, name, start, end, link_type="manager", **options):
+        """Create a single-output link.
+
+        Args:
+            See AsyncQueue constructor
+            link_type (str): "manager", "shm", "frames" or "zmq";
+                "broadcast" is accepted too, and with a single consumer is
+                the same as "shm"
+            options: passed on to Link, ShmLink, FrameLink or ZmqLink
+
+        Returns:
+            AsyncQueue: queue for communicating between actors and with Nexus
+        """
+        t = time.perf_counter()
+        shm = []
+        if link_type == "manager":
+            link = Link(name, start, end, manager=self._manager(), **options)
+        elif link_type in ("shm", "broadcast"):
+            link = ShmLink(name, start, end, **options)
+            shm = [link.queue]
+        elif link_type == "frames":
+            link = FrameLink(name, start, end, **options)
+            shm = [link.queue, link.frames]
+        elif link_type == "zmq":
+            link = ZmqLink(name, start, end, **options)
+        else:
+            raise ValueError("Unknown link type {}".format(link_type))
+
+        self._created(t, shm)
+        return link
+
+    def MultiLink(self, name, start, end, link_type="manager", **options):
+        """Create a multi-output link.
+
+        Args:
+            See AsyncQueue constructor
+            link_type (str): "manager", "shm", "broadcast", "frames" or "zmq"
+            options: passed on to MultiLink, ShmMultiLink, BroadcastLink,
+                FrameMultiLink or ZmqMultiLink
+
+        Returns:
+            MultiAsyncQueue: Producer end of the queue
+            List: AsyncQueues for consumers
+        """
+        t = time.perf_counter()
+        shm = []
+        if link_type == "manager":
+            link, q_out = MultiLink(
+                name, start, end, manager=self._manager(), **options
+            )
+        elif link_type == "shm":
+            link, q_out = ShmMultiLink(name, start, end, **options)
+            shm = [q.queue for q in q_out]
+        elif link_type == "broadcast":
+            link, q_out = BroadcastLink(name, start, end, **options)
+            shm = [link.queue]
+        elif link_type == "frames":
+            link, q_out = FrameMultiLink(name, start, end, **options)
+            shm = [link.queue, link.frames]
+        elif link_type == "zmq":
+            link, q_out = ZmqMultiLink(name, start, end, **options)
+        else:
+            raise ValueError("Unknown link type {}".format(link_type))
+
+        self._created(t, shm)
+        return link, q_out
+
+    def stats(self):
+        """Summary of what the factory has created so far.
+
+        Returns:
+            dict: number of links, number of Manager processes and the
+            total time spent creating links, in seconds (summed over
+            threads, so more than the time taken if created concurrently)
+        """
+        return {
+            "links": self.n_links,
+            "manager_processes": len(self.managers),
+            "seconds": self.elapsed,
+        }
+
+    def shutdown(self):
+        """Destroy all shared-memory queues and frame buffers and stop Managers."""
+        for q in self.shm_queues:
+            q.unlink()
+        self.shm_queues = []
+
+        for m in self.managers:
+            m.shutdown()
+        self.managers = []
+
+
+class _Stamped:
+    """An item in transit on a link, with the time it was put there"""
+
+    __slots__ = ("time", "item")
+
+    def __init__(self, time, item):
+        self.time = time
+        self.item = item
+
+    def __reduce__(self):
+        return (_Stamped, (self.time, self.item))
+
+
 class AsyncQueue(object):
     """Single-output and asynchronous queue class.
 
@@ -44,7 +333,7 @@ class AsyncQueue(object):
         dict:
     """
 
-    def __init__(self, q, name, start, end):
+    def __init__(self, q, name, start, end, policy="block", keep=0):
         """Constructor for the queue class.
 
         Args:
@@ -52,6 +341,10 @@ class AsyncQueue(object):
             name (str): String description of this queue
             start (str): The producer (input) actor name for the queue
             end (str): The consumer (output) actor name for the queue
+            policy (str): what a put does when q is full; see POLICIES
+            keep (int): for queues that only their consumer may take
+                items from, the number of newest items a get chooses
+                from; older ones are dropped. 0 to keep everything
 
         """
         self.queue = q
@@ -65,6 +358,22 @@ class AsyncQueue(object):
         self.status = "pending"
         self.result = None
 
+        self.policy = policy
+        self.keep = keep
+        self.dropped = 0
+        # queues that can skip items on their own report how many
+        self._skips = hasattr(q, "take_dropped")
+
+    _last_depth_sample = 0.0
+    # called with each item received and the time it was sent, when the
+    # consumer records what it receives; see improv.journal
+    journal = None
+
+    @property
+    def metric_name(self):
+        """Prefix for this link's entries in improv.metrics.registry"""
+        return "link.{}->{}".format(self.name, self.end)
+
     def getStart(self):
         """Gets the starting actor.
 
@@ -87,6 +396,14 @@ class AsyncQueue(object):
         """
         return self.end
 
+    @property
+    def selectable(self):
+        """Whether the underlying queue has a file descriptor that becomes
+        readable when an item is put. For these queues put_async and
+        get_async run on the event loop itself instead of in threads.
+        """
+        return hasattr(self.queue, "fileno")
+
     @property
     def _executor(self):
         if not self.real_executor:
@@ -123,7 +440,7 @@ class AsyncQueue(object):
         Returns:
             (object): Value of the attribute specified by "name".
         """
-        if name in ["qsize", "empty", "full", "get", "get_nowait", "close"]:
+        if name in ["qsize", "empty", "full", "close"]:
             return getattr(self.queue, name)
         else:
             cn = self.__class__.__name__
@@ -140,18 +457,124 @@ class AsyncQueue(object):
     def put(self, item):
         """Function wrapper for put.
 
+        Blocks while the queue is full, unless the link has a drop policy.
+
         Args:
             item (object): Any item that can be sent through a queue
         """
-        self.queue.put(item)
+        if self.policy != "block":
+            return self.put_nowait(item)
+        t = time.perf_counter()
+        self.queue.put(_Stamped(time.time(), item))
+        self._sent(t)
 
     def put_nowait(self, item):
         """Function wrapper for put without waiting
 
+        If the queue is full, raises Full when the link's policy is block
+        and otherwise drops an item as the policy says.
+
         Args:
             item (object): Any item that can be sent through a queue
         """
-        self.queue.put_nowait(item)
+        t = time.perf_counter()
+        stamped = _Stamped(time.time(), item)
+        if self.policy == "block":
+            self.queue.put_nowait(stamped)
+        elif self.policy == "drop_newest" or self.keep:
+            # a full queue here is one whose consumer is trimming it,
+            # and only the consumer may take items from it
+            try:
+                self.queue.put_nowait(stamped)
+            except Full:
+                self._dropped(1)
+                return
+        else:
+            while True:
+                try:
+                    self.queue.put_nowait(stamped)
+                    break
+                except Full:
+                    pass
+                try:
+                    self.queue.get_nowait()
+                    self._dropped(1)
+                except Empty:
+                    pass  # the consumer made room first
+        self._sent(t)
+
+    def get(self, *args, **kwargs):
+        """Function wrapper for get; takes the same arguments as Queue.get
+
+        Returns:
+            The next item on the queue
+        """
+        if self.keep:
+            self._trim()
+        item = self.queue.get(*args, **kwargs)
+        if self._skips:
+            self._count_skipped()
+        return self.received(item)
+
+    def get_nowait(self):
+        """Function wrapper for get without waiting
+
+        Returns:
+            The next item on the queue
+        """
+        if self.keep:
+            self._trim()
+        item = self.queue.get_nowait()
+        if self._skips:
+            self._count_skipped()
+        return self.received(item)
+
+    def _trim(self):
+        """Drop all but the newest keep items"""
+        n = self.queue.qsize() - self.keep
+        for _ in range(n):
+            self.queue.get_nowait()
+        if n > 0:
+            self._dropped(n)
+
+    def _count_skipped(self):
+        n = self.queue.take_dropped()
+        if n:
+            self._dropped(n)
+
+    def _dropped(self, n):
+        self.dropped += n
+        registry.count(self.metric_name + ".dropped", n)
+
+    def _sent(self, t):
+        now = time.perf_counter()
+        registry.observe(self.metric_name + ".put", now - t)
+        if now - self._last_depth_sample >= DEPTH_SAMPLE_INTERVAL:
+            self._last_depth_sample = now
+            try:
+                registry.gauge(self.metric_name + ".depth", self.queue.qsize())
+            except (NotImplementedError, OSError, EOFError):
+                pass
+
+    def received(self, item):
+        """Record an item taken off this link's queue and unwrap it.
+
+        get does this itself; it is for items read from the queue some
+        other way, as Nexus does with its inbox.
+        """
+        if isinstance(item, _Stamped):
+            registry.observe(self.metric_name + ".latency", time.time() - item.time)
+            registry.count(self.metric_name + ".items")
+            if self.journal is not None:
+                self.journal(self._journaled(item.item), item.time)
+            return item.item
+        if self.journal is not None:
+            self.journal(self._journaled(item), time.time())
+        return item
+
+    def _journaled(self, item):
+        """What to record in a journal for an item received"""
+        return item
 
     async def put_async(self, item):
         """Coroutine for an asynchronous put
@@ -166,6 +589,8 @@ class AsyncQueue(object):
         """
         loop = asyncio.get_event_loop()
         try:
+            if self.selectable:
+                return await self._put_native(item)
             res = await loop.run_in_executor(self._executor, self.put, item)
             return res
         except EOFError:
@@ -195,7 +620,10 @@ class AsyncQueue(object):
         loop = asyncio.get_event_loop()
         self.status = "pending"
         try:
-            self.result = await loop.run_in_executor(self._executor, self.get)
+            if self.selectable:
+                self.result = await self._get_native()
+            else:
+                self.result = await loop.run_in_executor(self._executor, self.get)
             self.status = "done"
             return self.result
         except CancelledError:
@@ -207,6 +635,31 @@ class AsyncQueue(object):
         except Exception as e:
             logger.exception("Error in get_async: {}".format(e))
 
+    async def _put_native(self, item):
+        while True:
+            try:
+                return self.put_nowait(item)
+            except Full:
+                await asyncio.sleep(self.queue.poll_interval)
+
+    async def _get_native(self):
+        loop = asyncio.get_running_loop()
+        fd = self.queue.fileno()
+        while True:
+            # clear wakeups before looking, so a put after the look
+            # leaves the descriptor readable
+            self.queue.clear_wakeups()
+            try:
+                return self.get_nowait()
+            except Empty:
+                pass
+            readable = loop.create_future()
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+            try:
+                await readable
+            finally:
+                loop.remove_reader(fd)
+
     def cancel_join_thread(self):
         """Function wrapper for cancel_join_thread."""
         self._cancelled_join = True
@@ -219,21 +672,26 @@ class AsyncQueue(object):
             self._real_executor.shutdown()
 
 
-def MultiLink(name, start, end):
+def MultiLink(name, start, end, manager=None, maxsize=0, policy="block"):
     """Function to generate links for the multi-output queue case.
 
     Args:
         See constructor for AsyncQueue or MultiAsyncQueue
+        manager (SyncManager): running Manager to create the queues on;
+            a new Manager process is started if not given
+        maxsize (int): maximum number of queued items per consumer
+        policy (str): what a put does when a consumer's queue is full
 
     Returns:
         MultiAsyncQueue: Producer end of the queue
         List: AsyncQueues for consumers
     """
-    m = Manager()
+    maxsize = _check_policy(policy, maxsize)
+    m = manager if manager is not None else Manager()
 
     q_out = []
     for endpoint in end:
-        q = AsyncQueue(m.Queue(maxsize=0), name, start, endpoint)
+        q = AsyncQueue(m.Queue(maxsize=maxsize), name, start, endpoint, policy=policy)
         q_out.append(q)
 
     q = MultiAsyncQueue(m.Queue(maxsize=0), q_out, name, start, end)
@@ -271,7 +729,7 @@ class MultiAsyncQueue(AsyncQueue):
     def __getattr__(self, name):
         # Remove put and put_nowait and define behavior specifically
         # TODO: remove get capability?
-        if name in ["qsize", "empty", "full", "get", "get_nowait", "close"]:
+        if name in ["qsize", "empty", "full", "close"]:
             return getattr(self.queue, name)
         else:
             raise AttributeError(
@@ -285,3 +743,1002 @@ class MultiAsyncQueue(AsyncQueue):
     def put_nowait(self, item):
         for q in self.output:
             q.put_nowait(item)
+
+    async def put_async(self, item):
+        if all(q.selectable for q in self.output):
+            for q in self.output:
+                await q.put_async(item)
+        else:
+            return await super().put_async(item)
+
+
+def ShmLink(name, start, end, capacity=DEFAULT_SHM_CAPACITY, maxsize=0, policy="block"):
+    """Function to construct a Link backed by a shared-memory ring buffer
+    instead of a Manager queue.
+
+    The returned AsyncQueue has the same interface as one made by Link,
+    but a put/get never leaves the two processes at either end.
+    There must be exactly one producer and one consumer.
+
+    Since only the consumer may take items off the ring, the drop_oldest
+    and latest policies are applied when getting: a get skips all but
+    the newest maxsize items. The producer only drops the item it is
+    putting, if the ring itself is out of room.
+
+    Args:
+        See AsyncQueue constructor
+        capacity (int): size of the ring buffer in bytes
+        maxsize (int): maximum number of queued items, 0 for no limit
+        policy (str): what a put does when the link is full; see POLICIES
+
+    Returns:
+        AsyncQueue: queue for communicating between actors
+    """
+    maxsize = _check_policy(policy, maxsize)
+    if policy in ("drop_oldest", "latest"):
+        q = ShmQueue(capacity=capacity)
+        return AsyncQueue(q, name, start, end, policy=policy, keep=maxsize)
+    q = ShmQueue(capacity=capacity, maxsize=maxsize)
+    return AsyncQueue(q, name, start, end, policy=policy)
+
+
+def ShmMultiLink(
+    name, start, end, capacity=DEFAULT_SHM_CAPACITY, maxsize=0, policy="block"
+):
+    """Function to generate shared-memory links for the multi-output case.
+
+    Args:
+        See ShmLink
+
+    Returns:
+        MultiAsyncQueue: Producer end of the queue
+        List: AsyncQueues for consumers
+    """
+    q_out = [
+        ShmLink(name, start, endpoint, capacity, maxsize, policy) for endpoint in end
+    ]
+
+    q = MultiAsyncQueue(None, q_out, name, start, end)
+
+    return q, q_out
+
+
+class ShmQueue(object):
+    """Single-producer/single-consumer queue in shared memory.
+
+    Items are pickled into a byte ring that lives in a
+    multiprocessing.shared_memory segment. The producer only ever advances
+    the write cursor and the consumer only the read cursor, so neither side
+    takes a lock. A named pipe next to the segment carries wakeups, so a
+    blocked get sleeps in select() rather than spinning.
+
+    Implements the subset of the multiprocessing Queue interface that
+    AsyncQueue relies on.
+    """
+
+    # write cursor and put count, then read cursor and get count on a
+    # separate cache line so the two ends do not contend
+    _WRITER = struct.Struct("QQ")
+    _READER = struct.Struct("QQ")
+    _READER_OFFSET = 64
+    _HEADER_SIZE = 128
+    _LEN = struct.Struct("I")
+
+    def __init__(self, capacity=DEFAULT_SHM_CAPACITY, maxsize=0, poll_interval=1e-4):
+        """Create the ring buffer and its wakeup pipe.
+
+        Args:
+            capacity (int): size of the ring buffer in bytes
+            maxsize (int): maximum number of queued items, 0 for no limit
+            poll_interval (float): how long a blocked put sleeps between
+                checks for free space, in seconds
+        """
+        self.capacity = int(capacity)
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self._HEADER_SIZE + self.capacity
+        )
+        self._shm.buf[: self._HEADER_SIZE] = bytes(self._HEADER_SIZE)
+        self.shm_name = self._shm.name
+
+        self.fifo_path = os.path.join(
+            tempfile.gettempdir(), "improv_" + self.shm_name.lstrip("/")
+        )
+        os.mkfifo(self.fifo_path, 0o600)
+        self._fd = None
+
+    def __getstate__(self):
+        return {
+            "capacity": self.capacity,
+            "maxsize": self.maxsize,
+            "poll_interval": self.poll_interval,
+            "shm_name": self.shm_name,
+            "fifo_path": self.fifo_path,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        # the creating process owns the segment; don't let this process'
+        # resource tracker unlink it on exit
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._fd = None
+
+    def fileno(self):
+        """File descriptor that becomes readable when an item is put.
+
+        The descriptor is shared by both ends; reading from it only
+        clears pending wakeups and never removes items.
+        """
+        if self._fd is None:
+            # O_RDWR keeps the open from blocking on a missing peer
+            self._fd = os.open(self.fifo_path, os.O_RDWR | os.O_NONBLOCK)
+        return self._fd
+
+    def _writer_state(self):
+        return self._WRITER.unpack_from(self._shm.buf, 0)
+
+    def _reader_state(self):
+        return self._READER.unpack_from(self._shm.buf, self._READER_OFFSET)
+
+    def _write(self, pos, data):
+        buf = self._shm.buf
+        off = pos % self.capacity
+        first = min(len(data), self.capacity - off)
+        start = self._HEADER_SIZE + off
+        buf[start : start + first] = data[:first]
+        if first < len(data):
+            rest = len(data) - first
+            buf[self._HEADER_SIZE : self._HEADER_SIZE + rest] = data[first:]
+
+    def _read(self, pos, n):
+        buf = self._shm.buf
+        off = pos % self.capacity
+        first = min(n, self.capacity - off)
+        start = self._HEADER_SIZE + off
+        data = bytes(buf[start : start + first])
+        if first < n:
+            data += bytes(buf[self._HEADER_SIZE : self._HEADER_SIZE + n - first])
+        return data
+
+    def _notify(self):
+        try:
+            os.write(self.fileno(), b"\0")
+        except BlockingIOError:
+            pass  # pipe is full, so a wakeup is already pending
+
+    def _wait(self, timeout):
+        readable, _, _ = select.select([self.fileno()], [], [], timeout)
+        if readable:
+            self.clear_wakeups()
+
+    def clear_wakeups(self):
+        """Empty the wakeup pipe, after which fileno() is readable again
+        only once another item is put.
+        """
+        try:
+            while os.read(self.fileno(), 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _remaining(self, deadline):
+        if deadline is None:
+            return None
+        return deadline - time.monotonic()
+
+    def put(self, item, block=True, timeout=None):
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        size = self._LEN.size + len(data)
+        if size > self.capacity:
+            raise ValueError(
+                "Item of {} bytes does not fit in a ring buffer of {} bytes".format(
+                    size, self.capacity
+                )
+            )
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            head, n_put = self._writer_state()
+            tail, n_got = self._reader_state()
+            has_room = self.capacity - (head - tail) >= size
+            if has_room and not (self.maxsize and n_put - n_got >= self.maxsize):
+                break
+            remaining = self._remaining(deadline)
+            if not block or (remaining is not None and remaining <= 0):
+                raise Full
+            time.sleep(self.poll_interval)
+
+        self._write(head, self._LEN.pack(len(data)))
+        self._write(head + self._LEN.size, data)
+        # publish only after the payload is in place
+        self._WRITER.pack_into(self._shm.buf, 0, head + size, n_put + 1)
+        self._notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            tail, n_got = self._reader_state()
+            head, _ = self._writer_state()
+            if head != tail:
+                break
+            remaining = self._remaining(deadline)
+            if not block or (remaining is not None and remaining <= 0):
+                raise Empty
+            self._wait(remaining)
+
+        (length,) = self._LEN.unpack(self._read(tail, self._LEN.size))
+        data = self._read(tail + self._LEN.size, length)
+        self._READER.pack_into(
+            self._shm.buf,
+            self._READER_OFFSET,
+            tail + self._LEN.size + length,
+            n_got + 1,
+        )
+        return pickle.loads(data)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        _, n_put = self._writer_state()
+        _, n_got = self._reader_state()
+        return n_put - n_got
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return bool(self.maxsize) and self.qsize() >= self.maxsize
+
+    def close(self):
+        """Release this process' handles on the queue."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self._shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory segment and wakeup pipe.
+
+        Should be called once, by the process that created the queue.
+        """
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.remove(self.fifo_path)
+        except FileNotFoundError:
+            pass
+
+
+def BroadcastLink(
+    name, start, end, capacity=DEFAULT_SHM_CAPACITY, maxsize=0, policy="block"
+):
+    """Function to generate a broadcast link for the multi-output case.
+
+    Unlike MultiLink and ShmMultiLink, which put a copy of every item into
+    a queue per consumer, the producer writes each item once into a
+    shared-memory log that every consumer reads at its own cursor.
+
+    With the block and drop_newest policies, a consumer that falls behind
+    holds the producer back (or makes it drop) once the log is full or
+    maxsize items are unread. With drop_oldest and latest the producer
+    never waits: it overwrites the oldest items, consumers that were
+    overrun skip ahead, and each consumer gets only its newest maxsize
+    items.
+
+    Args:
+        See ShmLink; maxsize and policy apply to each consumer
+
+    Returns:
+        BroadcastAsyncQueue: Producer end of the link
+        List: AsyncQueues for consumers
+    """
+    maxsize = _check_policy(policy, maxsize)
+    overwrite = policy in ("drop_oldest", "latest")
+    log = BroadcastQueue(
+        len(end),
+        capacity=capacity,
+        maxsize=0 if overwrite else maxsize,
+        overwrite=overwrite,
+    )
+    q_out = [
+        AsyncQueue(
+            log.reader(i),
+            name,
+            start,
+            endpoint,
+            policy=policy,
+            keep=maxsize if overwrite else 0,
+        )
+        for i, endpoint in enumerate(end)
+    ]
+    return BroadcastAsyncQueue(log, name, start, end, policy=policy), q_out
+
+
+class BroadcastAsyncQueue(AsyncQueue):
+    """Producer end of a broadcast link.
+
+    Puts go once into the shared log; the depth gauge is the largest
+    number of items any consumer has yet to read, and each consumer's lag
+    is recorded as its own gauge.
+    """
+
+    def __repr__(self):
+        return "BroadcastLink " + self.name
+
+    @property
+    def metric_name(self):
+        return "link.{}->{}".format(self.name, ",".join(self.end))
+
+    def lags(self):
+        """Number of items each consumer has yet to read
+
+        Returns:
+            dict: lag by consumer name
+        """
+        return dict(zip(self.end, self.queue.lags()))
+
+    def _sent(self, t):
+        sample = time.perf_counter() - self._last_depth_sample >= DEPTH_SAMPLE_INTERVAL
+        super()._sent(t)
+        if sample:
+            for end, lag in self.lags().items():
+                registry.gauge("link.{}->{}.lag".format(self.name, end), lag)
+
+    async def put_async(self, item):
+        while True:
+            try:
+                return self.put_nowait(item)
+            except Full:
+                await asyncio.sleep(self.queue.poll_interval)
+
+
+class BroadcastQueue(object):
+    """Single-producer/multi-consumer log in shared memory.
+
+    Items are pickled once into a byte ring like ShmQueue's, but every
+    consumer has its own read cursor, on its own cache line. Space is
+    reused once the slowest consumer is past it or, if overwrite is set,
+    whenever the producer needs it. In that case the producer first
+    moves the floor (the oldest intact item) past what it is about to
+    overwrite; a consumer behind the floor skips to it, and a consumer
+    that finds the floor moved past the item it just copied discards the
+    copy. Each consumer has its own wakeup pipe.
+
+    The producer uses this object directly; each consumer uses the
+    BroadcastReader returned by reader(i).
+    """
+
+    # version, then write cursor, put count, floor position and the floor's
+    # item number; the version is odd while the producer is updating them.
+    # The pid of the producer making the update follows.
+    _VERSION = struct.Struct("Q")
+    _WRITER = struct.Struct("QQQQ")
+    _PID = struct.Struct("q")
+    # times a consumer yields to an updating producer before sleeping
+    _SPINS = 100
+    # read cursor and get count, one cache line per consumer
+    _READER = struct.Struct("QQ")
+    _LINE = 64
+    _LEN = struct.Struct("I")
+
+    def __init__(
+        self,
+        n_readers,
+        capacity=DEFAULT_SHM_CAPACITY,
+        maxsize=0,
+        overwrite=False,
+        poll_interval=1e-4,
+    ):
+        """Create the log and one wakeup pipe per consumer.
+
+        Args:
+            n_readers (int): number of consumers
+            capacity (int): size of the ring buffer in bytes
+            maxsize (int): most items a consumer may have unread before
+                puts block, 0 for no limit
+            overwrite (bool): overwrite the oldest items instead of
+                waiting for slow consumers
+            poll_interval (float): how long a blocked put sleeps between
+                checks for free space, in seconds
+        """
+        self.n_readers = n_readers
+        self.capacity = int(capacity)
+        self.maxsize = maxsize
+        self.overwrite = overwrite
+        self.poll_interval = poll_interval
+        self._header_size = self._LINE * (n_readers + 1)
+
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=self._header_size + self.capacity
+        )
+        self._shm.buf[: self._header_size] = bytes(self._header_size)
+        self.shm_name = self._shm.name
+
+        base = os.path.join(
+            tempfile.gettempdir(), "improv_" + self.shm_name.lstrip("/")
+        )
+        self.fifo_paths = ["{}_{}".format(base, i) for i in range(n_readers)]
+        for path in self.fifo_paths:
+            os.mkfifo(path, 0o600)
+        self._fds = None
+
+    def __getstate__(self):
+        return {
+            "n_readers": self.n_readers,
+            "capacity": self.capacity,
+            "maxsize": self.maxsize,
+            "overwrite": self.overwrite,
+            "poll_interval": self.poll_interval,
+            "_header_size": self._header_size,
+            "shm_name": self.shm_name,
+            "fifo_paths": self.fifo_paths,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        # the creating process owns the segment
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._fds = None
+
+    def reader(self, i):
+        """Consumer i's end of the log"""
+        return BroadcastReader(self, i)
+
+    def _fd(self, i):
+        if self._fds is None:
+            self._fds = [None] * self.n_readers
+        if self._fds[i] is None:
+            self._fds[i] = os.open(self.fifo_paths[i], os.O_RDWR | os.O_NONBLOCK)
+        return self._fds[i]
+
+    def _writer_state(self):
+        """Read the producer's cursors consistently.
+
+        While the producer is updating them, yield to it, then sleep
+        between tries; every WRITER_STALL_TIMEOUT, check that it is
+        still alive.
+
+        Raises:
+            EOFError: the producer died in the middle of an update
+        """
+        buf = self._shm.buf
+        tries = 0
+        stalled_since = None
+        while True:
+            (version,) = self._VERSION.unpack_from(buf, 0)
+            state = self._WRITER.unpack_from(buf, self._VERSION.size)
+            if version % 2 == 0 and self._VERSION.unpack_from(buf, 0)[0] == version:
+                return state
+            tries += 1
+            if tries < self._SPINS:
+                time.sleep(0)
+                continue
+            now = time.monotonic()
+            if stalled_since is None:
+                stalled_since = now
+            elif now - stalled_since >= WRITER_STALL_TIMEOUT:
+                if not self._producer_alive():
+                    raise EOFError(
+                        "Producer of broadcast log {} died".format(self.shm_name)
+                    )
+                stalled_since = now
+            time.sleep(self.poll_interval)
+
+    def _producer_alive(self):
+        (pid,) = self._PID.unpack_from(
+            self._shm.buf, self._VERSION.size + self._WRITER.size
+        )
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # exists, but belongs to someone else
+        return True
+
+    def _set_writer_state(self, *state):
+        buf = self._shm.buf
+        (version,) = self._VERSION.unpack_from(buf, 0)
+        self._PID.pack_into(buf, self._VERSION.size + self._WRITER.size, os.getpid())
+        self._VERSION.pack_into(buf, 0, version + 1)
+        self._WRITER.pack_into(buf, self._VERSION.size, *state)
+        self._VERSION.pack_into(buf, 0, version + 2)
+
+    def _reader_state(self, i):
+        return self._READER.unpack_from(self._shm.buf, self._LINE * (i + 1))
+
+    def _set_reader_state(self, i, pos, n):
+        self._READER.pack_into(self._shm.buf, self._LINE * (i + 1), pos, n)
+
+    # ring access is the same as ShmQueue's
+    def _write(self, pos, data):
+        buf = self._shm.buf
+        off = pos % self.capacity
+        first = min(len(data), self.capacity - off)
+        start = self._header_size + off
+        buf[start : start + first] = data[:first]
+        if first < len(data):
+            rest = len(data) - first
+            buf[self._header_size : self._header_size + rest] = data[first:]
+
+    def _read(self, pos, n):
+        buf = self._shm.buf
+        off = pos % self.capacity
+        first = min(n, self.capacity - off)
+        start = self._header_size + off
+        data = bytes(buf[start : start + first])
+        if first < n:
+            data += bytes(buf[self._header_size : self._header_size + n - first])
+        return data
+
+    def _item_size(self, pos):
+        (length,) = self._LEN.unpack(self._read(pos, self._LEN.size))
+        return self._LEN.size + length
+
+    def lags(self):
+        """Number of unread items for each consumer"""
+        _, n_put, _, floor_n = self._writer_state()
+        return [
+            n_put - max(self._reader_state(i)[1], floor_n)
+            for i in range(self.n_readers)
+        ]
+
+    def qsize(self):
+        """Number of items the slowest consumer has yet to read"""
+        return max(self.lags())
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return bool(self.maxsize) and self.qsize() >= self.maxsize
+
+    def put(self, item, block=True, timeout=None):
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        size = self._LEN.size + len(data)
+        if size > self.capacity:
+            raise ValueError(
+                "Item of {} bytes does not fit in a ring buffer of {} bytes".format(
+                    size, self.capacity
+                )
+            )
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            head, n_put, floor, floor_n = self._writer_state()
+            readers = [self._reader_state(i) for i in range(self.n_readers)]
+            slowest = min(pos for pos, _ in readers)
+            # the space before the slowest consumer is free to reuse
+            while floor < slowest and floor < head:
+                floor += self._item_size(floor)
+                floor_n += 1
+            lag = n_put - max(min(n for _, n in readers), floor_n)
+            has_room = self.capacity - (head - floor) >= size
+            if has_room and not (self.maxsize and lag >= self.maxsize):
+                break
+            if self.overwrite:
+                # publish the new floor before overwriting what was below it
+                while self.capacity - (head - floor) < size:
+                    floor += self._item_size(floor)
+                    floor_n += 1
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not block or (remaining is not None and remaining <= 0):
+                self._set_writer_state(head, n_put, floor, floor_n)
+                raise Full
+            time.sleep(self.poll_interval)
+
+        self._set_writer_state(head, n_put, floor, floor_n)
+        self._write(head, self._LEN.pack(len(data)))
+        self._write(head + self._LEN.size, data)
+        self._set_writer_state(head + size, n_put + 1, floor, floor_n)
+        for i in range(self.n_readers):
+            try:
+                os.write(self._fd(i), b"\0")
+            except BlockingIOError:
+                pass  # pipe is full, so a wakeup is already pending
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def close(self):
+        """Release this process' handles on the log."""
+        for fd in self._fds or []:
+            if fd is not None:
+                os.close(fd)
+        self._fds = None
+        self._shm.close()
+
+    def unlink(self):
+        """Destroy the shared memory segment and wakeup pipes.
+
+        Should be called once, by the process that created the log.
+        """
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        for path in self.fifo_paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class BroadcastReader(object):
+    """One consumer's end of a BroadcastQueue.
+
+    Implements the same subset of the Queue interface as ShmQueue.
+    """
+
+    def __init__(self, log, index):
+        self.log = log
+        self.index = index
+        self._skipped = 0
+
+    @property
+    def poll_interval(self):
+        return self.log.poll_interval
+
+    def fileno(self):
+        """File descriptor that becomes readable when an item is put."""
+        return self.log._fd(self.index)
+
+    def clear_wakeups(self):
+        try:
+            while os.read(self.fileno(), 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def take_dropped(self):
+        """Number of items skipped because the producer overwrote them
+        since the last call
+        """
+        n, self._skipped = self._skipped, 0
+        return n
+
+    def get(self, block=True, timeout=None):
+        log = self.log
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            head, _, floor, floor_n = log._writer_state()
+            pos, n = log._reader_state(self.index)
+            if pos < floor:
+                # overrun by the producer: skip to the oldest intact item
+                self._skipped += floor_n - n
+                pos, n = floor, floor_n
+                log._set_reader_state(self.index, pos, n)
+            if pos != head:
+                (length,) = log._LEN.unpack(log._read(pos, log._LEN.size))
+                if length <= log.capacity:
+                    data = log._read(pos + log._LEN.size, length)
+                    if log._writer_state()[2] <= pos:
+                        log._set_reader_state(
+                            self.index, pos + log._LEN.size + length, n + 1
+                        )
+                        return pickle.loads(data)
+                continue  # overwritten while reading; skip ahead
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if not block or (remaining is not None and remaining <= 0):
+                raise Empty
+            readable, _, _ = select.select([self.fileno()], [], [], remaining)
+            if readable:
+                self.clear_wakeups()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        _, n_put, _, floor_n = self.log._writer_state()
+        return n_put - max(self.log._reader_state(self.index)[1], floor_n)
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def full(self):
+        return bool(self.log.maxsize) and self.qsize() >= self.log.maxsize
+
+    def close(self):
+        self.log.close()
+
+
+def FrameLink(
+    name,
+    start,
+    end,
+    shape,
+    dtype="uint16",
+    slots=DEFAULT_FRAME_SLOTS,
+    capacity=FRAME_REF_CAPACITY,
+    maxsize=0,
+    policy="block",
+):
+    """Function to construct a link that passes frames through a
+    FrameBuffer.
+
+    The producer puts numpy arrays of the given shape, or FrameRefs from
+    the buffer's claim() and publish(); either way only the FrameRef goes
+    through the link's shared-memory ring. The consumer gets FrameRefs
+    and reads the frames with link.frames.read(ref).
+
+    The buffer holds the newest slots frames, whatever the policy, so a
+    consumer more than slots frames behind loses frames: get skips
+    references to overwritten frames and counts them as dropped.
+
+    Args:
+        See ShmLink
+        shape (tuple): shape of every frame
+        dtype (str): numpy dtype of the frames
+        slots (int): number of frames the buffer holds
+
+    Returns:
+        FrameAsyncQueue: queue for passing frames between actors
+    """
+    frames = FrameBuffer(shape, dtype=dtype, slots=slots)
+    link = ShmLink(name, start, end, capacity, maxsize, policy)
+    return FrameAsyncQueue(
+        link.queue, frames, name, start, end, policy=link.policy, keep=link.keep
+    )
+
+
+def FrameMultiLink(
+    name,
+    start,
+    end,
+    shape,
+    dtype="uint16",
+    slots=DEFAULT_FRAME_SLOTS,
+    capacity=FRAME_REF_CAPACITY,
+    maxsize=0,
+    policy="block",
+):
+    """Function to generate a frame link for the multi-output case.
+
+    Every consumer reads the same FrameBuffer; the FrameRefs go through
+    a broadcast log, so maxsize and policy apply as for BroadcastLink.
+
+    Args:
+        See FrameLink
+
+    Returns:
+        FrameAsyncQueue: Producer end of the link
+        List: FrameAsyncQueues for consumers
+    """
+    frames = FrameBuffer(shape, dtype=dtype, slots=slots)
+    link, q_out = BroadcastLink(name, start, end, capacity, maxsize, policy)
+    q_out = [
+        FrameAsyncQueue(
+            q.queue, frames, name, start, q.end, policy=q.policy, keep=q.keep
+        )
+        for q in q_out
+    ]
+    return FrameAsyncQueue(link.queue, frames, name, start, end, policy=policy), q_out
+
+
+class FrameAsyncQueue(AsyncQueue):
+    """Link whose items are FrameRefs into a shared FrameBuffer.
+
+    Attributes:
+        frames (FrameBuffer): where the frames are
+    """
+
+    def __init__(self, q, frames, name, start, end, policy="block", keep=0):
+        super().__init__(q, name, start, end, policy=policy, keep=keep)
+        self.frames = frames
+
+    def __repr__(self):
+        return "FrameLink " + self.name
+
+    @property
+    def metric_name(self):
+        if isinstance(self.end, list):
+            return "link.{}->{}".format(self.name, ",".join(self.end))
+        return super().metric_name
+
+    def _ref(self, item):
+        if isinstance(item, FrameRef):
+            return item
+        return self.frames.write(item)
+
+    def put(self, item):
+        """Write a frame into the buffer, if it is not there already,
+        and pass on its FrameRef.
+
+        Args:
+            item (ndarray or FrameRef): the frame
+        """
+        return super().put(self._ref(item))
+
+    def put_nowait(self, item):
+        return super().put_nowait(self._ref(item))
+
+    async def put_async(self, item):
+        # write the frame once, not on every retry
+        return await super().put_async(self._ref(item))
+
+    def get(self, *args, **kwargs):
+        """Get the next FrameRef whose frame is still in the buffer
+
+        Returns:
+            FrameRef: pass to frames.read for the frame
+        """
+        while True:
+            ref = super().get(*args, **kwargs)
+            if self.frames.valid(ref):
+                return ref
+            self._dropped(1)
+
+    def get_nowait(self):
+        while True:
+            ref = super().get_nowait()
+            if self.frames.valid(ref):
+                return ref
+            self._dropped(1)
+
+    def _journaled(self, item):
+        # the frame, as the slot it is in will be reused
+        if isinstance(item, FrameRef):
+            try:
+                return self.frames.read(item, copy=True)
+            except FrameOverwrittenError:
+                pass
+        return item
+
+
+class ZmqQueue(object):
+    """Queue interface over a pair of ZMQ PUSH/PULL sockets.
+
+    The consumer binds a PULL socket and the producer connects a PUSH
+    socket to it (or the other way round, with producer_binds), so the
+    two ends can be on different machines. Each socket is made on first
+    use in the process that uses it, so the queue can be handed to
+    actors before they are started, wherever they run. Items are pickled
+    and sent as single-part messages.
+
+    maxsize is passed on as the sockets' high water marks, so a full
+    queue holds about maxsize items on each side of the connection.
+    """
+
+    # how long a closing socket may keep trying to deliver, in ms
+    LINGER = 1000
+
+    def __init__(
+        self, address, bind=None, maxsize=0, conflate=False, producer_binds=False
+    ):
+        """
+        Args:
+            address (str): endpoint the connecting end connects to
+            bind (str): endpoint the binding end binds, if different from
+                address (e.g. tcp://*:5600 where address names the host).
+                A port of * binds any free port, once open is called
+            maxsize (int): high water mark of each socket, 0 for no limit
+            conflate (bool): keep only the newest item on each side
+            producer_binds (bool): bind the producer's socket rather than
+                the consumer's
+        """
+        self.address = address
+        self.bind = bind or address
+        self.maxsize = maxsize
+        self.conflate = conflate
+        self.producer_binds = producer_binds
+        self._push = None
+        self._pull = None
+        self._pid = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.update(_push=None, _pull=None, _pid=None)
+        return state
+
+    def _socket(self, kind):
+        if self._pid != os.getpid():
+            # sockets can't be shared with a forked child
+            self._push = self._pull = None
+            self._pid = os.getpid()
+        binds = self.producer_binds == (kind == zmq.PUSH)
+        if kind == zmq.PUSH and self._push is None:
+            self._push = self._make_socket(zmq.PUSH, binds)
+        elif kind == zmq.PULL and self._pull is None:
+            self._pull = self._make_socket(zmq.PULL, binds)
+        return self._push if kind == zmq.PUSH else self._pull
+
+    def open(self):
+        """Make the binding end's socket in this process now, rather than
+        on first use. A wildcard port in bind and address is replaced by
+        the port that was bound, so open before handing the queue on.
+        """
+        self._socket(zmq.PUSH if self.producer_binds else zmq.PULL)
+
+    def _make_socket(self, kind, binds):
+        socket = zmq.Context.instance().socket(kind)
+        socket.setsockopt(zmq.LINGER, self.LINGER)
+        socket.setsockopt(zmq.SNDHWM, self.maxsize)
+        socket.setsockopt(zmq.RCVHWM, self.maxsize)
+        if self.conflate:
+            socket.setsockopt(zmq.CONFLATE, 1)
+        if not binds:
+            socket.connect(self.address)
+            return socket
+        socket.bind(self.bind)
+        if self.bind.endswith(":*"):
+            endpoint = socket.getsockopt_string(zmq.LAST_ENDPOINT)
+            port = endpoint.rsplit(":", 1)[1]
+            self.bind = self.bind[:-1] + port
+            if self.address.endswith(":*"):
+                self.address = self.address[:-1] + port
+        return socket
+
+    def _frames(self, data):
+        return [data]
+
+    def put(self, item, block=True, timeout=None):
+        socket = self._socket(zmq.PUSH)
+        frames = self._frames(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+        if block and timeout is not None:
+            if not socket.poll(timeout * 1000, zmq.POLLOUT):
+                raise Full
+        flags = 0 if block and timeout is None else zmq.NOBLOCK
+        try:
+            socket.send_multipart(frames, flags, copy=False)
+        except zmq.Again:
+            raise Full
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        socket = self._socket(zmq.PULL)
+        if block and timeout is not None:
+            if not socket.poll(timeout * 1000, zmq.POLLIN):
+                raise Empty
+        flags = 0 if block and timeout is None else zmq.NOBLOCK
+        try:
+            data = socket.recv(flags, copy=False)
+        except zmq.Again:
+            raise Empty
+        return pickle.loads(data.buffer)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        raise NotImplementedError("ZMQ sockets don't report their queue length")
+
+    def close(self):
+        if self._pid == os.getpid():
+            for socket in (self._push, self._pull):
+                if socket is not None:
+                    socket.close()
+        self._push = self._pull = None
+
+
+class ZmqPushQueue(ZmqQueue):
+    """The put side of a ZmqQueue whose items are sent tagged.
+
+    Each item is sent as a two-part message: the tag, then the item.
+    Many of these can push to one PULL socket that someone else binds,
+    which tells the senders apart by their tags.
+    """
+
+    def __init__(self, address, tag):
+        """
+        Args:
+            address (str): endpoint of the PULL socket to connect to
+            tag (str): sent ahead of every item
+        """
+        super().__init__(address)
+        self.tag = tag
+
+    def _frames(self, data):
+        return [self.tag.encode(), data]
@@ -0,0 +1,216 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class Histogram:
+    """Histogram of positive values (usually durations in seconds) with
+    power-of-two buckets, so that histograms from different processes
+    can be merged by adding up their counts.
+
+    Bucket 0 holds everything below lowest; bucket i holds values in
+    [lowest * 2**(i-1), lowest * 2**i); the last bucket holds the rest.
+    """
+
+    def __init__(self, lowest=1e-6, n_buckets=40):
+        self.lowest = lowest
+        self.buckets = [0] * n_buckets
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        if value < self.lowest:
+            i = 0
+        else:
+            i = min(int(math.log2(value / self.lowest)) + 1, len(self.buckets) - 1)
+        self.buckets[i] += 1
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other):
+        """Add the counts of another histogram (or its to_dict) to this one"""
+        if isinstance(other, dict):
+            other = Histogram.from_dict(other)
+        if other.lowest != self.lowest or len(other.buckets) != len(self.buckets):
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Estimate the q-th percentile (0-100) as the upper edge of the
+        bucket it falls in, clipped to the largest value seen.
+        """
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(self.lowest * 2**i, self.max)
+        return self.max
+
+    def summary(self):
+        if self.count == 0:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+        }
+
+    def to_dict(self):
+        return {
+            "lowest": self.lowest,
+            "buckets": list(self.buckets),
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        h = cls(d["lowest"], len(d["buckets"]))
+        h.buckets = list(d["buckets"])
+        h.count = d["count"]
+        h.sum = d["sum"]
+        h.min = d["min"]
+        h.max = d["max"]
+        return h
+
+
+class Metrics:
+    """Histograms, counters and gauges for one process, by name.
+
+    Links, RunManagers and store interfaces record into the registry
+    of the process they run in; actors send snapshots of it to Nexus,
+    which merges them with Metrics.merge. Any thread can record, such as
+    the threads of a pool sharing one store interface.
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.RLock()
+
+    def observe(self, name, value):
+        """Add a value to the histogram called name"""
+        with self._lock:
+            try:
+                self.histograms[name].add(value)
+            except KeyError:
+                self.histograms[name] = Histogram()
+                self.histograms[name].add(value)
+
+    def count(self, name, n=1):
+        """Add n to the counter called name"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        """Record the current value of the gauge called name, and its maximum"""
+        with self._lock:
+            last, highest = self.gauges.get(name, (value, value))
+            self.gauges[name] = (value, max(highest, value))
+
+    @contextmanager
+    def timer(self, name):
+        """Time the body of a with statement into the histogram called name"""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t)
+
+    def empty(self):
+        return not (self.histograms or self.counters or self.gauges)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def snapshot(self, reset=False):
+        """Picklable copy of everything recorded so far
+
+        Args:
+            reset (bool): start over afterwards, so that each snapshot
+                only holds what was recorded since the previous one
+        """
+        with self._lock:
+            snap = {
+                "histograms": {k: h.to_dict() for k, h in self.histograms.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+            if reset:
+                self.reset()
+        return snap
+
+    def merge(self, snap):
+        """Add a snapshot from another process to this one"""
+        with self._lock:
+            for name, h in snap["histograms"].items():
+                if name in self.histograms:
+                    self.histograms[name].merge(h)
+                else:
+                    self.histograms[name] = Histogram.from_dict(h)
+            for name, n in snap["counters"].items():
+                self.count(name, n)
+            for name, (last, highest) in snap["gauges"].items():
+                _, prev = self.gauges.get(name, (last, highest))
+                self.gauges[name] = (last, max(prev, highest))
+
+    def summary(self):
+        """Percentiles of each histogram plus the counters and gauges"""
+        with self._lock:
+            return {
+                "histograms": {k: h.summary() for k, h in self.histograms.items()},
+                "counters": dict(self.counters),
+                "gauges": {
+                    k: {"last": v[0], "max": v[1]} for k, v in self.gauges.items()
+                },
+            }
+
+    def dump(self, filename):
+        """Write the summary and full histograms to a JSON file"""
+        with open(filename, "w") as f:
+            json.dump(
+                {"summary": self.summary(), "snapshot": self.snapshot()},
+                f,
+                indent=2,
+            )
+        logger.info("Wrote metrics to {}".format(filename))
+
+
+# registry for the current process
+registry = Metrics()
+
+
+def _after_fork():
+    # another thread may have held the lock when the process forked
+    registry._lock = threading.RLock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
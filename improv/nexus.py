@@ -1,31 +1,104 @@
 import os
+import json
+import pickle
 import time
 import uuid
+import socket
 import signal
 import logging
 import asyncio
+import shutil
+import tempfile
+import threading
 import concurrent
 import subprocess
 
-from queue import Full
+from queue import Empty, Full
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from multiprocessing import Process, get_context
 from importlib import import_module
 
 import zmq.asyncio as zmq
-from zmq import PUB, REP, SocketOption
-
-from improv.store import StoreInterface, RedisStoreInterface, PlasmaStoreInterface
+from zmq import PUB, PULL, REP, NOBLOCK, Again, SocketOption
+from redis import Redis
+from redis.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import RedisError
+
+from improv.store import (
+    PERSIST_PREFIX,
+    StoreInterface,
+    RedisStoreInterface,
+    PlasmaStoreInterface,
+    ShmStoreInterface,
+)
 from improv.actor import Signal
-from improv.config import Config
-from improv.link import Link, MultiLink
+from improv.config import Config, ConfigModule
+from improv.journal import Journal, ReplayStore, Replayer, remove_journal
+from improv.link import LinkFactory, InboxLink, ZmqLink
+from improv.metrics import Metrics, registry
+from improv.worker import RemoteActor, check_token, is_loopback, request
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
+# minimum time in seconds between two metrics summaries on the output socket
+METRICS_PUBLISH_INTERVAL = 1.0
+
+# ring buffer size for shared-memory links between Nexus and the actors
+COMM_LINK_CAPACITY = 1024 * 1024  # bytes
+
+# longest time in seconds to wait for a new redis-server to answer a ping
+REDIS_START_TIMEOUT = 10.0
+
+# threads used to create links and actors at startup, unless the config
+# sets startup_workers
+STARTUP_WORKERS = 8
+
+# how often to check for exited processes of actors with the restart option
+SUPERVISE_INTERVAL = 1.0  # seconds
+# most times such an actor is restarted before Nexus gives up on it
+MAX_RESTARTS = 5
+
+# how long watchers get to save what they hold once told to quit
+WATCHER_QUIT_TIMEOUT = 10.0  # seconds
+
+# what Redis keeps if it or the server goes down: nothing; the objects
+# with a persisted key prefix, saved every snapshot_interval; or every
+# write, in an append-only file
+DURABILITY_MODES = ("none", "snapshot", "aof")
+SNAPSHOT_INTERVAL = 60.0  # seconds
+SNAPSHOT_FILE = "store_snapshot.pkl"
+
 # TODO: Set up store.notify in async function (?)
 
 
+def port_free(port):
+    """Whether a server could listen on a TCP port, checked by binding to it
+
+    Args:
+        port (int): port number
+
+    Returns:
+        bool: False if another process is listening on the port
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # as servers such as redis-server do, so that ports of recently
+        # closed connections count as free
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            s.bind(("", int(port)))
+        except OSError:
+            return False
+    return True
+
+
+def _redis_quote(value):
+    """value as a string for a Redis config file, every byte escaped"""
+    return '"{}"'.format("".join("\\x{:02x}".format(b) for b in value.encode()))
+
+
 class Nexus:
     """Main server class for handling objects in improv"""
 
@@ -36,6 +109,28 @@ class Nexus:
         self.name = name
         self.aof_dir = None
         self.redis_saving_enabled = False
+        # Unix socket the Redis server listens on besides its port, in a
+        # temporary directory of its own
+        self.store_socket = None
+        self.redis_durability = "none"
+        # saves the persisted objects when redis_durability is snapshot
+        self.snapshot_thread = None
+        self.snapshot_stop = threading.Event()
+        # what Redis evicts when it is full; None keeps Redis's default,
+        # noeviction, under which puts fail once the store is full
+        self.redis_maxmemory_policy = None
+        # the Redis server's password; only set when workers on other
+        # machines connect to it, see configure_redis_access
+        self.store_password = None
+        # metrics reported by the actors, merged over the whole run
+        self.metrics = Metrics()
+        self.metrics_published = 0.0
+        # seconds spent in each phase of createNexus
+        self.startup_times = {}
+        # whether actors have been sent run (and not stop since)
+        self.running = False
+        # times each actor has been restarted; see restartActor
+        self.restarts = {}
 
     def __str__(self):
         return self.name
@@ -65,6 +160,8 @@ class Nexus:
             string: "Shutting down", to notify start() that pollQueues has completed.
         """
 
+        started = t = time.perf_counter()
+        self.startup_times = {}
         curr_dt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         logger.info(f"************ new improv server session {curr_dt} ************")
 
@@ -88,6 +185,11 @@ class Nexus:
             cfg["control_port"] = control_port
         if "output_port" not in cfg or output_port != 0:
             cfg["output_port"] = output_port
+        if "link_managers" not in cfg:
+            cfg["link_managers"] = 1
+        if "startup_workers" not in cfg:
+            cfg["startup_workers"] = STARTUP_WORKERS
+        t = self._lap("config", t)
 
         # set up socket in lieu of printing to stdout
         self.zmq_context = zmq.Context()
@@ -102,13 +204,23 @@ class Nexus:
         in_port_string = self.in_socket.getsockopt_string(SocketOption.LAST_ENDPOINT)
         cfg["control_port"] = int(in_port_string.split(":")[-1])
 
+        # every comm link pushes to this one socket; see pollQueues
+        self.hostname = self.config.get_hostname()
+        self.inbox = self.zmq_context.socket(PULL)
+        inbox_port = self.inbox.bind_to_random_port(self._bindAddress())
+        self.inbox_address = "tcp://{}:{}".format(self.hostname, inbox_port)
+        # workers that have registered, by name; see registerWorker
+        self.workers = {}
+        t = self._lap("sockets", t)
+
         self.configure_redis_persistence()
+        self.configure_redis_access()
 
         # default size should be system-dependent
-        if self.config and self.config.use_plasma():
-            self._startStoreInterface(store_size)
+        if self.config and (self.config.use_plasma() or self.config.use_shm()):
+            self._startStoreInterface(cfg["store_size"])
         else:
-            self._startStoreInterface(store_size)
+            self._startStoreInterface(cfg["store_size"])
             logger.info("Redis server started")
 
         self.out_socket.send_string("StoreInterface started")
@@ -117,16 +229,23 @@ class Nexus:
         logger.info("Create new store object")
         if self.config and self.config.use_plasma():
             self.store = PlasmaStoreInterface(store_loc=self.store_loc)
+        elif self.config and self.config.use_shm():
+            self.store = self.p_StoreInterface
         else:
-            self.store = StoreInterface(server_port_num=self.store_port)
+            self.store = StoreInterface(
+                server_port_num=self.store_port,
+                unix_socket_path=self.store_socket,
+                password=self.store_password,
+            )
             logger.info(f"Redis server connected on port {self.store_port}")
+            if self.redis_durability == "snapshot":
+                self.startSnapshots()
 
         self.store.subscribe()
+        t = self._lap("store", t)
 
-        # TODO: Better logic/flow for using watcher as an option
-        self.p_watch = None
-        if cfg["use_watcher"]:
-            self.startWatcher()
+        # all links share this factory's Manager process(es)
+        self.link_factory = LinkFactory(n_managers=cfg["link_managers"])
 
         # Create dicts for reading config and creating actors
         self.comm_queues = {}
@@ -136,14 +255,50 @@ class Nexus:
         self.flags = {}
         self.processes = []
 
+        # use_watcher: true saves everything in the store; a list of
+        # actors saves what those actors flag (see initConfig)
+        self.p_watch = None
+        if cfg["use_watcher"] is True:
+            self.startWatcher()
+
+        # fed from a journal instead of the actors left out; see initConfig
+        self.replayer = None
+        self.replay_thread = None
+
         self.initConfig()
 
+        logger.info(
+            "Created {links} links on {manager_processes} Manager process(es) "
+            "in {seconds:.2f} seconds".format(**self.link_factory.stats())
+        )
+        self.startup_times["total"] = time.perf_counter() - started
+        logger.info(
+            "Startup took {:.2f} seconds ({})".format(
+                self.startup_times["total"],
+                ", ".join(
+                    "{} {:.2f}".format(phase, seconds)
+                    for phase, seconds in self.startup_times.items()
+                    if phase != "total"
+                ),
+            )
+        )
+
         self.flags.update({"quit": False, "run": False, "load": False})
         self.allowStart = False
         self.stopped = False
 
         return (cfg["control_port"], cfg["output_port"])
 
+    def _lap(self, phase, since):
+        """Record the time since a perf_counter reading as a startup phase
+
+        Returns:
+            float: the current perf_counter reading, to time the next phase
+        """
+        now = time.perf_counter()
+        self.startup_times[phase] = now - since
+        return now
+
     def loadConfig(self, file):
         """Load configuration file.
         file: a YAML configuration file name
@@ -175,8 +330,21 @@ class Nexus:
                 "Please see the log file for more details."
             )
 
+        # when replaying, only the replayed actors are created
+        self.replay = self.config.get_replay()
+        if self.replay is not None and self.replay["actors"] is None:
+            self.replay["actors"] = [
+                name
+                for name in Journal(self.replay["journal"]).actors()
+                if name in self.config.actors
+            ]
+        if self.replay is not None:
+            self._checkReplayLinks()
+
         # create all data links requested from Config config
+        t = time.perf_counter()
         self.createConnections()
+        t = self._lap("links", t)
 
         if self.config.hasGUI:
             # Have to load GUI first (at least with Caiman)
@@ -209,32 +377,143 @@ class Nexus:
 
         else:
             # have fake GUI for communications
-            q_comm = Link("GUI_comm", "GUI", self.name)
+            q_comm = InboxLink(self.inbox_address, "GUI_comm", "GUI", self.name)
             self.comm_queues.update({q_comm.name: q_comm})
 
-        # First set up each class/actor
-        for name, actor in self.config.actors.items():
-            if name not in self.actors.keys():
-                # Check for actors being instantiated twice
-                try:
-                    self.createActor(name, actor)
-                    logger.info(f"Setting up actor {name}")
-                except Exception as e:
-                    logger.error(f"Exception in setting up actor {name}: {e}.")
-                    self.quit()
+        # First set up each class/actor, several at a time
+        # Check for actors being instantiated twice
+        names = [
+            name
+            for name in self.config.actors
+            if name not in self.actors
+            and (self.replay is None or name in self.replay["actors"])
+        ]
+        with ThreadPoolExecutor(self._startupWorkers()) as pool:
+            futures = [
+                pool.submit(self.buildActor, name, self.config.actors[name])
+                for name in names
+            ]
+        for name, future in zip(names, futures):
+            try:
+                self.addActor(name, future.result())
+                logger.info(f"Setting up actor {name}")
+            except Exception as e:
+                logger.error(f"Exception in setting up actor {name}: {e}.")
+                self.quit()
 
         # Second set up each connection b/t actors
         # TODO: error handling for if a user tries to use q_in without defining it
         for name, link in self.data_queues.items():
-            self.assignLink(name, link)
+            if name.split(".")[0] in self.actors:
+                self.assignLink(name, link)
 
-        if self.config.settings["use_watcher"]:
+        if self.replay is not None:
+            self.replayer = self.createReplayer()
+
+        if isinstance(self.config.settings["use_watcher"], list):
             watchin = []
             for name in self.config.settings["use_watcher"]:
-                watch_link = Link(name + "_watch", name, "Watcher")
+                watch_link = self.link_factory.Link(name + "_watch", name, "Watcher")
                 self.assignLink(name + ".watchout", watch_link)
                 watchin.append(watch_link)
             self.createWatcher(watchin)
+        self._lap("actors", t)
+
+    def createReplayer(self):
+        """Set up replaying the journals of the replayed actors
+
+        Links to replayed actors from actors that are not replayed are
+        fed from the journals; links between replayed actors work as
+        usual.
+
+        Returns:
+            improv.journal.Replayer: to run once the actors run
+        """
+        replayed = self.replay["actors"]
+        unknown = [name for name in replayed if name not in self.config.actors]
+        if unknown:
+            raise ValueError("Cannot replay unknown actors {}".format(unknown))
+
+        links = {}
+        for source, drain in self.config.connections.items():
+            if source.split(".")[0] in replayed:
+                continue
+            for d in drain:
+                name, link = d.split(".", 1)
+                if name in replayed:
+                    links.setdefault(name, {})[link] = self.data_queues[d]
+        logger.info(
+            "Replaying {} to {} at {}".format(
+                self.replay["journal"],
+                ", ".join(replayed),
+                (
+                    "{}x speed".format(self.replay["speed"])
+                    if self.replay["speed"]
+                    else "full speed"
+                ),
+            )
+        )
+        return Replayer(
+            Journal(self.replay["journal"]), links, speed=self.replay["speed"]
+        )
+
+    def _checkReplayLinks(self):
+        """Make sure the replayer can feed every link it has to
+
+        The consumer ends of broadcast links, and of frames links with
+        several consumers, all read one shared log and cannot be put to,
+        so actors cannot be replayed through them.
+
+        Raises:
+            ValueError: a replayed actor is fed through such a link by
+                an actor that is not replayed
+        """
+        replayed = self.replay["actors"]
+        for source, drain in self.config.connections.items():
+            if source.split(".")[0] in replayed:
+                continue
+            options = self.config.connection_options.get(source, {})
+            link_type = options.get("type", "manager")
+            shared = link_type == "broadcast" or (
+                link_type == "frames" and len(drain) > 1
+            )
+            targets = [d for d in drain if d.split(".")[0] in replayed]
+            if shared and targets:
+                raise ValueError(
+                    "Cannot replay to {} through {} link {}".format(
+                        ", ".join(targets), link_type, source
+                    )
+                )
+
+    def _startupWorkers(self):
+        """Number of threads to create links and actors with"""
+        if self.config is None:
+            return STARTUP_WORKERS
+        return max(1, int(self.config.settings.get("startup_workers", STARTUP_WORKERS)))
+
+    def configure_redis_access(self):
+        """Let workers on other machines reach the Redis store
+
+        Redis only answers clients on this machine unless it has a
+        password, so when actors run on workers and Nexus is reached over
+        the network, it also listens at the configured hostname and
+        requires the worker token as its password.
+
+        Raises:
+            ValueError: actors run on workers over the network, but no
+                worker_token is set
+        """
+        self.store_password = None
+        if not self.config or not self.config.has_remote_actors():
+            return
+        if is_loopback(self.hostname):
+            return
+        if not self.config.get_worker_token():
+            raise ValueError(
+                "Workers reached over the network need settings: worker_token, "
+                "which is also the Redis store's password"
+            )
+        self.store_password = self.config.get_worker_token()
 
     def configure_redis_persistence(self):
         # invalid configs: specifying filename and using an ephemeral filename,
@@ -259,8 +538,39 @@ class Nexus:
                 )
                 raise Exception("Cannot persist to disk with saving disabled.")
 
+        durability = self.config.get_redis_durability()
+        if durability is None:
+            durability = "aof" if redis_saving_enabled else "none"
+        if durability not in DURABILITY_MODES:
+            logger.error("Unknown durability mode {}".format(durability))
+            raise ValueError("Unknown durability mode {}".format(durability))
+        if durability == "aof":
+            if redis_saving_enabled is False:
+                logger.error(
+                    "Invalid configuration. Cannot save to disk with saving disabled."
+                )
+                raise ValueError("Cannot persist to disk with saving disabled.")
+            redis_saving_enabled = True
+        elif redis_saving_enabled:
+            logger.error(
+                "Invalid configuration. Append-only saving needs durability aof."
+            )
+            raise ValueError("Cannot save every write with durability " + durability)
+        self.redis_durability = durability
+        self.snapshot_prefixes = self.config.get_redis_persist_prefixes() or [
+            PERSIST_PREFIX
+        ]
+        self.snapshot_interval = float(
+            self.config.get_redis_snapshot_interval() or SNAPSHOT_INTERVAL
+        )
+        self.snapshot_file = self.config.get_redis_snapshot_file() or SNAPSHOT_FILE
+
         self.redis_saving_enabled = redis_saving_enabled
 
+        redis_maxmemory_policy = self.config.get_redis_maxmemory_policy()
+        if redis_maxmemory_policy:
+            self.redis_maxmemory_policy = redis_maxmemory_policy
+
         if redis_fsync_frequency and redis_fsync_frequency not in [
             "every_write",
             "every_second",
@@ -302,33 +612,63 @@ class Nexus:
                 + "on schedule "
                 + "'{}'".format(self.redis_fsync_frequency)
             )
+        elif self.redis_durability == "snapshot":
+            logger.info(
+                "Saving objects with key prefixes {} to {} every {} seconds".format(
+                    self.snapshot_prefixes, self.snapshot_file, self.snapshot_interval
+                )
+            )
         else:
             logger.info("Redis saving disabled.")
 
         return
 
+    def startSnapshots(self):
+        """Put back the objects in the last snapshot, if there is one, and
+        save a new snapshot every snapshot_interval seconds from now on
+        """
+        if os.path.exists(self.snapshot_file):
+            n = self.store.restore_snapshot(self.snapshot_file)
+            logger.info("Restored {} objects from {}".format(n, self.snapshot_file))
+        self.snapshot_stop.clear()
+        self.snapshot_thread = threading.Thread(
+            target=self._takeSnapshots, name="Snapshots", daemon=True
+        )
+        self.snapshot_thread.start()
+
+    def _takeSnapshots(self):
+        while not self.snapshot_stop.wait(self.snapshot_interval):
+            self.snapshotStore()
+
+    def stopSnapshots(self):
+        """Stop taking snapshots, after a last one"""
+        if self.snapshot_thread is None:
+            return
+        self.snapshot_stop.set()
+        self.snapshot_thread.join()
+        self.snapshot_thread = None
+        self.snapshotStore()
+
+    def snapshotStore(self):
+        """Save the objects with persisted key prefixes to snapshot_file"""
+        try:
+            with registry.timer("store.snapshot"):
+                n = self.store.snapshot(self.snapshot_file, self.snapshot_prefixes)
+            logger.info("Saved {} objects to {}".format(n, self.snapshot_file))
+        except (RedisError, OSError) as e:
+            logger.warning("Could not snapshot the store: {}".format(e))
+
     def startNexus(self):
         """
         Puts all actors in separate processes and begins polling
         to listen to comm queues
         """
         for name, m in self.actors.items():
+            if isinstance(m, RemoteActor):
+                # started when its worker registers
+                continue
             if "GUI" not in name:  # GUI already started
-                if "method" in self.config.actors[name].options:
-                    meth = self.config.actors[name].options["method"]
-                    logger.info("This actor wants: {}".format(meth))
-                    ctx = get_context(meth)
-                    p = ctx.Process(target=m.run, name=name)
-                else:
-                    ctx = get_context("fork")
-                    p = ctx.Process(target=self.runActor, name=name, args=(m,))
-                    if "Watcher" not in name:
-                        if "daemon" in self.config.actors[name].options:
-                            p.daemon = self.config.actors[name].options["daemon"]
-                            logger.info("Setting daemon for {}".format(name))
-                        else:
-                            p.daemon = True  # default behavior
-                self.processes.append(p)
+                self.processes.append(self._actorProcess(name, m))
 
         self.start()
 
@@ -351,6 +691,33 @@ class Nexus:
         logger.info("Shutdown loop")
         self.zmq_context.destroy()
 
+    def _actorProcess(self, name, m):
+        """Create the process to run an actor in, as its options ask
+
+        Args:
+            name: name of the actor
+            m: the actor
+
+        Returns:
+            multiprocessing.Process: the process, not yet started
+        """
+        options = self.config.actors[name].options
+        if "method" in options:
+            meth = options["method"]
+            logger.info("This actor wants: {}".format(meth))
+            ctx = get_context(meth)
+            p = ctx.Process(target=m.run, name=name)
+        else:
+            ctx = get_context("fork")
+            p = ctx.Process(target=self.runActor, name=name, args=(m,))
+            if "Watcher" not in name:
+                if "daemon" in options:
+                    p.daemon = options["daemon"]
+                    logger.info("Setting daemon for {}".format(name))
+                else:
+                    p.daemon = True  # default behavior
+        return p
+
     def start(self):
         """
         Start all the processes in Nexus
@@ -368,9 +735,10 @@ class Nexus:
         to kill the process running the store (plasma server)
         """
         logger.warning("Destroying Nexus")
+        self.stopSnapshots()
         self._closeStoreInterface()
 
-        if hasattr(self, "store_loc"):
+        if hasattr(self, "store_loc") and self.use_plasma:
             try:
                 os.remove(self.store_loc)
             except FileNotFoundError:
@@ -379,10 +747,15 @@ class Nexus:
                 )
             logger.warning("Delete the store at location {0}".format(self.store_loc))
 
+        if hasattr(self, "link_factory"):
+            self.link_factory.shutdown()
+
         if hasattr(self, "out_socket"):
             self.out_socket.close(linger=0)
         if hasattr(self, "in_socket"):
             self.in_socket.close(linger=0)
+        if hasattr(self, "inbox"):
+            self.inbox.close(linger=0)
         if hasattr(self, "zmq_context"):
             self.zmq_context.destroy(linger=0)
 
@@ -390,11 +763,12 @@ class Nexus:
         """
         Listens to links and processes their signals.
 
-        For every communications queue connected to Nexus, a task is
-        created that gets from the queue. Throughout runtime, when these
-        queues output a signal, they are processed by other functions.
-        At the end of runtime (when the gui has been closed), polling is
-        stopped.
+        The comm links of all actors (and of the GUI) push to a single
+        inbox socket, tagged with the link's name, so one task waits on
+        the inbox and another on the control port. Whenever the inbox
+        has input, everything queued in it is processed before waiting
+        again. At the end of runtime (when the gui has been closed),
+        polling is stopped.
 
         Returns:
             string: "Shutting down", Notifies start() that pollQueues has completed.
@@ -407,22 +781,17 @@ class Nexus:
             except Exception as e:
                 logger.info("Visual is not started: {0}".format(e))
                 pass
-        polling = list(self.comm_queues.values())
-        pollingNames = list(self.comm_queues.keys())
-        self.tasks = []
-        for q in polling:
-            self.tasks.append(asyncio.create_task(q.get_async()))
-
-        self.tasks.append(asyncio.create_task(self.remote_input()))
+        inbox_task = self.inbox.recv_multipart()
+        remote_task = asyncio.create_task(self.remote_input())
+        supervise_task = asyncio.create_task(self.superviseActors())
+        self.tasks = [inbox_task, remote_task, supervise_task]
         self.early_exit = False
 
         # add signal handlers
         loop = asyncio.get_event_loop()
         signals = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT)
         for s in signals:
-            loop.add_signal_handler(
-                s, lambda s=s: self.stop_polling_and_quit(s, polling)
-            )
+            loop.add_signal_handler(s, lambda s=s: self.stop_polling_and_quit(s))
 
         while not self.flags["quit"]:
             try:
@@ -432,44 +801,57 @@ class Nexus:
             except asyncio.CancelledError:
                 pass
 
-            # sort through tasks to see where we got input from
-            # (so we can choose a handler)
-            for i, t in enumerate(self.tasks):
-                if i < len(polling):
-                    if t in done or polling[i].status == "done":
-                        # catch tasks that complete await wait/gather
-                        r = polling[i].result
-                        if r:
-                            if "GUI" in pollingNames[i]:
-                                self.processGuiSignal(r, pollingNames[i])
-                            else:
-                                self.processActorSignal(r, pollingNames[i])
-                            self.tasks[i] = asyncio.create_task(polling[i].get_async())
-                elif t in done:
-                    logger.debug("t.result = " + str(t.result()))
-                    self.tasks[i] = asyncio.create_task(self.remote_input())
+            if inbox_task in done:
+                self.processInbox(inbox_task.result())
+                # drain whatever else arrived before waiting again
+                while not self.flags["quit"]:
+                    try:
+                        msg = self.inbox.recv_multipart(NOBLOCK).result()
+                    except Again:
+                        break
+                    self.processInbox(msg)
+                inbox_task = self.inbox.recv_multipart()
+            if remote_task in done:
+                logger.debug("t.result = " + str(remote_task.result()))
+                remote_task = asyncio.create_task(self.remote_input())
+            self.tasks = [inbox_task, remote_task, supervise_task]
 
         if not self.early_exit:  # don't run this again if we already have
-            self.stop_polling(Signal.quit(), polling)
+            self.stop_polling(Signal.quit())
             logger.warning("Shutting down polling")
         return "Shutting Down"
 
-    def stop_polling_and_quit(self, signal, queues):
+    def processInbox(self, msg):
+        """Hand a message from the inbox to the handler for its sender
+
+        Args:
+            msg (list): the link name and the pickled item, as sent by
+                an InboxLink
+        """
+        name = msg[0].decode()
+        try:
+            q = self.comm_queues[name]
+        except KeyError:
+            logger.warning("Message from unknown link {}".format(name))
+            return
+        r = q.received(pickle.loads(msg[1]))
+        if r:
+            if "GUI" in name:
+                self.processGuiSignal(r, name)
+            else:
+                self.processActorSignal(r, name)
+
+    def stop_polling_and_quit(self, signal):
         """
         quit the process and stop polling signals from queues
 
         Args:
             signal (signal): Signal for handling async polling.
                              One of: signal.SIGHUP, signal.SIGTERM, signal.SIGINT
-            queues (improv.link.AsyncQueue): Comm queues for links.
         """
-        logger.warn(
-            "Shutting down via signal handler due to {}. \
-                Steps may be out of order or dirty.".format(
-                signal
-            )
-        )
-        self.stop_polling(signal, queues)
+        logger.warn("Shutting down via signal handler due to {}. \
+                Steps may be out of order or dirty.".format(signal))
+        self.stop_polling(signal)
         self.flags["quit"] = True
         self.early_exit = True
         self.quit()
@@ -477,6 +859,20 @@ class Nexus:
     async def remote_input(self):
         msg = await self.in_socket.recv_multipart()
         command = msg[0].decode("utf-8")
+        if command == Signal.register():
+            token = msg[3] if len(msg) > 3 else b""
+            if len(msg) < 3 or not check_token(self.config.get_worker_token(), token):
+                logger.warning("Refused a worker registration without the token")
+                await self.in_socket.send_string("Refused: bad token")
+                return
+            name = msg[1].decode()
+            if name not in self._workerNames():
+                logger.warning("Refused unknown worker {}".format(name))
+                await self.in_socket.send_string("Refused: unknown worker")
+                return
+            await self.in_socket.send_string("Registered")
+            self.registerWorker(name, msg[2].decode())
+            return
         await self.in_socket.send_string("Awaiting input:")
         if command == Signal.quit():
             await self.out_socket.send_string("QUIT")
@@ -513,41 +909,7 @@ class Nexus:
                 # TODO: specify actor to kill
                 list(self.processes)[0].kill()
             elif flag[0] == Signal.revive():
-                dead = [p for p in list(self.processes) if p.exitcode is not None]
-                for pro in dead:
-                    name = pro.name
-                    m = self.actors[pro.name]
-                    actor = self.config.actors[name]
-                    if "GUI" not in name:  # GUI hard to revive independently
-                        if "method" in actor.options:
-                            meth = actor.options["method"]
-                            logger.info("This actor wants: {}".format(meth))
-                            ctx = get_context(meth)
-                            p = ctx.Process(target=m.run, name=name)
-                        else:
-                            ctx = get_context("fork")
-                            p = ctx.Process(target=self.runActor, name=name, args=(m,))
-                            if "Watcher" not in name:
-                                if "daemon" in actor.options:
-                                    p.daemon = actor.options["daemon"]
-                                    logger.info("Setting daemon for {}".format(name))
-                                else:
-                                    p.daemon = True
-
-                    # Setting the stores for each actor to be the same
-                    # TODO: test if this works for fork -- don't think it does?
-                    al = [act for act in self.actors.values() if act.name != pro.name]
-                    m.setStoreInterface(al[0].client)
-                    m.client = None
-                    m._getStoreInterface()
-
-                    self.processes.append(p)
-                    p.start()
-                    m.q_sig.put_nowait(Signal.setup())
-                    # TODO: ensure waiting for ready before run?
-                    m.q_sig.put_nowait(Signal.run())
-
-                self.processes = [p for p in list(self.processes) if p.exitcode is None]
+                self.revive()
             elif flag[0] == Signal.stop():
                 logger.info("Nexus received stop signal")
                 self.stop()
@@ -555,7 +917,10 @@ class Nexus:
             logger.error("Unknown signal received from Nexus: {}".format(flag))
 
     def processActorSignal(self, sig, name):
-        if sig is not None:
+        if sig is not None and sig[0] == Signal.metrics():
+            self.metrics.merge(sig[1])
+            self.publishMetrics()
+        elif sig is not None:
             logger.info("Received signal " + str(sig[0]) + " from " + name)
             state_val = self.actorStates.values()
             if not self.stopped and sig[0] == Signal.ready():
@@ -572,6 +937,19 @@ class Nexus:
                     self.stoppped = False
                     logger.info("All stops were successful. Allowing start.")
 
+    def publishMetrics(self, force=False):
+        """Send a summary of the metrics so far on the output socket,
+        at most once every METRICS_PUBLISH_INTERVAL seconds unless forced
+        """
+        now = time.time()
+        if not force and now - self.metrics_published < METRICS_PUBLISH_INTERVAL:
+            return
+        self.metrics_published = now
+        self.metrics.merge(registry.snapshot(reset=True))
+        self.out_socket.send_multipart(
+            [b"METRICS", json.dumps(self.metrics.summary()).encode("utf-8")]
+        )
+
     def setup(self):
         for q in self.sig_queues.values():
             try:
@@ -582,6 +960,7 @@ class Nexus:
 
     def run(self):
         if self.allowStart:
+            self.running = True
             for q in self.sig_queues.values():
                 try:
                     q.put_nowait(Signal.run())
@@ -589,6 +968,11 @@ class Nexus:
                     logger.warning("Signal queue" + q.name + "is full")
                     # queue full, keep going anyway
                     # TODO: add repeat trying as async task
+            if self.replayer is not None and self.replay_thread is None:
+                self.replay_thread = threading.Thread(
+                    target=self.replayer.run, name="Replayer", daemon=True
+                )
+                self.replay_thread.start()
         else:
             logger.error("Not all actors ready yet, please wait and then try again.")
 
@@ -596,6 +980,9 @@ class Nexus:
         logger.warning("Killing child processes")
         self.out_socket.send_string("QUIT")
 
+        if self.replayer is not None:
+            self.replayer.stop()
+
         for q in self.sig_queues.values():
             try:
                 q.put_nowait(Signal.quit())
@@ -607,20 +994,49 @@ class Nexus:
         if self.config.hasGUI:
             self.processes.append(self.p_GUI)
 
-        if self.p_watch:
-            self.processes.append(self.p_watch)
+        # watchers finish writing what they hold once they get quit
+        for p in self.processes:
+            if p.name in ("Watcher", "watcher_process"):
+                p.join(WATCHER_QUIT_TIMEOUT)
 
         for p in self.processes:
             p.terminate()
             p.join()
 
+        for name, address in self.workers.items():
+            try:
+                request(address, [Signal.quit().encode(), self._workerToken()])
+            except TimeoutError:
+                logger.warning("Worker {} did not answer quit".format(name))
+        self.workers = {}
+
         logger.warning("Actors terminated")
 
+        if self.store is not None and hasattr(self.store, "stats"):
+            try:
+                logger.info("Store usage at quit: {}".format(self.store.stats()))
+            except Exception as e:
+                logger.warning("Could not read store usage: {}".format(e))
+
+        dropped = {
+            name: n
+            for name, n in self.metrics.counters.items()
+            if name.endswith(".dropped")
+        }
+        if dropped:
+            logger.warning("Items dropped by full links: {}".format(dropped))
+
+        metrics_file = self.config.get_metrics_file()
+        if metrics_file:
+            self.metrics.merge(registry.snapshot(reset=True))
+            self.metrics.dump(metrics_file)
+
         self.destroyNexus()
 
     def stop(self):
         logger.warning("Starting stop procedure")
         self.allowStart = False
+        self.running = False
 
         for q in self.sig_queues.values():
             try:
@@ -630,28 +1046,90 @@ class Nexus:
         self.allowStart = True
 
     def revive(self):
+        """Restart the processes of all actors that have exited"""
         logger.warning("Starting revive")
+        for p in list(self.processes):
+            if p.exitcode is not None and "GUI" not in p.name:
+                self.restartActor(p.name)
 
-    def stop_polling(self, stop_signal, queues):
-        """Cancels outstanding tasks and fills their last request.
+    async def superviseActors(self):
+        """Restart actors with the restart option whose processes exit
 
-        Puts a string into all active queues, then cancels their
-        corresponding tasks. These tasks are not fully cancelled until
-        the next run of the event loop.
+        Each is restarted at most MAX_RESTARTS times.
+        """
+        while not self.flags["quit"]:
+            await asyncio.sleep(SUPERVISE_INTERVAL)
+            for p in list(self.processes):
+                if self.flags["quit"]:
+                    break
+                if p.exitcode is None or p.name not in self.config.actors:
+                    continue
+                if not self.config.actors[p.name].options.get("restart"):
+                    continue
+                if self.restarts.get(p.name, 0) >= MAX_RESTARTS:
+                    logger.error(
+                        "Actor {} exited with code {}; restarted {} times "
+                        "already, so not again".format(p.name, p.exitcode, MAX_RESTARTS)
+                    )
+                    self.processes.remove(p)
+                    continue
+                logger.warning(
+                    "Actor {} exited with code {}".format(p.name, p.exitcode)
+                )
+                self.restartActor(p.name)
+
+    def restartActor(self, name):
+        """Start a new process for an actor whose process has exited
+
+        The actor keeps its links and gets a new store client (unless it
+        is spawned, in which case it connects to the store itself). It is
+        sent restore, to pick up from its last checkpoint if it has one
+        (see AbstractActor.checkpoint) or else be set up again, and then
+        run if the other actors are running.
+
+        Args:
+            name: name of the actor
+        """
+        m = self.actors[name]
+        self.processes = [p for p in self.processes if p.name != name]
+        options = self.config.actors[name].options
+        if options.get("method", "fork") == "fork":
+            m.setStoreInterface(self.createStoreInterface(name))
+
+        # drop signals the exited process never read
+        while True:
+            try:
+                m.q_sig.get_nowait()
+            except Empty:
+                break
+
+        p = self._actorProcess(name, m)
+        self.processes.append(p)
+        p.start()
+        self.restarts[name] = self.restarts.get(name, 0) + 1
+        self.metrics.count("actor.{}.restarts".format(name))
+        logger.warning(
+            "Restarted actor {} ({} restart(s))".format(name, self.restarts[name])
+        )
+
+        if hasattr(self, "actorStates"):
+            self.actorStates[name] = None
+        m.q_sig.put_nowait(Signal.restore())
+        if self.running:
+            m.q_sig.put_nowait(Signal.run())
+
+    def stop_polling(self, stop_signal):
+        """Cancels outstanding tasks.
+
+        The tasks are not fully cancelled until the next run of the
+        event loop.
 
         Args:
             stop_signal (improv.actor.Signal): Signal for signal handler.
-            queues (improv.link.AsyncQueue): Comm queues for links.
         """
         logger.info("Received shutdown order")
 
         logger.info(f"Stop signal: {stop_signal}")
-        shutdown_message = Signal.quit()
-        for q in queues:
-            try:
-                q.put(shutdown_message)
-            except Exception:
-                logger.info("Unable to send shutdown message to {}.".format(q.name))
 
         logger.info("Canceling outstanding tasks")
 
@@ -663,18 +1141,32 @@ class Nexus:
         """Creates StoreInterface"""
         if self.config.use_plasma():
             return PlasmaStoreInterface(name, self.store_loc)
+        elif self.config.use_shm():
+            return ShmStoreInterface(name, self.store_loc)
         else:
-            return RedisStoreInterface(server_port_num=self.store_port)
+            return RedisStoreInterface(
+                server_port_num=self.store_port,
+                unix_socket_path=self.store_socket,
+                password=self.store_password,
+            )
 
-    def _startStoreInterface(self, size, attempts=20):
-        """Start a subprocess that runs the plasma store
+    def _startStoreInterface(self, size, attempts=20, timeout=REDIS_START_TIMEOUT):
+        """Start a subprocess that runs the plasma store, or create the
+        shared memory arena for the shm store
         Raises a RuntimeError exception size is undefined
         Raises an Exception if the plasma store doesn't start
 
         #TODO: Generalize this to non-plasma stores
 
+        A Redis store is started on the first free port from the
+        configured (or default) one, found without starting a server on
+        each port, and is ready once it answers a ping.
+
         Args:
             size: in bytes
+            attempts: most redis-servers to start when the port is not
+                specified, in case another process takes a free port first
+            timeout: longest time in seconds to wait for each to answer
 
         Raises:
             RuntimeError: if the size is undefined
@@ -701,8 +1193,19 @@ class Nexus:
                 stderr=subprocess.DEVNULL,
             )
             logger.info("StoreInterface start successful: {}".format(self.store_loc))
+        elif self.config and self.config.use_shm():
+            # no server process; Nexus owns the arena and unlinks it on close
+            self.p_StoreInterface = ShmStoreInterface.create(
+                size, n_slots=self.config.get_shm_slots()
+            )
+            self.store_loc = self.p_StoreInterface.store_loc
+            logger.info("StoreInterface start successful: {}".format(self.store_loc))
         else:
             logger.info("Setting up Redis store.")
+            if self.config is None or self.config.get_redis_unix_socket() is not False:
+                self.store_socket = os.path.join(
+                    tempfile.mkdtemp(prefix="improv_redis_"), "redis.sock"
+                )
             self.store_port = (
                 self.config.get_redis_port()
                 if self.config and self.config.redis_port_specified()
@@ -712,37 +1215,108 @@ class Nexus:
                 logger.info(
                     "Attempting to connect to Redis on port {}".format(self.store_port)
                 )
-                # try with failure, incrementing port number
+                if not port_free(self.store_port):
+                    logger.error("Could not start Redis on specified port number.")
+                    raise Exception("Could not start Redis on specified port.")
                 self.p_StoreInterface = self.start_redis(size)
-                time.sleep(3)
-                if self.p_StoreInterface.poll():
+                if not self._waitForRedis(timeout):
                     logger.error("Could not start Redis on specified port number.")
                     raise Exception("Could not start Redis on specified port.")
             else:
                 logger.info("Redis port not specified. Searching for open port.")
+                port = int(self.store_port)
                 for attempt in range(attempts):
+                    # look for a free port first, so only one redis-server
+                    # is started unless another process takes the port
+                    while port < 65536 and not port_free(port):
+                        logger.info("Port {} is in use".format(port))
+                        port += 1
+                    self.store_port = str(port)
                     logger.info(
                         "Attempting to connect to Redis on port {}".format(
                             self.store_port
                         )
                     )
-                    # try with failure, incrementing port number
                     self.p_StoreInterface = self.start_redis(size)
-                    time.sleep(3)
-                    if self.p_StoreInterface.poll():  # Redis could not start
-                        logger.info(
-                            "Could not connect to port {}".format(self.store_port)
-                        )
-                        self.store_port = str(int(self.store_port) + 1)
-                    else:
+                    if self._waitForRedis(timeout):
                         break
+                    logger.info("Could not connect to port {}".format(self.store_port))
+                    port += 1
                 else:
                     logger.error("Could not start Redis on any tried port.")
                     raise Exception("Could not start Redis on any tried ports.")
 
             logger.info(f"StoreInterface start successful on port {self.store_port}")
 
+    def _waitForRedis(self, timeout=REDIS_START_TIMEOUT):
+        """Ping the redis-server just started until it answers
+
+        Args:
+            timeout: longest time in seconds to wait
+
+        Returns:
+            bool: whether it answered; if not, it has exited (e.g. because
+            its port was taken) or has been stopped
+        """
+        client = Redis(
+            port=int(self.store_port),
+            password=self.store_password,
+            socket_connect_timeout=0.1,
+            socket_timeout=1.0,
+            retry=Retry(NoBackoff(), 0),
+        )
+        deadline = time.perf_counter() + timeout
+        try:
+            while self.p_StoreInterface.poll() is None:
+                try:
+                    if client.ping():
+                        return True
+                except RedisError:
+                    # not listening yet, or still loading its append-only file
+                    pass
+                if time.perf_counter() > deadline:
+                    logger.error(
+                        "Redis did not answer within {} seconds".format(timeout)
+                    )
+                    self.p_StoreInterface.kill()
+                    self.p_StoreInterface.wait()
+                    return False
+                time.sleep(0.01)
+            return False
+        finally:
+            client.close()
+
     def start_redis(self, size):
+        subprocess_command = self.redis_command(size)
+        logger.info(
+            "Starting Redis server with command: \n {}".format(subprocess_command)
+        )
+        process = subprocess.Popen(
+            subprocess_command,
+            stdin=None if self.store_password is None else subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if self.store_password is not None:
+            # given on stdin, as the config file "-", so that it is not
+            # on the command line for other users to see
+            try:
+                process.stdin.write(
+                    "requirepass {}\n".format(
+                        _redis_quote(self.store_password)
+                    ).encode()
+                )
+                process.stdin.close()
+            except BrokenPipeError:
+                pass  # it has exited, e.g. because its port was taken
+        return process
+
+    def redis_command(self, size):
+        """The command line start_redis starts redis-server with
+
+        Args:
+            size: most memory in bytes Redis uses for the store
+        """
         subprocess_command = [
             "redis-server",
             "--port",
@@ -752,6 +1326,16 @@ class Nexus:
             "--save",  # this only turns off RDB, which we want permanently off
             '""',
         ]
+        if self.redis_maxmemory_policy is not None:
+            subprocess_command += ["--maxmemory-policy", self.redis_maxmemory_policy]
+        if self.store_socket is not None:
+            # only this user's processes can connect through it
+            subprocess_command += [
+                "--unixsocket",
+                self.store_socket,
+                "--unixsocketperm",
+                "700",
+            ]
 
         if self.aof_dir is not None and len(self.aof_dir) == 0:
             raise Exception("Persistence directory specified but no filename given.")
@@ -778,21 +1362,21 @@ class Nexus:
             ]
             logger.info("Proceeding with using default Redis dump file.")
 
-        logger.info(
-            "Starting Redis server with command: \n {}".format(subprocess_command)
-        )
+        if self.store_password is not None:
+            # for workers on other machines; the password comes on stdin
+            subprocess_command[1:1] = ["-"]
+            subprocess_command += ["--bind", "127.0.0.1", self.hostname]
 
-        return subprocess.Popen(
-            subprocess_command,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-        )
+        return subprocess_command
 
     def _closeStoreInterface(self):
         """Internal method to kill the subprocess
         running the store (plasma sever)
         """
-        if hasattr(self, "p_StoreInterface"):
+        if isinstance(getattr(self, "p_StoreInterface", None), ShmStoreInterface):
+            self.p_StoreInterface.unlink()
+            logger.info("StoreInterface close successful: {}".format(self.store_loc))
+        elif hasattr(self, "p_StoreInterface"):
             try:
                 self.p_StoreInterface.send_signal(signal.SIGINT)
                 self.p_StoreInterface.wait()
@@ -806,6 +1390,9 @@ class Nexus:
 
             except Exception as e:
                 logger.exception("Cannot close store {}".format(e))
+        if self.store_socket is not None:
+            shutil.rmtree(os.path.dirname(self.store_socket), ignore_errors=True)
+            self.store_socket = None
 
     def createActor(self, name, actor):
         """Function to instantiate actor, add signal and comm Links,
@@ -815,13 +1402,50 @@ class Nexus:
             name: name of the actor
             actor: improv.actor.Actor
         """
+        self.addActor(name, self.buildActor(name, actor))
+
+    def createWatcher(self, watchin):
+        """Create a BasicWatcher that saves what actors send to their
+        watchout links
+
+        Args:
+            watchin (list): links from the watched actors
+        """
+        options = {"inputs": watchin}
+        if self.config.get_watcher_file():
+            options["filename"] = self.config.get_watcher_file()
+        watcher = ConfigModule(
+            "Watcher", "improv.watcher", "BasicWatcher", options=options
+        )
+        self.config.actors["Watcher"] = watcher
+        self.createActor("Watcher", watcher)
+
+    def buildActor(self, name, actor):
+        """Instantiate an actor and give it its store and comm Links
+
+        Does not change Nexus' dictionaries, so several actors can be
+        built at once; see addActor.
+
+        Args:
+            name: name of the actor
+            actor: improv.config.ConfigModule
+
+        Returns:
+            improv.actor.Actor: the actor, or a RemoteActor standing in
+            for one that runs on a worker
+        """
+        if "host" in actor.options:
+            return self.buildRemoteActor(name, actor)
+
         # Instantiate selected class
         mod = import_module(actor.packagename)
         clss = getattr(mod, actor.classname)
-        if self.config.use_plasma():
+        if self.config.use_plasma() or self.config.use_shm():
             instance = clss(actor.name, store_loc=self.store_loc, **actor.options)
         else:
             instance = clss(actor.name, store_port_num=self.store_port, **actor.options)
+            instance.store_socket = self.store_socket
+            instance.store_password = self.store_password
 
         if "method" in actor.options.keys():
             # check for spawn
@@ -837,15 +1461,149 @@ class Nexus:
             store = self.createStoreInterface(actor.name)
             instance.setStoreInterface(store)
 
-        q_comm = Link(actor.name + "_comm", actor.name, self.name)
-        q_sig = Link(actor.name + "_sig", self.name, actor.name)
-        self.comm_queues.update({q_comm.name: q_comm})
-        self.sig_queues.update({q_sig.name: q_sig})
+        q_comm = InboxLink(
+            self.inbox_address, actor.name + "_comm", actor.name, self.name
+        )
+        q_sig = self.createCommLink(actor.name + "_sig", self.name, actor.name)
         instance.setCommLinks(q_comm, q_sig)
 
-        # Update information
+        checkpoint_dir = self.config.get_checkpoint_dir()
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+            instance.checkpoint_file = os.path.join(checkpoint_dir, name + ".pkl")
+            # only restore from checkpoints saved in this session
+            if os.path.exists(instance.checkpoint_file):
+                os.remove(instance.checkpoint_file)
+
+        journal_dir = self.config.get_journal_dir()
+        if journal_dir:
+            instance.journal_file = os.path.join(journal_dir, name + ".journal")
+            remove_journal(instance.journal_file)
+
+        if self.replay is not None and instance.client is not None:
+            instance.setStoreInterface(
+                ReplayStore(instance.client, self.replay["journal"], name)
+            )
+        return instance
+
+    def addActor(self, name, instance):
+        """Add a built actor and its comm Links to Nexus' dictionaries
+
+        Args:
+            name: name of the actor
+            instance: the actor, as returned by buildActor
+        """
+        self.comm_queues.update({instance.q_comm.name: instance.q_comm})
+        self.sig_queues.update({instance.q_sig.name: instance.q_sig})
         self.actors.update({name: instance})
 
+    def buildRemoteActor(self, name, actor):
+        """Set up the stand-in and comm links for an actor run by a worker
+
+        The actor itself is started once its worker registers.
+
+        Args:
+            name: name of the actor
+            actor: improv.config.ConfigModule
+
+        Returns:
+            improv.worker.RemoteActor: the stand-in
+        """
+        if self.config.use_plasma() or self.config.use_shm():
+            raise ValueError(
+                "Actor {} runs on a worker, which needs a Redis store".format(name)
+            )
+        if not self.config.get_worker_token() and not is_loopback(self.hostname):
+            raise ValueError(
+                "Actor {} runs on a worker reached over the network, "
+                "which needs settings: worker_token".format(name)
+            )
+        options = dict(actor.options)
+        host = options.pop("host")
+        instance = RemoteActor(
+            actor.name, actor.packagename, actor.classname, host, options
+        )
+        instance.store_port_num = self.store_port
+        instance.store_hostname = self.hostname
+        instance.store_password = self.store_password
+
+        q_comm = InboxLink(
+            self.inbox_address, actor.name + "_comm", actor.name, self.name
+        )
+        # Nexus binds, since the worker's address is not known yet
+        q_sig = ZmqLink(
+            actor.name + "_sig",
+            self.name,
+            actor.name,
+            address="tcp://{}:*".format(self.hostname),
+            bind=self._bindAddress() + ":*",
+            producer_binds=True,
+        )
+        q_sig.queue.open()
+        instance.setCommLinks(q_comm, q_sig)
+
+        logger.info("Actor {} will run on worker {}".format(name, host))
+        return instance
+
+    def _bindAddress(self):
+        """Where to bind sockets that actors connect to: only the interface
+        at the configured hostname, the loopback one by default"""
+        if is_loopback(self.hostname):
+            return "tcp://127.0.0.1"
+        return "tcp://{}".format(self.hostname)
+
+    def _workerNames(self):
+        """The workers that actors in the config run on"""
+        return {
+            actor.host
+            for actor in self.actors.values()
+            if isinstance(actor, RemoteActor)
+        }
+
+    def _workerToken(self):
+        """The token sent with every request to a worker"""
+        return (self.config.get_worker_token() or "").encode()
+
+    def registerWorker(self, name, address):
+        """Record a worker's address and start the actors it should run
+
+        Only called for workers that sent the token and that actors in
+        the config run on; see remote_input.
+
+        Args:
+            name (str): name of the worker, as in actors' host option
+            address (str): endpoint of the worker's REP socket
+        """
+        logger.info("Worker {} registered at {}".format(name, address))
+        self.workers[name] = address
+        for actor in self.actors.values():
+            if isinstance(actor, RemoteActor) and actor.host == name:
+                self.startRemoteActor(actor)
+
+    def startRemoteActor(self, actor):
+        """Ask an actor's worker to start it
+
+        Args:
+            actor (RemoteActor): the actor to start
+        """
+        spec = pickle.dumps(actor.spec(), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            reply = request(
+                self.workers[actor.host], [b"start", self._workerToken(), spec]
+            )
+        except TimeoutError as e:
+            logger.error("Could not start {}: {}".format(actor.name, e))
+            return
+        if reply[0] == b"started":
+            actor.started = True
+            logger.info("Started {} on worker {}".format(actor.name, actor.host))
+        else:
+            logger.error(
+                "Worker {} could not start {}: {}".format(
+                    actor.host, actor.name, reply[-1].decode()
+                )
+            )
+
     def runActor(self, actor):
         """Run the actor continually; used for separate processes
         #TODO: hook into monitoring here?
@@ -858,21 +1616,70 @@ class Nexus:
     def createConnections(self):
         """Assemble links (multi or other)
         for later assignment
+
+        The link type for each connection is taken from its "type" option
+        in the config ("manager" by default, "shm" for a shared-memory
+        ring buffer, "broadcast" for a shared-memory log read by all
+        targets, "frames" for passing references to frames in a
+        shared-memory FrameBuffer, or "zmq" for sockets that can cross
+        machines, as links to and from actors on workers must be); any
+        other options, such as maxsize and the policy for when the link
+        is full, are passed to the link constructor. Links are created
+        several at a time.
         """
+        connections = []
         for source, drain in self.config.connections.items():
             name = source.split(".")[0]
-            # current assumption is connection goes from q_out to something(s) else
-            if len(drain) > 1:  # we need multiasyncqueue
-                link, endLinks = MultiLink(name + "_multi", source, drain)
-                self.data_queues.update({source: link})
-                for i, e in enumerate(endLinks):
-                    self.data_queues.update({drain[i]: e})
-            else:  # single input, single output
-                d = drain[0]
-                d_name = d.split(".")  # TODO: check if .anything, if not assume q_in
-                link = Link(name + "_" + d_name[0], source, d)
-                self.data_queues.update({source: link})
-                self.data_queues.update({d: link})
+            options = dict(self.config.connection_options.get(source, {}))
+            link_type = options.pop("type", "manager")
+            remote = [
+                a
+                for a in [name] + [d.split(".")[0] for d in drain]
+                if a in self.config.actors and "host" in self.config.actors[a].options
+            ]
+            if remote and link_type != "zmq":
+                raise ValueError(
+                    "Connection {} reaches actors on workers ({}), "
+                    "so it needs type zmq".format(source, ", ".join(remote))
+                )
+            connections.append((source, drain, link_type, options))
+
+        with ThreadPoolExecutor(self._startupWorkers()) as pool:
+            futures = [pool.submit(self._createConnection, *c) for c in connections]
+        for future in futures:
+            self.data_queues.update(future.result())
+
+    def _createConnection(self, source, drain, link_type, options):
+        """Create the link(s) for one connection
+
+        Returns:
+            dict: the link for the source and for each drain
+        """
+        name = source.split(".")[0]
+        # current assumption is connection goes from q_out to something(s) else
+        if len(drain) > 1:  # we need multiasyncqueue
+            link, endLinks = self.link_factory.MultiLink(
+                name + "_multi", source, drain, link_type=link_type, **options
+            )
+            return {source: link, **dict(zip(drain, endLinks))}
+        # single input, single output
+        d = drain[0]
+        d_name = d.split(".")  # TODO: check if .anything, if not assume q_in
+        link = self.link_factory.Link(
+            name + "_" + d_name[0], source, d, link_type=link_type, **options
+        )
+        return {source: link, d: link}
+
+    def createCommLink(self, name, start, end):
+        """Create a link for signals from Nexus to an actor
+
+        These are shared-memory links unless the config sets
+        comm_link_type, so that actors can wait on them without a
+        thread per link. Messages the other way go to the inbox.
+        """
+        link_type = self.config.get_comm_link_type()
+        options = {"capacity": COMM_LINK_CAPACITY} if link_type == "shm" else {}
+        return self.link_factory.Link(name, start, end, link_type=link_type, **options)
 
     def assignLink(self, name, link):
         """Function to set up Links between actors
@@ -896,10 +1703,14 @@ class Nexus:
 
     # TODO: StoreInterface access here seems wrong, need to test
     def startWatcher(self):
-        from improv.watcher import Watcher
+        from improv.watcher import Watcher, STORE_FILE
 
-        self.watcher = Watcher("watcher", self.createStoreInterface("watcher"))
-        q_sig = Link("watcher_sig", self.name, "watcher")
+        self.watcher = Watcher(
+            "watcher",
+            self.createStoreInterface("watcher"),
+            filename=self.config.get_watcher_file() or STORE_FILE,
+        )
+        q_sig = self.createCommLink("watcher_sig", self.name, "watcher")
         self.watcher.setLinks(q_sig)
         self.sig_queues.update({q_sig.name: q_sig})
 
@@ -0,0 +1,327 @@
+import pickle
+import logging
+import threading
+from queue import Full
+from collections import deque
+
+import h5py
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# objects a BatchWriter collects before writing them together
+DEFAULT_BATCH_SIZE = 64
+# most bytes of objects waiting to be written before put blocks
+DEFAULT_MAX_PENDING_BYTES = 256 * 1024 * 1024
+# longest time an object waits for its batch to fill before being written
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+# about how many bytes of arrays go into one HDF5 chunk
+CHUNK_BYTES = 1024 * 1024
+
+# series holding objects that are not NumPy arrays, pickled
+PICKLED = "pickled"
+
+
+def series_name(obj):
+    """Name of the series an object is saved in
+
+    Arrays of the same dtype and shape share a series, named after them
+    (e.g. uint16_512x512); anything else is pickled.
+    """
+    if isinstance(obj, np.ndarray) and not obj.dtype.hasobject:
+        return "{}_{}".format(
+            obj.dtype.name, "x".join(str(n) for n in obj.shape) or "scalar"
+        )
+    return PICKLED
+
+
+class BatchWriter(object):
+    """Saves objects to an HDF5 file in batches, on a background thread.
+
+    Objects are saved under the name of the actor they came from, and a
+    name of their own, such as a frame number. NumPy arrays of the same
+    dtype and shape are rows of one chunked, appendable dataset,
+    <actor>/<series>/data, and their names are the same rows of
+    <actor>/<series>/names; other objects are pickled into the
+    <actor>/pickled series. Each batch is written with one resize per
+    dataset, rather than one file per object.
+
+    Objects count against max_pending_bytes from the time they are put
+    until they are written, and put blocks while the limit is reached,
+    so a slow disk holds the caller back instead of filling memory.
+    """
+
+    def __init__(
+        self,
+        filename,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_pending_bytes=DEFAULT_MAX_PENDING_BYTES,
+        flush_interval=DEFAULT_FLUSH_INTERVAL,
+    ):
+        """
+        Args:
+            filename (str): HDF5 file to append to; created if missing
+            batch_size (int): objects to collect before writing
+            max_pending_bytes (int): most bytes waiting to be written
+            flush_interval (float): longest time in seconds an object
+                waits for its batch to fill
+        """
+        self.filename = str(filename)
+        self.batch_size = int(batch_size)
+        self.max_pending_bytes = int(max_pending_bytes)
+        self.flush_interval = flush_interval
+        self.written = 0
+
+        self._file = h5py.File(self.filename, "a")
+        self._pending = deque()
+        self._pending_bytes = 0
+        self._writing = 0
+        self._flushing = 0
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="BatchWriter", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def pending_bytes(self):
+        """Bytes of objects put but not yet written"""
+        return self._pending_bytes
+
+    def put(self, actor, name, obj, timeout=None):
+        """Queue an object to be saved
+
+        Arrays are copied, so they can be changed or released as soon as
+        put returns.
+
+        Args:
+            actor (str): name of the actor the object came from
+            name (str): name of the object, e.g. its frame number
+            obj: the object
+            timeout (float): longest time in seconds to wait for room;
+                wait as long as needed if None
+
+        Raises:
+            queue.Full: if there was no room within timeout
+            ValueError: if the writer is closed
+        """
+        series = series_name(obj)
+        if series == PICKLED:
+            value = np.frombuffer(
+                pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8
+            )
+        else:
+            value = np.array(obj)
+        nbytes = value.nbytes
+
+        with self._cond:
+            self._check()
+            # an object bigger than the limit waits until nothing else is
+            ok = self._cond.wait_for(
+                lambda: self._error is not None
+                or self._closed
+                or self._pending_bytes == 0
+                or self._pending_bytes + nbytes <= self.max_pending_bytes,
+                timeout,
+            )
+            self._check()
+            if not ok:
+                raise Full("{} bytes waiting to be written".format(self._pending_bytes))
+            self._pending.append((str(actor), str(name), series, value))
+            self._pending_bytes += nbytes
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Write everything put so far and wait until it is written
+
+        Returns:
+            bool: False if timeout passed first
+        """
+        with self._cond:
+            self._check()
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: self._error is not None
+                    or (not self._pending and not self._writing),
+                    timeout,
+                )
+            finally:
+                self._flushing -= 1
+                self._check()
+
+    def close(self):
+        """Write everything put so far and close the file"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._file.close()
+        logger.info("Saved {} objects to {}".format(self.written, self.filename))
+        if self._error is not None:
+            raise self._error
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError("BatchWriter for {} is closed".format(self.filename))
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.batch_size
+                    or self._flushing
+                    or self._closed,
+                    self.flush_interval,
+                )
+                batch = list(self._pending)
+                self._pending.clear()
+                self._writing = len(batch)
+                if not batch and self._closed:
+                    return
+            if not batch:
+                continue
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error("Could not write to {}: {}".format(self.filename, e))
+                with self._cond:
+                    self._error = e
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                self._pending_bytes -= sum(value.nbytes for *_, value in batch)
+                self._writing = 0
+                self.written += len(batch)
+                self._cond.notify_all()
+
+    def _write(self, batch):
+        series = {}
+        for actor, name, s, value in batch:
+            series.setdefault((actor, s), []).append((name, value))
+
+        for (actor, s), items in series.items():
+            group = self._file.require_group(actor).get(s)
+            if group is None:
+                group = self._create(actor, s, items[0][1])
+            data, names = group["data"], group["names"]
+            start = data.shape[0]
+            data.resize(start + len(items), axis=0)
+            names.resize(start + len(items), axis=0)
+            if s == PICKLED:
+                for i, (_, value) in enumerate(items):
+                    data[start + i] = value
+            else:
+                data[start:] = np.stack([value for _, value in items])
+            names[start:] = [name for name, _ in items]
+        self._file.flush()
+
+    def _create(self, actor, s, value):
+        group = self._file[actor].create_group(s)
+        if s == PICKLED:
+            group.create_dataset(
+                "data",
+                shape=(0,),
+                maxshape=(None,),
+                chunks=(self.batch_size,),
+                dtype=h5py.vlen_dtype(np.uint8),
+            )
+        else:
+            rows = max(1, min(self.batch_size, CHUNK_BYTES // max(1, value.nbytes)))
+            group.create_dataset(
+                "data",
+                shape=(0,) + value.shape,
+                maxshape=(None,) + value.shape,
+                chunks=(rows,) + value.shape,
+                dtype=value.dtype,
+            )
+        group.create_dataset(
+            "names",
+            shape=(0,),
+            maxshape=(None,),
+            chunks=(1024,),
+            dtype=h5py.string_dtype(),
+        )
+        return group
+
+
+class SavedObjects(object):
+    """Reads objects saved by a BatchWriter."""
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): HDF5 file written by a BatchWriter
+        """
+        self.filename = str(filename)
+        self.file = h5py.File(self.filename, "r")
+        # actor -> name -> (series, row); built on first lookup
+        self._index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def actors(self):
+        """Names of the actors that objects were saved from"""
+        return list(self.file.keys())
+
+    def names(self, actor):
+        """Names of the objects saved from an actor, series by series"""
+        return [
+            name for s in self.file[actor].values() for name in s["names"].asstr()[:]
+        ]
+
+    def get(self, actor, name):
+        """The object saved from an actor under a name
+
+        Raises:
+            KeyError: if there is none
+        """
+        if actor not in self._index:
+            self._index[actor] = {
+                name: (s, row)
+                for s in self.file[actor]
+                for row, name in enumerate(self.file[actor][s]["names"].asstr()[:])
+            }
+        s, row = self._index[actor][str(name)]
+        return self._decode(s, self.file[actor][s]["data"][row])
+
+    def items(self, actor):
+        """Yield (name, object) for everything saved from an actor, series
+        by series, reading a chunk of rows at a time
+        """
+        for s, group in self.file[actor].items():
+            data = group["data"]
+            names = group["names"].asstr()[:]
+            step = data.chunks[0] if data.chunks else len(names)
+            for start in range(0, len(names), max(1, step)):
+                block = data[start : start + step]
+                for name, value in zip(names[start : start + step], block):
+                    yield name, self._decode(s, value)
+
+    def close(self):
+        self.file.close()
+
+    @staticmethod
+    def _decode(s, value):
+        if s == PICKLED:
+            return pickle.loads(value.tobytes())
+        return value
@@ -0,0 +1,301 @@
+import queue
+import logging
+import threading
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# most bytes an HDF5Reader reads at once from an unchunked dataset
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024
+# frames a Prefetcher reads ahead
+DEFAULT_PREFETCH = 16
+
+TIFF_SUFFIXES = (".tif", ".tiff")
+HDF5_SUFFIXES = (".h5", ".hdf5")
+
+
+class HDF5Reader(object):
+    """Streams frames from an HDF5 dataset, first axis first.
+
+    Frames are read a block at a time, each block lined up with the
+    dataset's chunks along the first axis (or about block_bytes for a
+    contiguous dataset), so that a chunk is read from disk once and only
+    one block is in memory.
+    """
+
+    def __init__(self, filename, dataset=None, block_bytes=DEFAULT_BLOCK_BYTES):
+        """
+        Args:
+            filename (str): path of the HDF5 file
+            dataset (str): name of the dataset; the first one in the file
+                if not given
+            block_bytes (int): most bytes to read at once from a dataset
+                that is not chunked
+        """
+        self.filename = str(filename)
+        self.file = h5py.File(self.filename, "r")
+        if dataset is None:
+            dataset = list(self.file.keys())[0]
+        self.dataset = self.file[dataset]
+        self.shape = self.dataset.shape[1:]
+        self.dtype = self.dataset.dtype
+
+        frame_bytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        if self.dataset.chunks is not None:
+            chunk = self.dataset.chunks[0]
+            # whole chunks, as many as fit in block_bytes
+            self.block = chunk * max(1, block_bytes // (chunk * frame_bytes))
+        else:
+            self.block = max(1, block_bytes // frame_bytes)
+
+    def __len__(self):
+        return self.dataset.shape[0]
+
+    def __getitem__(self, i):
+        return self.dataset[i]
+
+    def __iter__(self):
+        for start in range(0, len(self), self.block):
+            block = self.dataset[start : start + self.block]
+            for frame in block:
+                yield frame
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TiffReader(object):
+    """Streams the pages of a TIFF file, one page per frame.
+
+    Needs the tifffile package.
+    """
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): path of the TIFF file
+        """
+        if tifffile is None:
+            raise ImportError("Reading TIFF files needs the tifffile package")
+        self.filename = str(filename)
+        self.file = tifffile.TiffFile(self.filename)
+        # don't keep pages we have read in memory
+        self.file.pages.cache = False
+        first = self.file.pages.first
+        self.shape = first.shape
+        self.dtype = first.dtype
+
+    def __len__(self):
+        return len(self.file.pages)
+
+    def __getitem__(self, i):
+        return self.file.pages[i].asarray()
+
+    def __iter__(self):
+        for page in self.file.pages:
+            yield page.asarray()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_reader(filename, **kwargs):
+    """Open a reader for a file, chosen by its extension
+
+    Args:
+        filename (str): path of an HDF5 or TIFF file
+        kwargs: passed on to the reader
+
+    Returns:
+        HDF5Reader or TiffReader
+    """
+    suffix = Path(filename).suffix.lower()
+    if suffix in HDF5_SUFFIXES:
+        return HDF5Reader(filename, **kwargs)
+    if suffix in TIFF_SUFFIXES:
+        return TiffReader(filename, **kwargs)
+    raise ValueError("No reader for {} files".format(suffix))
+
+
+class FolderReader(object):
+    """Streams the frames of every file in a folder, in name order.
+
+    With watch set, it then waits for new files to appear and streams
+    those too, until close() is called.
+    """
+
+    def __init__(self, path, suffixes=TIFF_SUFFIXES, watch=False, poll_interval=0.1):
+        """
+        Args:
+            path (str): the folder
+            suffixes (tuple): extensions of the files to read
+            watch (bool): keep waiting for new files
+            poll_interval (float): how often to look for new files, in
+                seconds
+        """
+        self.path = Path(path)
+        if not self.path.is_dir():
+            raise FileNotFoundError("Folder {} does not exist".format(self.path))
+        self.suffixes = tuple(s.lower() for s in suffixes)
+        self.watch = watch
+        self.poll_interval = poll_interval
+        self._closed = threading.Event()
+
+    def files(self):
+        """Files in the folder that would be read, in name order"""
+        return sorted(
+            f
+            for f in self.path.iterdir()
+            if f.is_file() and f.suffix.lower() in self.suffixes
+        )
+
+    def __iter__(self):
+        seen = set()
+        while not self._closed.is_set():
+            new = [f for f in self.files() if f not in seen]
+            for f in new:
+                seen.add(f)
+                with open_reader(f) as reader:
+                    for frame in reader:
+                        yield frame
+                if self._closed.is_set():
+                    return
+            if not self.watch:
+                return
+            if not new:
+                self._closed.wait(self.poll_interval)
+
+    def close(self):
+        """Stop watching the folder"""
+        self._closed.set()
+
+
+class _Failed:
+    """Exception raised while prefetching, to re-raise in the consumer"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+_DONE = object()
+
+
+class Prefetcher(object):
+    """Reads frames ahead on a background thread.
+
+    Iterating a Prefetcher yields the frames of the iterable it wraps,
+    which a thread reads at most depth frames ahead of the consumer, so
+    disk reads overlap with processing while memory stays bounded.
+    Errors raised while reading are raised again by the consumer.
+    """
+
+    def __init__(self, frames, depth=DEFAULT_PREFETCH):
+        """
+        Args:
+            frames (iterable): where to read frames from, e.g. a reader
+            depth (int): most frames to hold ready
+        """
+        self.frames = frames
+        self.depth = depth
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = threading.Event()
+        self._done = False
+        self._thread = threading.Thread(
+            target=self._fill, name="Prefetcher", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _fill(self):
+        try:
+            for frame in self.frames:
+                if not self._put(frame):
+                    return
+        except Exception as e:
+            logger.exception("Error reading frames: {}".format(e))
+            self._put(_Failed(e))
+            return
+        self._put(_DONE)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._done:
+            raise StopIteration
+        return self._unpack(self._queue.get())
+
+    def get(self, timeout=None):
+        """Get the next frame.
+
+        Args:
+            timeout (float): seconds to wait for it, None for no limit
+
+        Raises:
+            queue.Empty: no frame was ready in time
+            StopIteration: there are no more frames
+
+        Returns:
+            ndarray: the frame
+        """
+        if self._done:
+            raise StopIteration
+        return self._unpack(self._queue.get(timeout=timeout))
+
+    def _unpack(self, item):
+        if item is _DONE:
+            self._done = True
+            raise StopIteration
+        if isinstance(item, _Failed):
+            self._done = True
+            raise item.error
+        return item
+
+    def close(self):
+        """Stop reading ahead and wait for the thread to finish.
+
+        Also closes the wrapped reader, if it can be closed.
+        """
+        self._stop.set()
+        if isinstance(self.frames, FolderReader):
+            # a watching FolderReader only returns once closed
+            self.frames.close()
+        self._thread.join()
+        if hasattr(self.frames, "close"):
+            self.frames.close()
+        self._done = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,15 +1,30 @@
 import os
+import mmap
+import time
 import uuid
+import fcntl
+import struct
+import asyncio
+import weakref
+import tempfile
+import functools
+import threading
 
 import pickle
 import logging
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
 
 import numpy as np
 import pyarrow.plasma as plasma
 
+import redis
+import redis.asyncio as aioredis
 from redis import Redis
 from redis.retry import Retry
+from redis.asyncio.retry import Retry as AsyncRetry
 from redis.backoff import ConstantBackoff
 from redis.exceptions import BusyLoadingError, ConnectionError, TimeoutError
 
@@ -17,12 +32,222 @@ from scipy.sparse import csc_matrix
 from pyarrow.lib import ArrowIOError
 from pyarrow._plasma import PlasmaObjectExists, ObjectNotAvailable
 
+from improv.metrics import registry
+
 REDIS_GLOBAL_TOPIC = "global_topic"
 
+# the number of consumers left for an object is kept under its key plus this
+CONSUMERS_SUFFIX = ":consumers"
+
+# names of this machine, on which a Redis server's Unix socket can be used
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+
+# errors Redis calls are retried on, e.g. while the server is starting
+_RETRY_ON_ERROR = [
+    BusyLoadingError,
+    ConnectionError,
+    TimeoutError,
+    ConnectionRefusedError,
+]
+
+# longest time a call waits for a free connection from a bounded pool
+POOL_TIMEOUT = 10.0  # seconds
+# connections an AsyncRedisStoreInterface keeps for its coroutines
+ASYNC_MAX_CONNECTIONS = 16
+
+# keys of objects put with persist=True start with this; the snapshot
+# durability mode only saves objects whose keys have a chosen prefix
+PERSIST_PREFIX = "persist:"
+
+# decrement the consumer count of an object and delete both keys at zero;
+# returns the count left, or -1 if the object isn't reference counted
+_RELEASE_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return -1
+end
+local left = redis.call('DECR', KEYS[2])
+if left <= 0 then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 0
+end
+return left
+"""
+
+# buffers at least this large (in bytes) are kept out of the pickle stream
+OUT_OF_BAND_THRESHOLD = 64 * 1024
+
+# names of shared-memory arenas made by ShmStoreInterface.create start with this
+SHM_STORE_PREFIX = "improv_store_"
+
+# framing for values with out-of-band buffers:
+# magic, number of buffers, pickle length, then the length of each buffer
+_OOB_MAGIC = b"IMPV"
+_OOB_HEADER = struct.Struct("<4sIQ")
+_OOB_LENGTH = struct.Struct("<Q")
+# the pickle is padded so that each out-of-band buffer starts at a
+# multiple of this many bytes from the start of the value
+_OOB_ALIGNMENT = 64
+
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 
+def serialize(object):
+    """Pickle an object, keeping its large buffers out of band.
+
+    Uses pickle protocol 5 so that large contiguous buffers (e.g. the data
+    of a numpy array) are not copied into the pickle stream. Instead, the
+    result is a list of parts: a short frame header plus the pickle, then
+    a memoryview of each buffer, with zero padding before each buffer so
+    that it starts _OOB_ALIGNMENT-aligned and arrays rebuilt on it are
+    aligned too. Objects without large buffers come back as a single
+    ordinary pickle.
+
+    Args:
+        object: the object to serialize
+
+    Returns:
+        list: bytes-like parts that, concatenated, form the stored value
+    """
+    buffers = []
+
+    def keep_out_of_band(buffer):
+        try:
+            raw = buffer.raw()
+        except BufferError:  # not contiguous
+            return True  # serialize in band
+        if raw.nbytes < OUT_OF_BAND_THRESHOLD:
+            return True
+        buffers.append(raw)
+        return False
+
+    data = pickle.dumps(object, protocol=5, buffer_callback=keep_out_of_band)
+    if not buffers:
+        return [data]
+
+    header = _OOB_HEADER.pack(_OOB_MAGIC, len(buffers), len(data))
+    lengths = b"".join(_OOB_LENGTH.pack(b.nbytes) for b in buffers)
+    head = header + lengths + data
+    parts = [head + bytes(_padding(len(head)))]
+    offset = len(parts[0])
+    for i, buffer in enumerate(buffers):
+        if i > 0 and _padding(offset):
+            parts.append(bytes(_padding(offset)))
+            offset += len(parts[-1])
+        parts.append(buffer)
+        offset += buffer.nbytes
+    return parts
+
+
+def _padding(offset):
+    """Bytes needed after offset to reach the next _OOB_ALIGNMENT boundary"""
+    return -offset % _OOB_ALIGNMENT
+
+
+def _unframe(view):
+    """Split a value framed by serialize into its pickle and buffers
+
+    Args:
+        view (memoryview): the value, starting with _OOB_MAGIC
+
+    Returns:
+        (memoryview, list): the pickle, and a slice of view for each
+        out-of-band buffer
+    """
+    _, n_buffers, data_length = _OOB_HEADER.unpack_from(view)
+    offset = _OOB_HEADER.size
+    lengths = []
+    for _ in range(n_buffers):
+        lengths.append(_OOB_LENGTH.unpack_from(view, offset)[0])
+        offset += _OOB_LENGTH.size
+
+    data = view[offset : offset + data_length]
+    offset += data_length
+    buffers = []
+    for length in lengths:
+        offset += _padding(offset)
+        buffers.append(view[offset : offset + length])
+        offset += length
+    return data, buffers
+
+
+def deserialize(value):
+    """Inverse of serialize.
+
+    Out-of-band buffers are handed to pickle as slices of a memoryview
+    on value, so numpy arrays are rebuilt on top of value's memory
+    without being copied. Since value is usually an immutable bytes
+    object, such arrays are read-only.
+
+    Args:
+        value (bytes-like): the concatenated parts produced by serialize
+
+    Returns:
+        the deserialized object
+    """
+    view = memoryview(value)
+    if view[: len(_OOB_MAGIC)] != _OOB_MAGIC:
+        return pickle.loads(view)
+
+    data, buffers = _unframe(view)
+    return pickle.loads(data, buffers=buffers)
+
+
+def _nbytes(parts):
+    """Total size in bytes of the parts returned by serialize"""
+    return sum(memoryview(part).nbytes for part in parts)
+
+
+def _ttl_ms(ttl):
+    """Convert a ttl in seconds to what redis-py expects for px"""
+    return None if ttl is None else max(1, int(ttl * 1000))
+
+
+def _object_key(persist=False):
+    """A new, unique key for an object put in Redis"""
+    object_key = str(os.getpid()) + str(uuid.uuid4())
+    return PERSIST_PREFIX + object_key if persist else object_key
+
+
+def _local_socket(unix_socket_path, hostname):
+    """Whether a Redis server's Unix socket can be used: only if it has
+    one, and the server is on this machine"""
+    return (
+        unix_socket_path is not None
+        and hostname in LOCAL_HOSTS
+        and os.path.exists(unix_socket_path)
+    )
+
+
+def _pool_address(module, unix_socket_path=None, host=None, port=None):
+    """Connection pool options for a Redis server's Unix socket, or its
+    host and port, with the connection classes of module (redis or
+    redis.asyncio)"""
+    if unix_socket_path is not None:
+        return {
+            "connection_class": module.UnixDomainSocketConnection,
+            "path": unix_socket_path,
+        }
+    return {"connection_class": module.Connection, "host": host, "port": port}
+
+
+def _deserialize_many(object_keys, values):
+    """Deserialize the values of an MGET in place
+
+    Returns:
+        list: the keys that were not found
+    """
+    missing = []
+    for i, object_key in enumerate(object_keys):
+        if values[i] is None:
+            logger.warning("Object {} cannot be found.".format(object_key))
+            missing.append(object_key)
+        else:
+            registry.count("store.get_bytes", len(values[i]))
+            values[i] = deserialize(values[i])
+    return missing
+
+
 class StoreInterface:
     """General interface for a store"""
 
@@ -32,22 +257,69 @@ class StoreInterface:
     def put(self):
         raise NotImplementedError
 
+    def put_many(self):
+        raise NotImplementedError
+
+    def put_dict(self):
+        raise NotImplementedError
+
+    def get_many(self):
+        raise NotImplementedError
+
+    def get_dict(self):
+        raise NotImplementedError
+
     def delete(self):
         raise NotImplementedError
 
     def replace(self):
         raise NotImplementedError
 
+    def release(self):
+        raise NotImplementedError
+
+    def stats(self):
+        raise NotImplementedError
+
     def subscribe(self):
         raise NotImplementedError
 
+    def keys(self):
+        raise NotImplementedError
+
 
 class RedisStoreInterface(StoreInterface):
-    def __init__(self, name="default", server_port_num=6379, hostname="localhost"):
+    """Store interface for a Redis server.
+
+    An interface can be shared by the threads of a process, such as the
+    workers of a thread pool: each call takes a connection from the
+    client's pool and gives it back when it is done. By default the pool
+    opens as many connections as there are concurrent calls; with
+    max_connections it keeps at most that many, and calls wait for a
+    free one.
+    """
+
+    def __init__(
+        self,
+        name="default",
+        server_port_num=6379,
+        hostname="localhost",
+        ttl=None,
+        unix_socket_path=None,
+        max_connections=None,
+        password=None,
+    ):
         self.name = name
         self.server_port_num = server_port_num
         self.hostname = hostname
+        self.ttl = ttl
+        self.unix_socket_path = unix_socket_path
+        self.max_connections = max_connections
+        # for a server that requires one, as Nexus's does when it is
+        # reached over the network
+        self.password = password
         self.client = self.connect_to_server()
+        self._release_script = self.client.register_script(_RELEASE_SCRIPT)
 
     def connect_to_server(self):
         # TODO this should scan for available ports, but only if configured to do so.
@@ -57,25 +329,34 @@ class RedisStoreInterface(StoreInterface):
         Raises exception if can't connect
         Returns the Redis client if successful
 
+        Connects through the server's Unix socket if it has one and runs
+        on this machine, which saves a trip through the TCP stack on
+        every call; otherwise, or if the socket can't be used, connects
+        over TCP.
+
         Args:
             server_port_num: the port number where the Redis server
             is running on localhost.
         """
+        if self.uses_unix_socket():
+            try:
+                self.client = self._connect(unix_socket_path=self.unix_socket_path)
+                logger.info(
+                    "Successfully connected to redis datastore at {} ".format(
+                        self.unix_socket_path
+                    )
+                )
+                return self.client
+            except Exception as e:
+                logger.warning(
+                    "Cannot connect to redis datastore at {} ({}), "
+                    "trying port {}".format(
+                        self.unix_socket_path, e, self.server_port_num
+                    )
+                )
+
         try:
-            retry = Retry(ConstantBackoff(0.25), 5)
-            self.client = Redis(
-                host=self.hostname,
-                port=self.server_port_num,
-                retry=retry,
-                retry_on_timeout=True,
-                retry_on_error=[
-                    BusyLoadingError,
-                    ConnectionError,
-                    TimeoutError,
-                    ConnectionRefusedError,
-                ],
-            )
-            self.client.ping()
+            self.client = self._connect(host=self.hostname, port=self.server_port_num)
             logger.info(
                 "Successfully connected to redis datastore on port {} ".format(
                     self.server_port_num
@@ -91,7 +372,32 @@ class RedisStoreInterface(StoreInterface):
 
         return self.client
 
-    def put(self, object):
+    def uses_unix_socket(self):
+        """Whether to connect through the server's Unix socket: only if it
+        has one, and the server is on this machine"""
+        return _local_socket(self.unix_socket_path, self.hostname)
+
+    def _connect(self, **address):
+        options = {
+            "retry": Retry(ConstantBackoff(0.25), 5),
+            "retry_on_timeout": True,
+            "retry_on_error": _RETRY_ON_ERROR,
+            "password": self.password,
+        }
+        if self.max_connections is None:
+            client = Redis(**address, **options)
+        else:
+            pool = redis.BlockingConnectionPool(
+                max_connections=self.max_connections,
+                timeout=POOL_TIMEOUT,
+                **_pool_address(redis, **address),
+                **options,
+            )
+            client = Redis(connection_pool=pool)
+        client.ping()
+        return client
+
+    def put(self, object, ttl=None, consumers=None, persist=False):
         """
         Put a single object referenced by its string name
         into the store. If the store already has a value stored at this key,
@@ -101,31 +407,169 @@ class RedisStoreInterface(StoreInterface):
 
         Args:
             object: the object to store in Redis
-            object_key (str): the key under which the object should be stored
+            ttl (float): seconds after which Redis deletes the object;
+                defaults to the ttl this interface was made with
+            consumers (int): number of consumers that will each release
+                the object once; it is deleted after the last release
+            persist (bool): give the object a key starting with
+                PERSIST_PREFIX, so the snapshot durability mode saves it
 
         Returns:
-            object: the object that was a
+            str: the key under which the object was stored, or None if
+            it could not be stored, e.g. because the store is full
         """
-        object_key = str(os.getpid()) + str(uuid.uuid4())
+        object_key = _object_key(persist)
+        ttl = self.ttl if ttl is None else ttl
         try:
-            # buffers would theoretically go here if we need to force out-of-band
-            # serialization for single objects
             # TODO this will actually just silently fail if we use an existing
             # TODO key; not sure it's worth the network overhead to check every
             # TODO key twice every time. we still need a better solution for
             # TODO this, but it will work now singlethreaded most of the time.
-
-            self.client.set(object_key, pickle.dumps(object, protocol=5), nx=True)
+            with registry.timer("store.put"):
+                parts = serialize(object)
+                if len(parts) == 1 and consumers is None:
+                    self.client.set(object_key, parts[0], nx=True, px=_ttl_ms(ttl))
+                else:
+                    pipe = self.client.pipeline(transaction=True)
+                    self._pipeline_put(pipe, object_key, parts, ttl, consumers)
+                    pipe.execute()
+            registry.count("store.put_bytes", _nbytes(parts))
         except Exception:
             logger.error("Could not store object {}".format(object_key))
             logger.error(traceback.format_exc())
+            return None
 
         return object_key
 
+    def put_many(
+        self, objects, object_names=None, ttl=None, consumers=None, persist=False
+    ):
+        """
+        Put several objects into the store in a single round trip.
+        As with put, existing keys are never overwritten.
+
+        Args:
+            objects (list): the objects to store in Redis
+            object_names (list): unused; keys are always generated
+            ttl (float): seconds after which Redis deletes the objects
+            consumers (int): number of releases after which each object
+                is deleted
+            persist (bool): give the objects keys starting with
+                PERSIST_PREFIX, so the snapshot durability mode saves them
+
+        Returns:
+            list: the keys of the objects, in the same order; all None if
+            they could not be stored
+        """
+        prefix = _object_key(persist)
+        object_keys = [prefix + "_" + str(i) for i in range(len(objects))]
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            with registry.timer("store.put_many"):
+                pipe = self.client.pipeline(transaction=True)
+                for object_key, object in zip(object_keys, objects):
+                    parts = serialize(object)
+                    self._pipeline_put(pipe, object_key, parts, ttl, consumers)
+                    registry.count("store.put_bytes", _nbytes(parts))
+                pipe.execute()
+        except Exception:
+            logger.error("Could not store objects {}".format(object_keys))
+            logger.error(traceback.format_exc())
+            # the objects are put in one transaction, so none were stored
+            return [None] * len(objects)
+
+        return object_keys
+
+    def put_dict(self, objects, ttl=None, consumers=None, persist=False):
+        """
+        Put several named objects into the store in a single round trip.
+
+        Args:
+            objects (dict): the objects to store in Redis, by name
+            ttl (float): seconds after which Redis deletes the objects
+            consumers (int): number of releases after which each object
+                is deleted
+            persist (bool): as for put_many
+
+        Returns:
+            dict: the key of each object, by name; None for objects that
+            could not be stored
+        """
+        keys = self.put_many(
+            list(objects.values()), ttl=ttl, consumers=consumers, persist=persist
+        )
+        return dict(zip(objects.keys(), keys))
+
+    @staticmethod
+    def _pipeline_put(pipe, object_key, parts, ttl=None, consumers=None):
+        pipe.set(object_key, parts[0], nx=True, px=_ttl_ms(ttl))
+        # large buffers are appended as separate values so they are
+        # written straight to the socket without being copied
+        for part in parts[1:]:
+            pipe.append(object_key, part)
+        if consumers is not None:
+            pipe.set(object_key + CONSUMERS_SUFFIX, consumers, px=_ttl_ms(ttl))
+
+    def release(self, object_key):
+        """
+        Release an object put with a number of consumers. The object is
+        deleted once every consumer has released it.
+
+        Args:
+            object_key (str): the key of the object
+
+        Returns:
+            int: the number of consumers left, or -1 if the object was not
+            put with a number of consumers (or is already gone)
+        """
+        return self._release_script(keys=[object_key, object_key + CONSUMERS_SUFFIX])
+
+    def delete(self, object_keys):
+        """
+        Delete objects from the store
+
+        Args:
+            object_keys (str or list): the key(s) of the objects
+
+        Returns:
+            int: the number of objects deleted
+        """
+        if isinstance(object_keys, str):
+            object_keys = [object_keys]
+        if not object_keys:
+            return 0
+        consumer_keys = [key + CONSUMERS_SUFFIX for key in object_keys]
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(*object_keys)
+        pipe.delete(*consumer_keys)
+        return pipe.execute()[0]
+
+    def stats(self):
+        """
+        Memory use of the store
+
+        Returns:
+            dict: the number of keys in the store, the bytes used and
+            the limit (0 if there is none), and how many keys Redis has
+            expired and evicted since it started
+        """
+        memory = self.client.info("memory")
+        counts = self.client.info("stats")
+        return {
+            "keys": self.client.dbsize(),
+            "bytes": memory["used_memory"],
+            "max_bytes": memory["maxmemory"],
+            "expired": counts["expired_keys"],
+            "evicted": counts["evicted_keys"],
+        }
+
     def get(self, object_key):
         """
         Get object by specified key
 
+        Numpy arrays stored out of band are returned as read-only views on
+        the received value; copy them before modifying them in place.
+
         Args:
             object_name: the key of the object
 
@@ -135,20 +579,21 @@ class RedisStoreInterface(StoreInterface):
         Raises:
             ObjectNotFoundError: If the key is not found
         """
-        object_value = self.client.get(object_key)
-        if object_value:
-            # buffers would also go here to force out-of-band deserialization
-            return pickle.loads(object_value)
+        with registry.timer("store.get"):
+            object_value = self.client.get(object_key)
+            if object_value:
+                registry.count("store.get_bytes", len(object_value))
+                return deserialize(object_value)
 
         logger.warning("Object {} cannot be found.".format(object_key))
-        raise ObjectNotFoundError
+        raise ObjectNotFoundError(object_key)
 
     def subscribe(self, topic=REDIS_GLOBAL_TOPIC):
         p = self.client.pubsub()
         p.subscribe(topic)
 
     def get_list(self, ids):
-        """Get multiple objects from the store
+        """Get multiple objects from the store; see get_many
 
         Args:
             ids (list): of type str
@@ -156,7 +601,43 @@ class RedisStoreInterface(StoreInterface):
         Returns:
             list of the objects
         """
-        return self.client.mget(ids)
+        return self.get_many(ids)
+
+    def get_many(self, object_keys, raise_on_missing=True):
+        """
+        Get several objects from the store with a single MGET
+
+        Args:
+            object_keys (list): the keys of the objects
+            raise_on_missing (bool): if False, keys that are not in the
+                store come back as None instead of raising
+
+        Returns:
+            list of the objects, in the same order
+
+        Raises:
+            ObjectNotFoundError: naming every key that is not found
+        """
+        t = time.perf_counter()
+        values = self.client.mget(object_keys)
+        missing = _deserialize_many(object_keys, values)
+        registry.observe("store.get_many", time.perf_counter() - t)
+        if missing and raise_on_missing:
+            raise ObjectNotFoundError(missing)
+        return values
+
+    def get_dict(self, object_keys):
+        """
+        Get several named objects from the store; see get_many
+
+        Args:
+            object_keys (dict): the key of each object, by name
+
+        Returns:
+            dict: the objects, by name
+        """
+        values = self.get_many(list(object_keys.values()))
+        return dict(zip(object_keys.keys(), values))
 
     def get_all(self):
         """Get a listing of all objects in the store.
@@ -168,9 +649,74 @@ class RedisStoreInterface(StoreInterface):
         all_keys = self.client.keys()  # defaults to "*" pattern, so will fetch all
         return self.client.mget(all_keys)
 
+    def keys(self):
+        """Iterate over the keys of the objects in the store, without
+        blocking the server as KEYS would on a large database.
+        Consumer counts are not objects and are skipped.
+
+        Yields:
+            str: the key of each object
+        """
+        for key in self.client.scan_iter():
+            key = key.decode()
+            if not key.endswith(CONSUMERS_SUFFIX):
+                yield key
+
+    def snapshot(self, filename, prefixes=(PERSIST_PREFIX,)):
+        """Save the objects whose keys start with one of prefixes to a file
+
+        Objects are saved as Redis serializes them (DUMP), with the time
+        they have left to live, and the file is replaced in one step, so
+        it always holds a whole snapshot.
+
+        Args:
+            filename (str): file to save to
+            prefixes (list): key prefixes of the objects to save
+
+        Returns:
+            int: the number of keys saved
+        """
+        keys = sorted(
+            {
+                key
+                for prefix in prefixes
+                for key in self.client.scan_iter(match=prefix + "*", count=1000)
+            }
+        )
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.dump(key)
+            pipe.pttl(key)
+        values = pipe.execute()
+        entries = {
+            key: (dump, pttl)
+            for key, dump, pttl in zip(keys, values[::2], values[1::2])
+            if dump is not None
+        }
+        with open(filename + ".tmp", "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(filename + ".tmp", filename)
+        return len(entries)
+
+    def restore_snapshot(self, filename):
+        """Put back the objects saved by snapshot, replacing any with the
+        same keys
+
+        Returns:
+            int: the number of keys restored
+        """
+        with open(filename, "rb") as f:
+            entries = pickle.load(f)
+        pipe = self.client.pipeline(transaction=False)
+        for key, (dump, pttl) in entries.items():
+            pipe.restore(key, max(pttl, 0), dump, replace=True)
+        pipe.execute()
+        return len(entries)
+
     def reset(self):
         """Reset client connection"""
         self.client = self.connect_to_server()
+        self._release_script = self.client.register_script(_RELEASE_SCRIPT)
         logger.debug(
             "Reset local connection to store on port: {0}".format(self.server_port_num)
         )
@@ -256,6 +802,31 @@ class PlasmaStoreInterface(StoreInterface):
 
         return object_id
 
+    def put_many(self, objects, object_names=None):
+        """Put several objects into the store
+
+        Args:
+            objects (list): the objects to store
+            object_names (list): names of the objects, for logging
+
+        Returns:
+            list: Plasma object IDs, in the same order
+        """
+        if object_names is None:
+            object_names = [None] * len(objects)
+        return [self.put(obj, name) for obj, name in zip(objects, object_names)]
+
+    def put_dict(self, objects):
+        """Put several named objects into the store
+
+        Args:
+            objects (dict): the objects to store, by name
+
+        Returns:
+            dict: Plasma object ID of each object, by name
+        """
+        return {name: self.put(obj, name) for name, obj in objects.items()}
+
     def get(self, object_name):
         """Get a single object from the store by object name
         Checks to see if it knows the object first
@@ -292,7 +863,7 @@ class PlasmaStoreInterface(StoreInterface):
             return res if not isinstance(res, bytes) else pickle.loads(res)
 
         logger.warning("Object {} cannot be found.".format(obj_id))
-        raise ObjectNotFoundError
+        raise ObjectNotFoundError(obj_id)
 
     def getList(self, ids):
         """Get multiple objects from the store
@@ -306,6 +877,44 @@ class PlasmaStoreInterface(StoreInterface):
         # self._get()
         return self.client.get(ids)
 
+    def get_many(self, ids, raise_on_missing=True):
+        """Get several objects from the store in one request
+
+        Args:
+            ids (list): of type plasma.ObjectID
+            raise_on_missing (bool): if False, objects that are not in the
+                store come back as None instead of raising
+
+        Returns:
+            list of the objects, in the same order
+
+        Raises:
+            ObjectNotFoundError: naming every ID that is not found
+        """
+        res = self.client.get(ids, 0)  # Timeout = 0 ms
+        missing = []
+        for i, obj_id in enumerate(ids):
+            if res[i] is plasma.ObjectNotAvailable:
+                logger.warning("Object {} cannot be found.".format(obj_id))
+                missing.append(obj_id)
+                res[i] = None
+            elif isinstance(res[i], bytes):
+                res[i] = pickle.loads(res[i])
+        if missing and raise_on_missing:
+            raise ObjectNotFoundError(missing)
+        return res
+
+    def get_dict(self, ids):
+        """Get several named objects from the store; see get_many
+
+        Args:
+            ids (dict): Plasma object ID of each object, by name
+
+        Returns:
+            dict: the objects, by name
+        """
+        return dict(zip(ids.keys(), self.get_many(list(ids.values()))))
+
     def get_all(self):
         """Get a listing of all objects in the store
 
@@ -314,6 +923,14 @@ class PlasmaStoreInterface(StoreInterface):
         """
         return self.client.list()
 
+    def keys(self):
+        """The IDs of all objects in the store
+
+        Returns:
+            list: of plasma ObjectIDs
+        """
+        return list(self.get_all())
+
     def reset(self):
         """Reset client connection"""
         self.client = self.connect_store(self.store_loc)
@@ -322,6 +939,17 @@ class PlasmaStoreInterface(StoreInterface):
     def release(self):
         self.client.disconnect()
 
+    def delete(self, ids):
+        """Delete objects from the store. Plasma only deletes objects
+        that no client is using.
+
+        Args:
+            ids (plasma.ObjectID or list): the ID(s) of the objects
+        """
+        if not isinstance(ids, list):
+            ids = [ids]
+        self.client.delete(ids)
+
     # Subscribe to notifications about sealed objects?
     def subscribe(self):
         """Subscribe to a section? of the ds for singals
@@ -396,6 +1024,812 @@ class PlasmaStoreInterface(StoreInterface):
             return res
 
 
+class ShmStoreInterface(StoreInterface):
+    """Object store in a shared-memory arena, as a replacement for plasma.
+
+    The arena is one multiprocessing.shared_memory segment (in /dev/shm on
+    Linux), created by Nexus and attached to by name from each actor. It
+    holds a small header, a table of object slots and a data region that
+    is filled as a ring: new objects are written after the newest one, and
+    the oldest objects are evicted to make room. Object IDs are small
+    integers; the slot for an ID is ID % number of slots.
+
+    Getting an object pins it (increments its reference count) so it
+    cannot be evicted while in use. Large numpy arrays are rebuilt directly
+    on top of the arena without copying, as read-only arrays, and their
+    pin is dropped once the array is garbage collected. Everything else is
+    copied out and unpinned right away. A pinned object blocks eviction,
+    so puts fail (and return None) when the oldest object is still in use.
+
+    Updates to the header and slot table are serialized with a lock file
+    next to the arena.
+    """
+
+    # magic, data capacity, number of slots, allocation head, next ID, oldest ID
+    _HEADER = struct.Struct("<4sxxxxQQQQQ")
+    _HEADER_SIZE = 64
+    # ID, position of the object in the ring, size, reference count
+    _SLOT = struct.Struct("<QQQq")
+    _MAGIC = b"IMPS"
+
+    def __init__(self, name="default", store_loc=None):
+        """Attach to an existing arena.
+
+        Args:
+            name (str): name of the client, for logging
+            store_loc (str): name of the shared memory segment
+        """
+        self.name = name
+        self.store_loc = store_loc
+        self._owner = False
+        self.client = self.connect_store(store_loc)
+
+    @classmethod
+    def create(cls, size, n_slots=65536, store_loc=None):
+        """Create a new arena; used by Nexus in place of a store server.
+
+        Args:
+            size (int): capacity of the data region in bytes
+            n_slots (int): maximum number of objects held at once
+            store_loc (str): name for the shared memory segment;
+                generated if not given
+
+        Returns:
+            ShmStoreInterface: interface that owns (and will unlink) the arena
+        """
+        if store_loc is None:
+            store_loc = SHM_STORE_PREFIX + uuid.uuid4().hex[:16]
+        # objects are placed at aligned positions, which a wrap keeps
+        size = int(size) - int(size) % _OOB_ALIGNMENT
+        data_offset = cls._data_start(n_slots)
+        shm = shared_memory.SharedMemory(
+            name=store_loc, create=True, size=data_offset + size
+        )
+        shm.buf[:data_offset] = bytes(data_offset)
+        cls._HEADER.pack_into(shm.buf, 0, cls._MAGIC, size, n_slots, 0, 1, 1)
+        open(cls._lock_path(store_loc), "a").close()
+        shm.close()
+
+        store = cls(store_loc=store_loc)
+        store._owner = True
+        logger.info(
+            "Created shared memory store {} of {} bytes".format(store_loc, size)
+        )
+        return store
+
+    @classmethod
+    def _data_start(cls, n_slots):
+        """Offset of the data region: after the header and slot table,
+        rounded up so that aligned positions in the ring are aligned in
+        memory too"""
+        end = cls._HEADER_SIZE + n_slots * cls._SLOT.size
+        return end + _padding(end)
+
+    @staticmethod
+    def _lock_path(store_loc):
+        return os.path.join(tempfile.gettempdir(), store_loc + ".lock")
+
+    def connect_store(self, store_loc):
+        """Attach to the arena named store_loc
+
+        Raises:
+            CannotConnectToStoreInterfaceError: if there is no such arena
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=store_loc)
+            # the arena belongs to Nexus; don't let this process' resource
+            # tracker unlink it on exit
+            resource_tracker.unregister(shm._name, "shared_memory")
+            # map it ourselves: SharedMemory.close() fails while any array
+            # still uses the memory, whereas our map is only unmapped once
+            # the last array is gone
+            self._buf = memoryview(mmap.mmap(shm._fd, shm.size))
+            shm.close()
+            magic, capacity, n_slots, _, _, _ = self._HEADER.unpack_from(self._buf, 0)
+            if magic != self._MAGIC:
+                raise ValueError("{} is not an improv store".format(store_loc))
+        except Exception:
+            logger.exception("Cannot connect to store: {}".format(store_loc))
+            raise CannotConnectToStoreInterfaceError(store_loc)
+
+        self.capacity = capacity
+        self.n_slots = n_slots
+        self._data_offset = self._data_start(n_slots)
+        self._lock_file = None
+        self._lock_pid = None
+        self._local_lock = threading.Lock()
+        self._pending_release = deque()
+        logger.info("Successfully connected to store: {} ".format(store_loc))
+        return self._buf
+
+    def _acquire(self):
+        self._local_lock.acquire()
+        # flock locks belong to the open file, which a forked child shares
+        # with its parent, so each process opens its own
+        if self._lock_pid != os.getpid():
+            self._lock_file = open(self._lock_path(self.store_loc), "a")
+            self._lock_pid = os.getpid()
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+
+    def _release_lock(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._local_lock.release()
+
+    def _header(self):
+        return self._HEADER.unpack_from(self._buf, 0)
+
+    def _set_header(self, head, next_id, oldest_id):
+        self._HEADER.pack_into(
+            self._buf,
+            0,
+            self._MAGIC,
+            self.capacity,
+            self.n_slots,
+            head,
+            next_id,
+            oldest_id,
+        )
+
+    def _slot_offset(self, object_id):
+        return self._HEADER_SIZE + (object_id % self.n_slots) * self._SLOT.size
+
+    def _slot(self, object_id):
+        return self._SLOT.unpack_from(self._buf, self._slot_offset(object_id))
+
+    def _set_slot(self, object_id, position, size, refcount):
+        self._SLOT.pack_into(
+            self._buf,
+            self._slot_offset(object_id),
+            object_id,
+            position,
+            size,
+            refcount,
+        )
+
+    def _clear_slot(self, object_id):
+        self._SLOT.pack_into(self._buf, self._slot_offset(object_id), 0, 0, 0, 0)
+
+    def _drain_pending(self):
+        # must hold the lock
+        while self._pending_release:
+            self._unpin(self._pending_release.popleft())
+
+    def _unpin(self, object_id):
+        # must hold the lock
+        slot_id, position, size, refcount = self._slot(object_id)
+        if slot_id == object_id and refcount > 0:
+            self._set_slot(object_id, position, size, refcount - 1)
+
+    def _deferred_unpin(self, object_id):
+        """Called when the last array using a pinned object is collected.
+
+        This can run at any point in this process, including while the lock
+        is held, so unpin right away only if the lock is free.
+        """
+        if self._local_lock.acquire(blocking=False):
+            self._local_lock.release()
+            try:
+                self._acquire()
+            except Exception:
+                self._pending_release.append(object_id)
+                return
+            try:
+                self._drain_pending()
+                self._unpin(object_id)
+            finally:
+                self._release_lock()
+        else:
+            self._pending_release.append(object_id)
+
+    def _allocate(self, size):
+        """Reserve size bytes at the head of the ring, evicting the oldest
+        objects as needed. Must hold the lock.
+
+        Returns:
+            (int, int): the new object ID and its position in the ring,
+            or None if a pinned object is in the way
+        """
+        _, _, _, head, next_id, oldest_id = self._header()
+        # keep out-of-band buffers, and so arrays on them, aligned
+        start = head + _padding(head)
+        if start % self.capacity + size > self.capacity:
+            start += self.capacity - start % self.capacity  # wrap to the front
+        end = start + size
+
+        while oldest_id < next_id:
+            slot_id, position, _, refcount = self._slot(oldest_id)
+            if slot_id != oldest_id:  # already deleted
+                oldest_id += 1
+                continue
+            overlaps = position < end - self.capacity
+            if not overlaps and next_id - oldest_id < self.n_slots:
+                break
+            if refcount > 0:
+                self._set_header(head, next_id, oldest_id)
+                return None
+            self._clear_slot(oldest_id)
+            oldest_id += 1
+
+        self._set_header(end, next_id + 1, oldest_id)
+        return next_id, start
+
+    def put(self, object, object_name=None, consumers=None):
+        """Put a single object into the store
+
+        Args:
+            object: the object to store
+            object_name (str): name of the object, for logging
+            consumers (int): number of consumers that will each release
+                the object once; it can't be evicted until they all have
+
+        Returns:
+            int: ID of the stored object, or None if it could not be stored
+        """
+        return self.put_many([object], [object_name], consumers)[0]
+
+    def put_many(self, objects, object_names=None, consumers=None):
+        """Put several objects into the store, taking the lock only once
+
+        Args:
+            objects (list): the objects to store
+            object_names (list): names of the objects, for logging
+            consumers (int): number of releases each object waits for
+                before it can be evicted
+
+        Returns:
+            list: ID of each object, in the same order; None for any
+            object that could not be stored
+        """
+        t = time.perf_counter()
+        if object_names is None:
+            object_names = [None] * len(objects)
+        all_parts = [serialize(object) for object in objects]
+        sizes = [_nbytes(parts) for parts in all_parts]
+        placed = [None] * len(objects)
+
+        self._acquire()
+        try:
+            self._drain_pending()
+            for i, (size, name) in enumerate(zip(sizes, object_names)):
+                if size > self.capacity:
+                    logger.error(
+                        "Could not store object {}: {} bytes is larger than the "
+                        "store".format(name, size)
+                    )
+                    continue
+                res = self._allocate(size)
+                if res is None:
+                    logger.error(
+                        "Could not store object {}: store is full of objects "
+                        "in use".format(name)
+                    )
+                    continue
+                # hold a pin while writing so the object can't be evicted,
+                # plus one for each consumer
+                self._set_slot(res[0], res[1], size, 1 + (consumers or 0))
+                placed[i] = res
+        finally:
+            self._release_lock()
+
+        for parts, res in zip(all_parts, placed):
+            if res is None:
+                continue
+            offset = self._data_offset + res[1] % self.capacity
+            for part in parts:
+                part = memoryview(part).cast("B")
+                self._buf[offset : offset + part.nbytes] = part
+                offset += part.nbytes
+
+        self._acquire()
+        try:
+            for res in placed:
+                if res is not None:
+                    self._unpin(res[0])
+        finally:
+            self._release_lock()
+
+        registry.observe("store.put", time.perf_counter() - t)
+        registry.count("store.put_bytes", sum(sizes))
+        return [None if res is None else res[0] for res in placed]
+
+    def put_dict(self, objects, consumers=None):
+        """Put several named objects into the store
+
+        Args:
+            objects (dict): the objects to store, by name
+            consumers (int): number of releases each object waits for
+                before it can be evicted
+
+        Returns:
+            dict: ID of each object, by name
+        """
+        ids = self.put_many(list(objects.values()), list(objects.keys()), consumers)
+        return dict(zip(objects.keys(), ids))
+
+    def get(self, object_name):
+        """Get a single object from the store by its ID; see getID"""
+        return self.getID(object_name)
+
+    def getID(self, obj_id):
+        """
+        Get object by object ID
+
+        Large numpy arrays are returned as read-only views on the store and
+        keep the object pinned until they are garbage collected.
+
+        Args:
+            obj_id (int): the id of the object
+
+        Returns:
+            Stored object
+
+        Raises:
+            ObjectNotFoundError: If the id is not found
+        """
+        try:
+            return self.get_many([obj_id])[0]
+        except ObjectNotFoundError:
+            raise ObjectNotFoundError(obj_id) from None
+
+    def getList(self, ids):
+        """Get multiple objects from the store; see get_many
+
+        Args:
+            ids (list): of object IDs
+
+        Returns:
+            list of the objects
+        """
+        return self.get_many(ids)
+
+    def get_many(self, ids, raise_on_missing=True):
+        """Get several objects, taking the lock only once
+
+        Args:
+            ids (list): of object IDs
+            raise_on_missing (bool): if False, objects that are not in the
+                store come back as None instead of raising
+
+        Returns:
+            list of the objects, in the same order
+
+        Raises:
+            ObjectNotFoundError: naming every ID that is not found
+        """
+        t = time.perf_counter()
+        found = [None] * len(ids)
+        self._acquire()
+        try:
+            self._drain_pending()
+            for i, obj_id in enumerate(ids):
+                slot_id, position, size, refcount = self._slot(obj_id)
+                if slot_id != obj_id or obj_id == 0:
+                    logger.warning("Object {} cannot be found.".format(obj_id))
+                    continue
+                self._set_slot(obj_id, position, size, refcount + 1)
+                found[i] = (position, size)
+        finally:
+            self._release_lock()
+
+        missing = [obj_id for obj_id, f in zip(ids, found) if f is None]
+        if missing and raise_on_missing:
+            for obj_id, f in zip(ids, found):
+                if f is not None:
+                    self._deferred_unpin(obj_id)
+            raise ObjectNotFoundError(missing)
+
+        objects = [
+            None if f is None else self._load(obj_id, *f)
+            for obj_id, f in zip(ids, found)
+        ]
+        registry.observe("store.get", time.perf_counter() - t)
+        registry.count("store.get_bytes", sum(f[1] for f in found if f is not None))
+        return objects
+
+    def get_dict(self, ids):
+        """Get several named objects; see get_many
+
+        Args:
+            ids (dict): object ID of each object, by name
+
+        Returns:
+            dict: the objects, by name
+        """
+        return dict(zip(ids.keys(), self.get_many(list(ids.values()))))
+
+    def _load(self, obj_id, position, size):
+        """Unpickle a pinned object, dropping the pin once it is not needed"""
+        offset = self._data_offset + position % self.capacity
+        view = self._buf[offset : offset + size].toreadonly()
+        if view[: len(_OOB_MAGIC)] != _OOB_MAGIC:
+            try:
+                return pickle.loads(view)
+            finally:
+                view.release()
+                self._deferred_unpin(obj_id)
+
+        # hand pickle the buffers as numpy arrays so we can tell when
+        # everything built on top of them has been collected
+        data, buffers = _unframe(view)
+        buffers = [np.frombuffer(buffer, dtype=np.uint8) for buffer in buffers]
+
+        remaining = [len(buffers)]
+
+        def buffer_collected():
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                self._deferred_unpin(obj_id)
+
+        for buffer in buffers:
+            weakref.finalize(buffer, buffer_collected).atexit = False
+
+        return pickle.loads(data, buffers=buffers)
+
+    def get_all(self):
+        """Get a listing of all objects in the store
+
+        Returns:
+            dict: object ID to size in bytes, for every object in the store
+        """
+        listing = {}
+        self._acquire()
+        try:
+            _, _, _, _, next_id, oldest_id = self._header()
+            for object_id in range(oldest_id, next_id):
+                slot_id, _, size, _ = self._slot(object_id)
+                if slot_id == object_id:
+                    listing[object_id] = size
+        finally:
+            self._release_lock()
+        return listing
+
+    def keys(self):
+        """The IDs of all objects in the store
+
+        Returns:
+            list: of int object IDs
+        """
+        return list(self.get_all())
+
+    def delete(self, ids):
+        """Delete objects that are not in use
+
+        Args:
+            ids (int or list): the ID(s) of the objects
+
+        Returns:
+            int: the number of objects deleted
+        """
+        if isinstance(ids, int):
+            ids = [ids]
+        deleted = 0
+        self._acquire()
+        try:
+            self._drain_pending()
+            for obj_id in ids:
+                slot_id, _, _, refcount = self._slot(obj_id)
+                if slot_id != obj_id or obj_id == 0:
+                    continue
+                if refcount > 0:
+                    logger.warning("Object {} is in use; not deleted".format(obj_id))
+                    continue
+                # its space is reused once the ring comes around to it
+                self._clear_slot(obj_id)
+                deleted += 1
+        finally:
+            self._release_lock()
+        return deleted
+
+    def stats(self):
+        """Memory use of the store
+
+        Returns:
+            dict: the number of objects in the store and how many are in
+            use (pinned), the bytes they take up and the capacity
+        """
+        objects = pinned = used = 0
+        self._acquire()
+        try:
+            self._drain_pending()
+            _, _, _, _, next_id, oldest_id = self._header()
+            for object_id in range(oldest_id, next_id):
+                slot_id, _, size, refcount = self._slot(object_id)
+                if slot_id == object_id:
+                    objects += 1
+                    pinned += refcount > 0
+                    used += size
+        finally:
+            self._release_lock()
+        return {
+            "objects": objects,
+            "pinned": pinned,
+            "bytes": used,
+            "max_bytes": self.capacity,
+        }
+
+    def release(self, obj_id=None):
+        """Drop a pin on an object; with no ID, detach from the arena."""
+        if obj_id is not None:
+            self._deferred_unpin(obj_id)
+            return
+        self._buf = self.client = None
+
+    def reset(self):
+        """Reset client connection"""
+        self.client = self.connect_store(self.store_loc)
+        logger.debug("Reset local connection to store: {0}".format(self.store_loc))
+
+    def unlink(self):
+        """Destroy the arena. Only the interface returned by create does this."""
+        if not self._owner:
+            return
+        try:
+            shared_memory.SharedMemory(name=self.store_loc).unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.remove(self._lock_path(self.store_loc))
+        except FileNotFoundError:
+            pass
+
+    def subscribe(self):
+        pass  # nothing to subscribe to; kept for the common interface
+
+    def notify(self):
+        pass
+
+
+class AsyncRedisStoreInterface:
+    """Store interface for coroutines, on redis.asyncio.
+
+    Calls are awaited, so the event loop runs other tasks, such as an
+    actor's computation, while they wait for Redis. The coroutines of a
+    loop share a pool of up to max_connections connections, so as many
+    calls can be in flight at once; more wait for a free connection.
+    Objects are stored the way RedisStoreInterface stores them, so each
+    can get what the other put. An interface belongs to the event loop
+    it is first used in.
+    """
+
+    def __init__(
+        self,
+        name="default",
+        server_port_num=6379,
+        hostname="localhost",
+        ttl=None,
+        unix_socket_path=None,
+        max_connections=ASYNC_MAX_CONNECTIONS,
+        password=None,
+    ):
+        self.name = name
+        self.server_port_num = server_port_num
+        self.hostname = hostname
+        self.ttl = ttl
+        self.unix_socket_path = unix_socket_path
+        self.max_connections = max_connections
+        self.password = password
+        self.client = self.connect_to_server()
+        self._release_script = self.client.register_script(_RELEASE_SCRIPT)
+
+    @classmethod
+    def from_interface(cls, store, max_connections=ASYNC_MAX_CONNECTIONS):
+        """An interface to the server a RedisStoreInterface is connected to
+
+        Args:
+            store (RedisStoreInterface): the blocking interface
+            max_connections (int): most connections to keep
+        """
+        return cls(
+            store.name,
+            store.server_port_num,
+            store.hostname,
+            ttl=store.ttl,
+            unix_socket_path=store.unix_socket_path,
+            max_connections=max_connections,
+            password=store.password,
+        )
+
+    def uses_unix_socket(self):
+        """Whether to connect through the server's Unix socket: only if it
+        has one, and the server is on this machine"""
+        return _local_socket(self.unix_socket_path, self.hostname)
+
+    def connect_to_server(self):
+        """Make the client; connections are opened as calls need them
+
+        Returns:
+            redis.asyncio.Redis: the client
+        """
+        if self.uses_unix_socket():
+            address = {"unix_socket_path": self.unix_socket_path}
+        else:
+            address = {"host": self.hostname, "port": self.server_port_num}
+        pool = aioredis.BlockingConnectionPool(
+            max_connections=self.max_connections,
+            timeout=POOL_TIMEOUT,
+            retry=AsyncRetry(ConstantBackoff(0.25), 5),
+            retry_on_error=_RETRY_ON_ERROR,
+            password=self.password,
+            **_pool_address(aioredis, **address),
+        )
+        return aioredis.Redis(connection_pool=pool)
+
+    async def put(self, object, ttl=None, consumers=None, persist=False):
+        """Put a single object into the store; see RedisStoreInterface.put
+
+        Returns:
+            str: the key under which the object was stored, or None if
+            it could not be stored, e.g. because the store is full
+        """
+        object_key = _object_key(persist)
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            with registry.timer("store.put"):
+                parts = serialize(object)
+                if len(parts) == 1 and consumers is None:
+                    await self.client.set(
+                        object_key, parts[0], nx=True, px=_ttl_ms(ttl)
+                    )
+                else:
+                    pipe = self.client.pipeline(transaction=True)
+                    RedisStoreInterface._pipeline_put(
+                        pipe, object_key, parts, ttl, consumers
+                    )
+                    await pipe.execute()
+            registry.count("store.put_bytes", _nbytes(parts))
+        except Exception:
+            logger.error("Could not store object {}".format(object_key))
+            logger.error(traceback.format_exc())
+            return None
+
+        return object_key
+
+    async def put_many(
+        self, objects, object_names=None, ttl=None, consumers=None, persist=False
+    ):
+        """Put several objects into the store in a single round trip;
+        see RedisStoreInterface.put_many
+
+        Returns:
+            list: the keys of the objects, in the same order; all None if
+            they could not be stored
+        """
+        prefix = _object_key(persist)
+        object_keys = [prefix + "_" + str(i) for i in range(len(objects))]
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            with registry.timer("store.put_many"):
+                pipe = self.client.pipeline(transaction=True)
+                for object_key, object in zip(object_keys, objects):
+                    parts = serialize(object)
+                    RedisStoreInterface._pipeline_put(
+                        pipe, object_key, parts, ttl, consumers
+                    )
+                    registry.count("store.put_bytes", _nbytes(parts))
+                await pipe.execute()
+        except Exception:
+            logger.error("Could not store objects {}".format(object_keys))
+            logger.error(traceback.format_exc())
+            # the objects are put in one transaction, so none were stored
+            return [None] * len(objects)
+
+        return object_keys
+
+    async def get(self, object_key):
+        """Get an object by its key
+
+        Raises:
+            ObjectNotFoundError: If the key is not found
+        """
+        with registry.timer("store.get"):
+            object_value = await self.client.get(object_key)
+            if object_value:
+                registry.count("store.get_bytes", len(object_value))
+                return deserialize(object_value)
+
+        logger.warning("Object {} cannot be found.".format(object_key))
+        raise ObjectNotFoundError(object_key)
+
+    async def get_many(self, object_keys, raise_on_missing=True):
+        """Get several objects from the store with a single MGET
+
+        Args:
+            object_keys (list): the keys of the objects
+            raise_on_missing (bool): if False, keys that are not in the
+                store come back as None instead of raising
+
+        Returns:
+            list of the objects, in the same order
+
+        Raises:
+            ObjectNotFoundError: naming every key that is not found
+        """
+        t = time.perf_counter()
+        values = await self.client.mget(object_keys)
+        missing = _deserialize_many(object_keys, values)
+        registry.observe("store.get_many", time.perf_counter() - t)
+        if missing and raise_on_missing:
+            raise ObjectNotFoundError(missing)
+        return values
+
+    async def release(self, object_key):
+        """Release an object put with a number of consumers; see
+        RedisStoreInterface.release"""
+        return await self._release_script(
+            keys=[object_key, object_key + CONSUMERS_SUFFIX]
+        )
+
+    async def delete(self, object_keys):
+        """Delete objects from the store
+
+        Returns:
+            int: the number of objects deleted
+        """
+        if isinstance(object_keys, str):
+            object_keys = [object_keys]
+        if not object_keys:
+            return 0
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(*object_keys)
+        pipe.delete(*[key + CONSUMERS_SUFFIX for key in object_keys])
+        return (await pipe.execute())[0]
+
+    async def close(self):
+        """Close the client and every connection in its pool"""
+        await self.client.aclose()
+        await self.client.connection_pool.disconnect()
+
+
+class AsyncStoreAdapter:
+    """Awaitable calls to a blocking store interface.
+
+    For stores with no asyncio client, such as the shared-memory store:
+    each call is made on a thread, so the event loop keeps running while
+    it blocks. By default calls are made one at a time on a thread of
+    the adapter's own, since not every store interface can be used by
+    several threads at once.
+    """
+
+    def __init__(self, client, executor=None):
+        """
+        Args:
+            client (StoreInterface): the blocking store interface
+            executor (concurrent.futures.Executor): where to make calls;
+                a single thread if None
+        """
+        self.client = client
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(1, "store")
+
+    async def _call(self, method, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            functools.partial(getattr(self.client, method), *args, **kwargs),
+        )
+
+    async def put(self, *args, **kwargs):
+        return await self._call("put", *args, **kwargs)
+
+    async def put_many(self, *args, **kwargs):
+        return await self._call("put_many", *args, **kwargs)
+
+    async def get(self, *args, **kwargs):
+        return await self._call("get", *args, **kwargs)
+
+    async def get_many(self, *args, **kwargs):
+        return await self._call("get_many", *args, **kwargs)
+
+    async def release(self, *args, **kwargs):
+        return await self._call("release", *args, **kwargs)
+
+    async def delete(self, *args, **kwargs):
+        return await self._call("delete", *args, **kwargs)
+
+    async def close(self):
+        if self._own_executor:
+            self.executor.shutdown(wait=False)
+
+
 StoreInterface = RedisStoreInterface
 
 
@@ -60,7 +60,7 @@ class SocketLog(TextLog):
             if ready:
                 parts = await self.socket.recv_multipart()
                 msg_type = parts[0].decode("utf-8")
-                if msg_type != "DEBUG" or self.print_debug:
+                if msg_type not in ("DEBUG", "METRICS") or self.print_debug:
                     msg = self.format(parts)
                     self.write(msg)
                     self.post_message(self.Echo(self, msg))
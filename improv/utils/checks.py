@@ -33,6 +33,8 @@ def check_if_connections_acyclic(path_to_yaml):
     # Need to keep only module names
     connections = {}
     for key, values in raw.items():
+        if isinstance(values, dict):
+            values = values["targets"]
         new_key = key.split(".")[0]
         new_values = [value.split(".")[0] for value in values]
         connections[new_key] = new_values
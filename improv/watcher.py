@@ -1,4 +1,4 @@
-import numpy as np
+import os
 import asyncio
 
 # import pyarrow.plasma as plasma
@@ -12,24 +12,60 @@ import logging
 import concurrent
 
 # from pyarrow.plasma import ObjectNotAvailable
-from improv.actor import Actor, Signal, RunManager
+from improv.actor import Actor, Signal
 from improv.store import ObjectNotFoundError
-import pickle
+from improv.persistence import (
+    BatchWriter,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_PENDING_BYTES,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# where a BasicWatcher saves the objects flagged by other actors
+WATCHED_FILE = "output/saved/watched.h5"
+# where a Watcher saves every object in the store
+STORE_FILE = "output/saved/store.h5"
+# longest time a BasicWatcher waits for flagged objects in each runStep
+POLL_TIMEOUT = 0.05  # seconds
+
 
 class BasicWatcher(Actor):
     """
     Actor that monitors stored objects from the other actors
     and saves objects that have been flagged by those actors
+
+    Actors flag an object by sending its store key and a name for it
+    (e.g. its frame number) on their watchout link. The objects are
+    saved in batches to one HDF5 file, on a background thread; see
+    improv.persistence.SavedObjects to read them back.
     """
 
-    def __init__(self, *args, inputs=None):
-        super().__init__(*args)
+    def __init__(
+        self,
+        *args,
+        inputs=None,
+        filename=WATCHED_FILE,
+        batch_size=DEFAULT_BATCH_SIZE,
+        max_pending_bytes=DEFAULT_MAX_PENDING_BYTES,
+        **kwargs,
+    ):
+        """
+        Args:
+            inputs (list): the watchout links of the flagging actors
+            filename (str): HDF5 file to save the objects to
+            batch_size (int): objects to collect before writing them
+            max_pending_bytes (int): most bytes of objects waiting to be
+                written; saving blocks while this many are
+        """
+        super().__init__(*args, **kwargs)
 
         self.watchin = inputs
+        self.filename = filename
+        self.batch_size = batch_size
+        self.max_pending_bytes = max_pending_bytes
+        self.writer = None
 
     def setup(self):
         """
@@ -40,26 +76,38 @@ class BasicWatcher(Actor):
         self.tasks = []
         self.polling = self.watchin
         self.setUp = False
+        self.loop = asyncio.new_event_loop()
+        if self.writer is None:
+            os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+            self.writer = BatchWriter(
+                self.filename,
+                batch_size=self.batch_size,
+                max_pending_bytes=self.max_pending_bytes,
+            )
 
     def run(self):
         """
         continually run the watcher to check all of the
-        input queues for objects to save
+        input queues for objects to save, then save what is left
         """
+        super().run()
+        if self.writer is not None:
+            self.writer.close()
+        logger.info("watcher saved {} objects".format(self.numSaved))
 
-        with RunManager(
-            self.name, self.watchrun, self.setup, self.q_sig, self.q_comm
-        ) as rm:
-            logger.info(rm)
+    def runStep(self):
+        self.watchrun()
 
-        print("watcher saved " + str(self.numSaved) + " objects")
+    def stop(self):
+        """Write all objects flagged so far to disk"""
+        if self.writer is not None:
+            self.writer.flush()
 
     def watchrun(self):
         """
-        set up async loop for polling
+        run one round of async polling
         """
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(self.watch())
+        self.loop.run_until_complete(self.watch())
 
     async def watch(self):
         """
@@ -74,7 +122,9 @@ class BasicWatcher(Actor):
             self.setUp = True
 
         done, pending = await asyncio.wait(
-            self.tasks, return_when=concurrent.futures.FIRST_COMPLETED
+            self.tasks,
+            timeout=POLL_TIMEOUT,
+            return_when=concurrent.futures.FIRST_COMPLETED,
         )
 
         for i, t in enumerate(self.tasks):
@@ -84,8 +134,9 @@ class BasicWatcher(Actor):
                     i
                 ].getStart()  # name of actor asking watcher to save the object
                 try:
-                    obj = self.client.getID(r[0])
-                    np.save("output/saved/" + actorID + r[1], obj)
+                    obj = self.client.get(r[0])
+                    self.writer.put(actorID, r[1], obj)
+                    self.numSaved += 1
                 except ObjectNotFoundError as e:
                     logger.info(e.message)
                     pass
@@ -98,11 +149,13 @@ class Watcher:
     """
 
     # Related to subscribe - could be private, i.e., _subscribe
-    def __init__(self, name, client):
+    def __init__(self, name, client, filename=STORE_FILE):
         self.name = name
         self.client = client
+        self.filename = filename
+        self.writer = None
         self.flag = False
-        self.saved_ids = []
+        self.saved_ids = set()
 
         self.client.subscribe()
         self.n = 0
@@ -111,6 +164,14 @@ class Watcher:
         self.q_sig = links
 
     def run(self):
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        self.writer = BatchWriter(self.filename)
+        try:
+            self._watch()
+        finally:
+            self.writer.close()
+
+    def _watch(self):
         while True:
             if self.flag:
                 try:
@@ -146,23 +207,21 @@ class Watcher:
     #         logger.error('Watcher error: {}'.format(e))
 
     def saveObj(self, obj, name):
-        with open(
-            "/media/hawkwings/Ext Hard Drive/dump/dump" + name + ".pkl", "wb"
-        ) as output:
-            pickle.dump(obj, output)
+        """Queue an object to be written, in a batch, to self.filename"""
+        self.writer.put(self.name, name, obj)
 
     def checkStoreInterface2(self):
-        objs = list(self.client.get_all().keys())
-        ids_to_save = list(set(objs) - set(self.saved_ids))
-
-        # with Pool() as pool:
-        #     saved_ids = pool.map(saveObjbyID, ids_to_save)
-        # print('Saved :', len(saved_ids))
-        # self.saved_ids.extend(saved_ids)
+        """Save the objects put in the store since the last check"""
+        ids_to_save = [id for id in self.client.keys() if id not in self.saved_ids]
 
         for id in ids_to_save:
-            self.saveObj(self.client.getID(id), str(id))
-            self.saved_ids.append(id)
+            try:
+                obj = self.client.get(id)
+            except ObjectNotFoundError:
+                # deleted, released or expired since it was listed
+                continue
+            self.saveObj(obj, str(id))
+            self.saved_ids.add(id)
 
 
 # def saveObjbyID(id):
@@ -0,0 +1,282 @@
+import hmac
+import pickle
+import logging
+from importlib import import_module
+from multiprocessing import get_context
+
+import zmq
+
+from improv.actor import AbstractActor, Signal
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# how long to wait for a reply to a request between Nexus and a worker
+REQUEST_TIMEOUT = 10.0  # seconds
+# how long a quitting worker waits for its actors to exit on their own
+QUIT_TIMEOUT = 5.0  # seconds
+
+
+class RemoteActor(AbstractActor):
+    """Stand-in that Nexus keeps for an actor run by a Worker.
+
+    Nexus gives it links like any other actor, but never instantiates
+    the actor class itself: when the worker named by host registers,
+    Nexus sends it spec() and the worker creates and runs the actor.
+    """
+
+    def __init__(self, name, packagename, classname, host, options=None):
+        """
+        Args:
+            name (str): name of the actor
+            packagename (str): module the actor class is in, importable
+                on the worker
+            classname (str): name of the actor class
+            host (str): name of the worker to run the actor on
+            options (dict): passed to the actor class constructor
+        """
+        super().__init__(name)
+        self.packagename = packagename
+        self.classname = classname
+        self.host = host
+        self.options = options or {}
+        self.started = False
+
+    def spec(self):
+        """Everything a worker needs to start the actor, as a dict"""
+        return {
+            "name": self.name,
+            "package": self.packagename,
+            "class": self.classname,
+            "options": self.options,
+            "links": self.links,
+            "store_port_num": self.store_port_num,
+            "store_hostname": self.store_hostname,
+            "store_password": self.store_password,
+        }
+
+    def run(self):
+        raise NotImplementedError(
+            "{} runs on worker {}, not in Nexus".format(self.name, self.host)
+        )
+
+
+def request(address, frames, timeout=REQUEST_TIMEOUT, context=None):
+    """Send a multipart request to a REP socket and return the reply.
+
+    Args:
+        address (str): endpoint of the REP socket
+        frames (list): bytes to send
+        timeout (float): seconds to wait for the reply, None for no limit
+
+    Raises:
+        TimeoutError: no reply came in time
+
+    Returns:
+        list: the frames of the reply
+    """
+    context = context or zmq.Context.instance()
+    socket = context.socket(zmq.REQ)
+    socket.setsockopt(zmq.LINGER, 0)
+    socket.connect(address)
+    try:
+        socket.send_multipart(frames)
+        if not socket.poll(None if timeout is None else timeout * 1000):
+            raise TimeoutError("No reply from {}".format(address))
+        return socket.recv_multipart()
+    finally:
+        socket.close()
+
+
+def is_loopback(hostname):
+    """Whether hostname only reaches this machine"""
+    return hostname in ("127.0.0.1", "localhost")
+
+
+def check_token(expected, given):
+    """Compare a token sent with a request to the one expected, in
+    constant time. No token is expected where expected is None.
+
+    Args:
+        expected (str): the shared token, or None
+        given (bytes): the token that came with the request
+    """
+    return hmac.compare_digest((expected or "").encode(), given)
+
+
+def _runActor(actor):
+    actor._getStoreInterface()
+    actor.run()
+
+
+class Worker:
+    """Hosts actors for a Nexus on another machine.
+
+    A worker binds a REP socket, registers its address with Nexus over
+    Nexus's control port, and then waits for requests: start, with the
+    pickled spec of an actor to run in a new process, and quit. Signals
+    and data then go straight between the actors and Nexus over their
+    links, which must be able to cross machines (zmq links).
+
+    Every request carries the token shared with Nexus (its settings'
+    worker_token), and requests without it are refused before anything
+    in them is unpickled. A worker reachable from other machines must
+    have a token.
+    """
+
+    def __init__(self, name, control_address, hostname="127.0.0.1", port=0, token=None):
+        """
+        Args:
+            name (str): name that actors' host option refers to
+            control_address (str): host:port of Nexus's control port
+            hostname (str): address Nexus can reach this machine at; the
+                socket is bound to this interface only
+            port (int): port to listen on, 0 for any free port
+            token (str): secret shared with Nexus, required unless
+                hostname is the loopback interface
+
+        Raises:
+            ValueError: hostname is not the loopback interface and no
+                token was given
+        """
+        if not token and not is_loopback(hostname):
+            raise ValueError(
+                "Worker {} listens on {}, which needs a token".format(name, hostname)
+            )
+        self.name = name
+        self.control_address = "tcp://" + control_address
+        self.hostname = hostname
+        self.port = port
+        self.token = token
+        self.processes = {}
+
+        self.context = zmq.Context.instance()
+        self.socket = None
+        self.address = None
+
+    def __str__(self):
+        return self.name
+
+    def bind(self):
+        """Bind the socket that Nexus sends requests to
+
+        Returns:
+            str: the address Nexus should use to reach this worker
+        """
+        self.socket = self.context.socket(zmq.REP)
+        interface = "tcp://{}".format(
+            "127.0.0.1" if is_loopback(self.hostname) else self.hostname
+        )
+        if self.port:
+            self.socket.bind("{}:{}".format(interface, self.port))
+        else:
+            self.port = self.socket.bind_to_random_port(interface)
+        self.address = "tcp://{}:{}".format(self.hostname, self.port)
+        return self.address
+
+    def register(self, timeout=None):
+        """Tell Nexus where to find this worker.
+
+        Nexus does not have to be running yet: the request is delivered
+        once it starts listening on its control port.
+
+        Args:
+            timeout (float): seconds to wait for Nexus, None for no limit
+
+        Raises:
+            PermissionError: Nexus refused the registration
+        """
+        if self.socket is None:
+            self.bind()
+        frames = [
+            b.encode()
+            for b in (Signal.register(), self.name, self.address, self.token or "")
+        ]
+        logger.info("Registering {} at {} with Nexus".format(self.name, self.address))
+        reply = request(self.control_address, frames, timeout, self.context)
+        logger.info("Nexus replied: {}".format(reply[0].decode()))
+        if reply[0] != b"Registered":
+            self.socket.close()
+            raise PermissionError(
+                "Nexus refused worker {}: {}".format(self.name, reply[0].decode())
+            )
+
+    def run(self, timeout=None):
+        """Register with Nexus, then serve its requests until it quits
+
+        Requests are a command, the token, and the command's arguments.
+
+        Args:
+            timeout (float): seconds to wait for Nexus to answer the
+                registration, None for no limit
+        """
+        self.register(timeout)
+        while True:
+            msg = self.socket.recv_multipart()
+            if len(msg) < 2 or not check_token(self.token, msg[1]):
+                logger.error("Refused a request without the worker token")
+                self.socket.send_multipart([b"error", b"unauthorized"])
+                continue
+            command = msg[0].decode()
+            if command == "start":
+                try:
+                    name = self.startActor(pickle.loads(msg[2]))
+                    self.socket.send_multipart([b"started", name.encode()])
+                except Exception as e:
+                    logger.exception("Could not start actor: {}".format(e))
+                    self.socket.send_multipart([b"error", str(e).encode()])
+            elif command == Signal.quit():
+                self.stop()
+                self.socket.send_multipart([b"quit"])
+                break
+            else:
+                logger.error("Unknown request from Nexus: {}".format(command))
+                self.socket.send_multipart([b"error", b"unknown request"])
+        self.socket.close()
+        logger.info("Worker {} done".format(self.name))
+
+    def startActor(self, spec):
+        """Instantiate an actor from its spec and run it in a new process
+
+        Args:
+            spec (dict): from RemoteActor.spec
+
+        Returns:
+            str: the name of the actor
+        """
+        name = spec["name"]
+        mod = import_module(spec["package"])
+        clss = getattr(mod, spec["class"])
+        actor = clss(name, store_port_num=spec["store_port_num"], **spec["options"])
+        actor.store_hostname = spec["store_hostname"]
+        actor.store_password = spec["store_password"]
+
+        links = dict(spec["links"])
+        actor.setCommLinks(links.pop("q_comm"), links.pop("q_sig"))
+        for link_name, link in links.items():
+            if link_name == "q_in":
+                actor.setLinkIn(link)
+            elif link_name == "q_out":
+                actor.setLinkOut(link)
+            elif link_name == "q_watchout":
+                actor.setLinkWatch(link)
+            else:
+                actor.addLink(link_name, link)
+
+        p = get_context("fork").Process(target=_runActor, name=name, args=(actor,))
+        p.daemon = True
+        p.start()
+        self.processes[name] = p
+        logger.info("Started actor {} in process {}".format(name, p.pid))
+        return name
+
+    def stop(self):
+        """Wait for the actors to exit after Nexus told them to quit,
+        then terminate any that have not."""
+        for name, p in self.processes.items():
+            p.join(QUIT_TIMEOUT)
+            if p.exitcode is None:
+                logger.warning("Terminating actor {}".format(name))
+                p.terminate()
+                p.join()
+        self.processes = {}
@@ -0,0 +1,34 @@
+import os
+import time
+from improv.actor import Actor
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class Counter(Actor):
+    """Sample actor that counts its steps and checkpoints the count.
+
+    Used to test restarting actors from their checkpoints.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count = 0
+        self.restored = False
+
+    def setup(self):
+        self.count = 0
+        logger.info("Completed setup for Counter")
+
+    def runStep(self):
+        self.count += 1
+        time.sleep(0.001)
+
+    def get_state(self):
+        return {"count": self.count, "restored": self.restored, "pid": os.getpid()}
+
+    def set_state(self, state):
+        self.count = state["count"]
+        self.restored = True
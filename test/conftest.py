@@ -1,9 +1,13 @@
 import os
+import time
 import signal
 import uuid
 import pytest
 import subprocess
 
+from redis import Redis
+from redis.exceptions import RedisError
+
 store_loc = str(os.path.join("/tmp/", str(uuid.uuid4())))
 redis_port_num = 6379
 WAIT_TIMEOUT = 120
@@ -36,6 +40,16 @@ def setup_store(server_port_num):
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
     )
+    # wait until it is listening, so tests can rely on the port being taken
+    client = Redis(port=server_port_num)
+    deadline = time.time() + 10
+    while p.poll() is None and time.time() < deadline:
+        try:
+            client.ping()
+            break
+        except RedisError:
+            time.sleep(0.01)
+    client.close()
 
     yield p
 
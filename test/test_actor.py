@@ -1,8 +1,14 @@
 import os
+import queue
+import asyncio
+import threading
+import multiprocessing
+import time
 import psutil
 import pytest
-from improv.link import Link  # , AsyncQueue
+from improv.link import Link, ShmLink  # , AsyncQueue
 from improv.actor import AbstractActor as Actor
+from improv.actor import AsyncActor, AsyncRunManager, RunManager, Signal
 from improv.store import StoreInterface, PlasmaStoreInterface
 
 # set global_variables
@@ -106,6 +112,61 @@ def test_setStoreInterface(setup_store, server_port_num):
     assert act.client is store.client
 
 
+def test_createAsyncStoreInterface(setup_store, server_port_num):
+    from improv.journal import RecordingStore
+    from improv.store import AsyncRedisStoreInterface, AsyncStoreAdapter
+
+    act = AsyncActor("Async")
+    assert act.createAsyncStoreInterface() is None
+
+    act.setStoreInterface(StoreInterface(server_port_num=server_port_num))
+    astore = act.createAsyncStoreInterface()
+    assert isinstance(astore, AsyncRedisStoreInterface)
+    assert astore.server_port_num == server_port_num
+
+    # gets through a recording client have to be recorded
+    act.setStoreInterface(RecordingStore(act.client, None))
+    assert isinstance(act.createAsyncStoreInterface(), AsyncStoreAdapter)
+
+
+class SpawnAsyncActor(AsyncActor):
+    async def setup(self):
+        # connects in its own process, as spawned actors do
+        self._getStoreInterface()
+        self.done = False
+
+    async def runStep(self):
+        if not self.done:
+            self.q_out.put(await self.async_client.put(self.name))
+            self.done = True
+
+
+def test_async_client_in_spawned_actor(setup_store, server_port_num):
+    """Tests that an async actor that connects to the store in setup, in a
+    spawned process, gets an async client."""
+
+    ctx = multiprocessing.get_context("spawn")
+    act = SpawnAsyncActor("Async", None, "spawn", server_port_num)
+    act.setCommLinks(ctx.Queue(), ctx.Queue())
+    act.setLinkOut(ctx.Queue())
+    p = ctx.Process(target=act.run)
+    p.start()
+    try:
+        act.q_sig.put(Signal.setup())
+        assert act.q_comm.get(timeout=10) == [Signal.ready()]
+        act.q_sig.put(Signal.run())
+        key = act.q_out.get(timeout=10)
+        assert key is not None
+        assert StoreInterface(server_port_num=server_port_num).get(key) == "Async"
+        act.q_sig.put(Signal.quit())
+        p.join(10)
+        assert p.exitcode == 0
+    finally:
+        if p.is_alive():
+            p.terminate()
+            p.join()
+
+
 def test_plasma_setStoreInterface(setup_plasma_store, set_store_loc):
     """Tests if the store is started and linked with the actor."""
 
@@ -347,3 +408,189 @@ def test_plasma_actor_connection(setup_plasma_store, set_store_loc):
     act1.q_in.put(msg)
 
     assert act2.q_out.get() == msg
+
+
+class CountingQueue(queue.Queue):
+    """Queue that counts calls to get, standing in for q_sig."""
+
+    def __init__(self):
+        super().__init__()
+        self.gets = 0
+
+    def get(self, *args, **kwargs):
+        self.gets += 1
+        return super().get(*args, **kwargs)
+
+
+def start_run_manager(actions, **kwargs):
+    links = {"q_sig": CountingQueue(), "q_comm": queue.Queue()}
+
+    def run():
+        with RunManager("Test", actions, links, **kwargs):
+            pass
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, links
+
+
+def test_run_manager_idle_blocks():
+    """Tests that an idle RunManager waits on q_sig instead of polling it."""
+
+    actions = {"setup": lambda: None, "run": lambda: None, "stop": lambda: None}
+    thread, links = start_run_manager(actions, idle_timeout=10)
+    time.sleep(0.5)
+    links["q_sig"].put(Signal.quit())
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert links["q_sig"].gets <= 2
+
+
+def test_run_manager_signal_interval():
+    """Tests that a running RunManager checks q_sig at the given cadence."""
+
+    steps = []
+    actions = {
+        "setup": lambda: None,
+        "run": lambda: steps.append(time.sleep(1e-4)),
+        "stop": lambda: None,
+    }
+    thread, links = start_run_manager(actions, signal_interval=0.05)
+    links["q_sig"].put(Signal.run())
+    time.sleep(0.5)
+    links["q_sig"].put(Signal.quit())
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert len(steps) > 100
+    # about one check every 50 ms, plus the ones that got run and quit
+    assert links["q_sig"].gets < 20
+
+
+def test_run_manager_setup_and_stop():
+    """Tests that setup reports ready and stop runs once before idling."""
+
+    calls = []
+    actions = {
+        "setup": lambda: calls.append("setup"),
+        "run": lambda: None,
+        "stop": lambda: calls.append("stop"),
+    }
+    thread, links = start_run_manager(actions)
+    for sig in [Signal.setup(), Signal.run(), Signal.stop(), Signal.quit()]:
+        links["q_sig"].put(sig)
+        time.sleep(0.1)
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert calls == ["setup", "stop"]
+    assert links["q_comm"].get_nowait() == [Signal.ready()]
+
+
+class StatefulActor(Actor):
+    """Actor whose state is a counter, for checkpoint tests."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count = 0
+
+    def get_state(self):
+        return {"count": self.count}
+
+    def set_state(self, state):
+        self.count = state["count"]
+
+
+def test_checkpoint_and_restore(tmp_path):
+    act = StatefulActor("Test")
+    assert not act.checkpoint()  # nowhere to save to
+
+    act.checkpoint_file = str(tmp_path / "Test.pkl")
+    assert not act.restore()  # nothing saved yet
+    act.count = 42
+    assert act.checkpoint()
+
+    restarted = StatefulActor("Test")
+    restarted.checkpoint_file = act.checkpoint_file
+    assert restarted.restore()
+    assert restarted.count == 42
+
+
+def test_no_checkpoint_without_state(tmp_path):
+    act = Actor("Test")
+    act.checkpoint_file = str(tmp_path / "Test.pkl")
+
+    assert not act.checkpoint()
+    assert not os.path.exists(act.checkpoint_file)
+
+
+@pytest.mark.parametrize(("restored", "expected"), [(True, []), (False, ["setup"])])
+def test_run_manager_restore(restored, expected):
+    """Tests that restore replaces setup unless there is no checkpoint."""
+
+    calls = []
+    actions = {
+        "setup": lambda: calls.append("setup"),
+        "run": lambda: None,
+        "stop": lambda: None,
+        "restore": lambda: restored,
+    }
+    thread, links = start_run_manager(actions)
+    links["q_sig"].put(Signal.restore())
+    time.sleep(0.1)
+    links["q_sig"].put(Signal.quit())
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert calls == expected
+    assert links["q_comm"].get_nowait() == [Signal.ready()]
+
+
+def test_run_manager_checkpoints():
+    """Tests that a running actor is checkpointed periodically and on stop."""
+
+    checkpoints = []
+    actions = {
+        "setup": lambda: None,
+        "run": lambda: time.sleep(1e-3),
+        "stop": lambda: checkpoints.append("stop"),
+        "checkpoint": lambda: checkpoints.append("checkpoint"),
+    }
+    thread, links = start_run_manager(actions, checkpoint_interval=0.1)
+    links["q_sig"].put(Signal.run())
+    time.sleep(0.55)
+    links["q_sig"].put(Signal.stop())
+    time.sleep(0.1)
+    links["q_sig"].put(Signal.quit())
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert 3 <= checkpoints.count("checkpoint") <= 6
+    # saved once more after stopping
+    assert checkpoints[-2:] == ["stop", "checkpoint"]
+
+
+def test_async_run_manager_idle_waits_on_link():
+    """Tests that an idle AsyncRunManager waits for signals on the event
+    loop, without leaving a thread waiting on q_sig after each timeout."""
+
+    async def noop():
+        pass
+
+    q_sig = ShmLink("Test_sig", "Nexus", "Test", capacity=1024)
+    links = {"q_sig": q_sig, "q_comm": queue.Queue()}
+    actions = {"setup": noop, "run": noop, "stop": noop}
+
+    async def run():
+        manager = AsyncRunManager("Test", actions, links, idle_timeout=0.05)
+        asyncio.get_running_loop().call_later(0.3, q_sig.put, Signal.quit())
+        await asyncio.wait_for(manager.run_actor(), 5)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(run())
+        assert loop._default_executor is None
+    finally:
+        loop.close()
+        q_sig.queue.unlink()
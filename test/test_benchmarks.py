@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from benchmarks import connection
+from benchmarks.run import (
+    cases,
+    compare,
+    default_items,
+    main,
+    make_config,
+    parse_size,
+    summarize,
+)
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [("512", 512), ("1K", 1024), ("64k", 65536), ("16MB", 16 * 1024**2), (8, 8)],
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+def test_default_items():
+    assert default_items(1024) == 2000
+    assert default_items(16 * 1024**2) == 100
+
+
+def test_cases_skip_zmq_without_redis():
+    found = list(cases(["redis", "shm"], ["zmq", "shm"], ["1K"], [1]))
+
+    assert {(c["store"], c["link"]) for c in found} == {
+        ("redis", "zmq"),
+        ("redis", "shm"),
+        ("shm", "shm"),
+    }
+    assert all(c["size"] == 1024 for c in found)
+
+
+def test_make_config(tmp_path):
+    case = {"store": "shm", "link": "shm", "size": 1024, "fanout": 3}
+    config = make_config(case, str(tmp_path), n_items=10)
+
+    assert list(config["actors"]) == ["Source", "Sink0", "Sink1", "Sink2"]
+    assert config["actors"]["Source"]["consumers"] == 3
+    # several targets of a shm link share one broadcast log
+    assert config["connections"]["Source.q_out"]["type"] == "broadcast"
+    assert "shm_config" in config
+
+
+def test_make_config_frames(tmp_path):
+    case = {"store": "redis", "link": "frames", "size": 4096, "fanout": 1}
+    connection = make_config(case, str(tmp_path), 10)["connections"]["Source.q_out"]
+
+    assert connection["type"] == "frames"
+    assert connection["shape"] == [4096]
+
+
+def test_summarize():
+    sinks = [
+        {"items": 3, "bytes": 300, "first": 10.0, "last": 11.0, "latencies": [1, 2, 3]},
+        {"items": 3, "bytes": 300, "first": 10.5, "last": 12.0, "latencies": [4, 5, 6]},
+    ]
+    summary = summarize(sinks, cpu_seconds=1.0, wall_seconds=4.0)
+
+    assert summary["latency_p50"] == 3.5
+    assert summary["latency_max"] == 6
+    assert summary["throughput"] == 1.0
+    assert summary["bytes_per_second"] == 300
+    assert summary["cpu_percent"] == 25
+
+
+def test_compare():
+    case = {"store": "shm", "link": "shm", "size": 1024, "fanout": 1}
+    before = dict(case, status="ok", latency_p50=1.0, throughput=100.0)
+    slower = dict(case, status="ok", latency_p50=1.5, throughput=90.0)
+    faster = dict(case, status="ok", latency_p50=0.5, throughput=200.0)
+
+    assert compare([before], [faster]) == []
+    assert compare([before], [slower]) == [
+        (("shm", "shm", 1024, 1), "latency_p50", 1.0, 1.5)
+    ]
+    assert compare([before], [slower], tolerance=0.6) == []
+
+
+def test_run_and_compare(tmp_path):
+    """Tests a small case end to end, and comparing it to itself."""
+    output = str(tmp_path / "results.json")
+    args = ["--stores", "shm", "--links", "shm", "--sizes", "1K", "--fanouts", "2"]
+
+    assert main(args + ["--items", "50", "-o", output]) == 0
+    with open(output) as f:
+        results = json.load(f)
+    result = results["results"][0]
+    assert result["status"] == "ok", result.get("error")
+    assert result["items"] == 50
+    assert result["dropped"] == 0
+    assert 0 < result["latency_p50"] <= result["latency_p99"]
+    assert "python" in results["meta"]
+
+    # the same results are no regression against themselves
+    assert compare(results["results"], results["results"]) == []
+
+
+def test_connection_speedup():
+    tcp = {"transport": "tcp", "size": 1024, "status": "ok"}
+    tcp.update(put_p50=2.0, get_p50=3.0)
+    unix = {"transport": "unix", "size": 1024, "status": "ok"}
+    unix.update(put_p50=1.0, get_p50=2.0)
+    connection.speedup([tcp, unix])
+
+    assert unix["put_p50_speedup"] == 2.0
+    assert unix["get_p50_speedup"] == 1.5
+    assert "put_p50_speedup" not in tcp
+
+
+def test_connection_run(tmp_path):
+    """Tests measuring both transports end to end."""
+    output = str(tmp_path / "connection.json")
+
+    assert connection.main(["--sizes", "1K", "--items", "20", "-o", output]) == 0
+    with open(output) as f:
+        results = json.load(f)["results"]
+    assert [r["transport"] for r in results] == ["tcp", "unix"]
+    for result in results:
+        assert result["status"] == "ok", result.get("error")
+        assert 0 < result["put_p50"] <= result["put_p99"]
+    assert results[1]["get_p50_speedup"] > 0
@@ -169,6 +169,7 @@ def test_non_ip_is_error(mode, flag, expected):
     [
         ("client", "-c", "127.0.0.1:6000"),
         ("client", "-s", "155.4.4.3:4000"),
+        ("worker", "-c", "155.4.4.3:4000"),
     ],
 )
 def test_can_override_ip(mode, flag, expected):
@@ -182,6 +183,28 @@ def test_can_override_ip(mode, flag, expected):
     assert vars(args)[params[flag]] == expected
 
 
+def test_worker_args():
+    args = cli.parse_cli_args(
+        [
+            "worker",
+            "-c",
+            "6000",
+            "-n",
+            "worker1",
+            "--hostname",
+            "10.0.0.2",
+            "--token",
+            "secret",
+        ]
+    )
+    assert args.control_port == "127.0.0.1:6000"
+    assert args.name == "worker1"
+    assert args.hostname == "10.0.0.2"
+    assert args.port == 0
+    assert args.token == "secret"
+    assert args.func is cli.run_worker
+
+
 async def test_sigint_kills_server(server):
     server.send_signal(signal.SIGINT)
 
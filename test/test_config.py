@@ -191,3 +191,13 @@ def test_config_settings_read(set_configdir):
     cfg.createConfig()
 
     assert "store_size" in cfg.settings
+
+
+def test_config_connection_options(set_configdir):
+    cfg = Config("minimal_with_shm_link.yaml")
+    cfg.createConfig()
+
+    assert cfg.connections == {"Generator.q_out": ["Processor.q_in"]}
+    assert cfg.connection_options == {
+        "Generator.q_out": {"type": "shm", "capacity": 1048576}
+    }
@@ -40,6 +40,7 @@ def ip():
     [
         ("minimal", "minimal.yaml", "testlog"),
         ("minimal", "minimal_plasma.yaml", "testlog"),
+        ("minimal", "minimal_shm.yaml", "testlog"),
     ],
 )
 async def test_simple_boot_and_quit(dir, configfile, logfile, setdir, ports):
@@ -90,6 +91,7 @@ async def test_simple_boot_and_quit(dir, configfile, logfile, setdir, ports):
     [
         ("minimal", "minimal.yaml", "testlog", "sample_generator_data.npy"),
         ("minimal", "minimal_spawn.yaml", "testlog", "sample_generator_data.npy"),
+        ("minimal", "minimal_shm.yaml", "testlog", "sample_generator_data.npy"),
     ],
 )
 async def test_stop_output(dir, configfile, logfile, datafile, setdir, ports):
@@ -143,6 +145,64 @@ async def test_stop_output(dir, configfile, logfile, datafile, setdir, ports):
     os.remove(logfile)  # later, might want to read this file and check for messages
 
 
+async def test_remote_workers(setdir, ports):
+    """Tests a pipeline whose actors run on two workers on this host."""
+    os.chdir("minimal")
+
+    control_port, output_port, logging_port = ports
+    logfile = "testlog"
+
+    server_opts = [
+        "improv",
+        "server",
+        "-c",
+        str(control_port),
+        "-o",
+        str(output_port),
+        "-l",
+        str(logging_port),
+        "-f",
+        logfile,
+        "minimal_remote.yaml",
+    ]
+    worker_opts = [
+        ["improv", "worker", "-c", str(control_port), "-n", name, "-a", "."]
+        + ["-f", name + ".log"]
+        for name in ["worker1", "worker2"]
+    ]
+
+    with open(logfile, mode="a+") as log:
+        # workers may start before the server
+        workers = [subprocess.Popen(opts) for opts in worker_opts]
+        server = subprocess.Popen(server_opts, stdout=log, stderr=log)
+    await asyncio.sleep(SERVER_WARMUP)
+
+    app = tui.TUI(control_port, output_port, logging_port)
+
+    async with app.run_test() as pilot:
+        await pilot.press(*"setup", "enter")
+        await pilot.pause(1)
+        await pilot.press(*"run", "enter")
+        await pilot.pause(1)
+        await pilot.press(*"quit", "enter")
+        await pilot.pause(3)
+        assert not pilot.app._running
+
+    server.wait(10)
+    # workers exit when the server quits
+    assert [w.wait(10) for w in workers] == [0, 0]
+
+    with open(logfile) as log:
+        contents = log.read()
+    assert "Started Generator on worker worker1" in contents
+    assert "Started Processor on worker worker2" in contents
+    assert "Allowing start" in contents
+
+    os.remove(logfile)
+    for name in ["worker1", "worker2"]:
+        os.remove(name + ".log")
+
+
 def test_zmq_ps(ip, unused_tcp_port):
     """Tests if we can set the zmq PUB/SUB socket and send message."""
     port = unused_tcp_port
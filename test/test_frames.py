@@ -0,0 +1,113 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from improv.frames import FrameBuffer, FrameOverwrittenError, FrameRef
+
+
+@pytest.fixture
+def frame_buffer():
+    """Fixture to provide a small frame buffer."""
+    buf = FrameBuffer((4, 6), dtype="uint16", slots=3)
+    yield buf
+    buf.close()
+    buf.unlink()
+
+
+def _frame(i):
+    return np.full((4, 6), i, dtype="uint16")
+
+
+def test_write_read(frame_buffer):
+    ref = frame_buffer.write(_frame(7))
+
+    assert ref == FrameRef(0, 1)
+    assert np.array_equal(frame_buffer.read(ref), _frame(7))
+    assert frame_buffer.latest() == ref
+
+
+def test_read_is_a_read_only_view(frame_buffer):
+    ref = frame_buffer.write(_frame(1))
+    frame = frame_buffer.read(ref)
+
+    with pytest.raises(ValueError, match="read-only"):
+        frame[0, 0] = 2
+    # the view sees the slot itself, not a copy
+    assert np.shares_memory(frame, frame_buffer.read(ref))
+
+
+def test_slots_are_reused(frame_buffer):
+    refs = [frame_buffer.write(_frame(i)) for i in range(5)]
+
+    assert [r.slot for r in refs] == [0, 1, 2, 0, 1]
+    assert [frame_buffer.valid(r) for r in refs] == [False, False, True, True, True]
+    with pytest.raises(FrameOverwrittenError):
+        frame_buffer.read(refs[0])
+    assert np.array_equal(frame_buffer.read(refs[3]), _frame(3))
+
+
+def test_copy_outlives_slot(frame_buffer):
+    ref = frame_buffer.write(_frame(1))
+    frame = frame_buffer.read(ref, copy=True)
+    for i in range(3):
+        frame_buffer.write(_frame(2))
+
+    assert not frame_buffer.valid(ref)
+    assert np.array_equal(frame, _frame(1))
+
+
+def test_claim_and_publish(frame_buffer):
+    slot = frame_buffer.claim()
+    slot[:] = 5
+
+    assert frame_buffer.latest() is None
+    ref = frame_buffer.publish()
+    assert np.array_equal(frame_buffer.read(ref), _frame(5))
+
+
+def test_claimed_slot_is_invalid(frame_buffer):
+    refs = [frame_buffer.write(_frame(i)) for i in range(3)]
+    frame_buffer.claim()
+
+    assert not frame_buffer.valid(refs[0])
+    assert frame_buffer.valid(refs[1])
+
+
+def test_publish_without_claim(frame_buffer):
+    with pytest.raises(RuntimeError):
+        frame_buffer.publish()
+
+
+def test_wrong_shape(frame_buffer):
+    with pytest.raises(ValueError, match="does not fit"):
+        frame_buffer.write(np.zeros((6, 4)))
+
+
+def test_odd_frame_size():
+    """Tests if frames that are not a multiple of a cache line line up."""
+    buf = FrameBuffer((3, 5), dtype="uint8", slots=4)
+    try:
+        refs = [buf.write(np.full((3, 5), i, dtype="uint8")) for i in range(4)]
+        assert [int(buf.read(r).sum()) for r in refs] == [i * 15 for i in range(4)]
+    finally:
+        buf.close()
+        buf.unlink()
+
+
+def _writer(buf, n):
+    for i in range(n):
+        buf.write(_frame(i))
+
+
+def test_across_spawn(frame_buffer):
+    """Tests if a frame buffer survives being pickled into a spawned process."""
+    p = multiprocessing.get_context("spawn").Process(
+        target=_writer, args=(frame_buffer, 4)
+    )
+    p.start()
+    p.join(10)
+
+    ref = frame_buffer.latest()
+    assert ref == FrameRef(0, 4)
+    assert np.array_equal(frame_buffer.read(ref), _frame(3))
@@ -0,0 +1,154 @@
+import time
+
+import numpy as np
+import pytest
+
+from improv.actor import Actor
+from improv.journal import (
+    Journal,
+    JournalWriter,
+    RecordingStore,
+    Replayer,
+    ReplayStore,
+)
+from improv.link import Link
+
+
+class Mean(Actor):
+    """Takes the mean of the arrays whose keys it receives on q_in."""
+
+    def setup(self):
+        self.means = []
+
+    def runStep(self):
+        key = self.q_in.get(timeout=1)
+        self.means.append(float(np.mean(self.client.get(key))))
+
+
+class FakeStore:
+    def __init__(self):
+        self.objects = {}
+
+    def put(self, obj):
+        key = str(len(self.objects))
+        self.objects[key] = obj
+        return key
+
+    def get(self, key):
+        return self.objects[key]
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    return str(tmp_path / "journal")
+
+
+def test_write_read(journal_dir):
+    writer = JournalWriter(journal_dir + "/Mean.journal")
+    writer.message("q_in", ["a", 1], t=10.0)
+    writer.object("a", np.arange(4))
+    writer.object("a", np.zeros(4))  # recorded once
+    writer.message("q_extra", {"b": 2}, t=11.0)
+    writer.close()
+
+    journal = Journal(journal_dir)
+    assert journal.actors() == ["Mean"]
+    assert list(journal.messages("Mean")) == [
+        (10.0, "q_in", ["a", 1]),
+        (11.0, "q_extra", {"b": 2}),
+    ]
+    assert list(journal.messages("Mean", ["q_extra"])) == [(11.0, "q_extra", {"b": 2})]
+    np.testing.assert_array_equal(journal.get("Mean", "a"), np.arange(4))
+    with pytest.raises(KeyError):
+        journal.get("Mean", "b")
+    journal.close()
+
+
+def test_append(journal_dir):
+    for i in range(2):
+        writer = JournalWriter(journal_dir + "/Mean.journal")
+        writer.message("q_in", i, t=float(i))
+        writer.close()
+
+    journal = Journal(journal_dir)
+    assert [m for _, _, m in journal.messages("Mean")] == [0, 1]
+    journal.close()
+
+
+def test_record_links_and_store(journal_dir):
+    store = FakeStore()
+    link = Link("Source_Mean", "Source.q_out", "Mean.q_in")
+    actor = Mean("Mean")
+    actor.setLinkIn(link)
+    actor.setStoreInterface(store)
+    actor.journal_file = journal_dir + "/Mean.journal"
+    actor.startJournal()
+    assert isinstance(actor.client, RecordingStore)
+
+    actor.setup()
+    before = time.time()
+    for i in range(3):
+        link.put(store.put(np.full(4, i)))
+        actor.runStep()
+    actor.stopJournal()
+
+    journal = Journal(journal_dir)
+    messages = list(journal.messages("Mean"))
+    assert [(link, key) for _, link, key in messages] == [
+        ("q_in", "0"),
+        ("q_in", "1"),
+        ("q_in", "2"),
+    ]
+    assert all(t >= before for t, _, _ in messages)
+    np.testing.assert_array_equal(journal.get("Mean", "2"), np.full(4, 2))
+    journal.close()
+
+
+def test_replay_store(journal_dir):
+    writer = JournalWriter(journal_dir + "/Mean.journal")
+    writer.object("recorded", "from the journal")
+    writer.close()
+    store = FakeStore()
+    key = store.put("from the store")
+
+    replay = ReplayStore(store, journal_dir, "Mean")
+    assert replay.get("recorded") == "from the journal"
+    assert replay.get(key) == "from the store"
+    assert replay.put("new") == "1"
+
+
+@pytest.mark.parametrize("speed", [None, 10.0])
+def test_replay(journal_dir, speed):
+    """Records an actor, then replays it alone from its journal."""
+    store = FakeStore()
+    link = Link("Source_Mean", "Source.q_out", "Mean.q_in")
+    actor = Mean("Mean")
+    actor.setLinkIn(link)
+    actor.setStoreInterface(store)
+    actor.journal_file = journal_dir + "/Mean.journal"
+    actor.startJournal()
+    actor.setup()
+    for i in range(5):
+        link.put(store.put(np.arange(i, i + 3)))
+        actor.runStep()
+        time.sleep(0.02)
+    actor.stopJournal()
+
+    # a fresh store that has none of the recorded objects
+    replay_link = Link("Source_Mean", "Source.q_out", "Mean.q_in")
+    replayed = Mean("Mean")
+    replayed.setLinkIn(replay_link)
+    replayed.setStoreInterface(ReplayStore(FakeStore(), journal_dir, "Mean"))
+    replayed.setup()
+
+    replayer = Replayer(Journal(journal_dir), {"Mean": {"q_in": replay_link}}, speed)
+    start = time.perf_counter()
+    assert replayer.run() == 5
+    elapsed = time.perf_counter() - start
+    for _ in range(5):
+        replayed.runStep()
+
+    assert replayed.means == actor.means
+    if speed:
+        # 4 gaps of at least 20 ms, 10 times faster
+        assert elapsed >= 0.008
@@ -1,13 +1,32 @@
 import asyncio
+import multiprocessing
+import os
 import queue
 import subprocess
 import time
+from multiprocessing import shared_memory
 
+import pickle
+
+import numpy as np
 import pytest
+import zmq
 
 from improv.actor import Actor
 
-from improv.link import Link
+from improv.link import (
+    BroadcastLink,
+    FrameLink,
+    FrameMultiLink,
+    InboxLink,
+    Link,
+    LinkFactory,
+    ShmLink,
+    ShmMultiLink,
+    ZmqLink,
+    ZmqMultiLink,
+)
+from improv.metrics import registry
 
 
 def init_actors(n=1):
@@ -32,6 +51,15 @@ def example_link(setup_store):
     lnk = None
 
 
+@pytest.fixture
+def example_shm_link():
+    """Fixture to provide a Link backed by a small shared-memory ring."""
+    act = init_actors(2)
+    lnk = ShmLink("Example", act[0].name, act[1].name, capacity=1024)
+    yield lnk
+    lnk.queue.unlink()
+
+
 @pytest.fixture
 def example_actor_system(setup_store):
     """Fixture to provide a list of 4 connected actors."""
@@ -214,6 +242,26 @@ def test_put_nowait(example_link):
     assert t_net < 0.005  # 5 ms
 
 
+def test_put_get_metrics(example_link):
+    """Tests if a put and get are recorded in the metrics registry,
+    and the receiver gets back the item that was put.
+    """
+
+    lnk = example_link
+    registry.reset()
+
+    lnk.put("message")
+    assert lnk.get_nowait() == "message"
+
+    name = lnk.metric_name
+    assert name == "link.Example->test 1"
+    assert registry.histograms[name + ".put"].count == 1
+    assert registry.histograms[name + ".latency"].count == 1
+    assert registry.counters[name + ".items"] == 1
+    assert registry.gauges[name + ".depth"] == (1, 1)
+    registry.reset()
+
+
 @pytest.mark.asyncio
 async def test_put_async_success(example_link):
     """Tests if put_async returns None.
@@ -451,3 +499,670 @@ async def test_multi_actor_system(example_actor_system, setup_store):
     assert await acts[2].links["q_in_1"].get_async() == light_msgs[1]
     assert await acts[3].links["q_in_1"].get_async() == light_msgs[0]
     assert await acts[3].links["q_in_2"].get_async() == light_msgs[2]
+
+
+def test_shm_put_get(example_shm_link):
+    """Tests if messages come out of a shm link in order."""
+
+    lnk = example_shm_link
+    messages = ["message", None, [str(i) for i in range(5)], {"a": 1}]
+    for msg in messages:
+        lnk.put(msg)
+
+    assert lnk.qsize() == len(messages)
+    assert [lnk.get() for _ in messages] == messages
+    assert lnk.empty()
+
+
+def test_shm_wraparound(example_shm_link):
+    """Tests if items that straddle the end of the ring are intact."""
+
+    lnk = example_shm_link
+    for i in range(100):
+        msg = str(i) * 30
+        lnk.put(msg)
+        assert lnk.get() == msg
+
+
+def test_shm_get_nowait_empty(example_shm_link):
+    with pytest.raises(queue.Empty):
+        example_shm_link.get_nowait()
+
+
+def test_shm_get_timeout(example_shm_link):
+    t_0 = time.perf_counter()
+    with pytest.raises(queue.Empty):
+        example_shm_link.get(timeout=0.1)
+    assert time.perf_counter() - t_0 >= 0.1
+
+
+def test_shm_put_full(example_shm_link):
+    """Tests if puts fail once the ring has no room left."""
+
+    lnk = example_shm_link
+    with pytest.raises(queue.Full):
+        for i in range(100):
+            lnk.put_nowait("x" * 100)
+
+    with pytest.raises(ValueError, match="does not fit"):
+        lnk.put("x" * 2000)
+
+
+def test_shm_maxsize():
+    lnk = ShmLink("Example", "start", "end", capacity=1024, maxsize=2)
+    lnk.put(1)
+    lnk.put(2)
+    assert lnk.full()
+    with pytest.raises(queue.Full):
+        lnk.queue.put(3, timeout=0.01)
+    lnk.queue.unlink()
+
+
+def _shm_producer(lnk, n):
+    for i in range(n):
+        lnk.put(i)
+
+
+def test_shm_across_processes(example_shm_link):
+    """Tests if a forked producer can feed a consumer in this process."""
+
+    lnk = example_shm_link
+    p = multiprocessing.get_context("fork").Process(
+        target=_shm_producer, args=(lnk, 500)
+    )
+    p.start()
+    out = [lnk.get(timeout=5) for _ in range(500)]
+    p.join()
+
+    assert out == list(range(500))
+
+
+def test_shm_across_spawn(example_shm_link):
+    """Tests if a shm link survives being pickled into a spawned process."""
+
+    lnk = example_shm_link
+    p = multiprocessing.get_context("spawn").Process(
+        target=_shm_producer, args=(lnk, 10)
+    )
+    p.start()
+    out = [lnk.get(timeout=10) for _ in range(10)]
+    p.join()
+
+    assert out == list(range(10))
+
+
+@pytest.mark.asyncio
+async def test_shm_put_and_get_async(example_shm_link):
+    messages = [str(i) for i in range(10)]
+
+    for msg in messages:
+        await example_shm_link.put_async(msg)
+
+    assert [await example_shm_link.get_async() for _ in messages] == messages
+    # shm links are awaited on the event loop, without a thread pool
+    assert example_shm_link.real_executor is None
+
+
+@pytest.mark.asyncio
+async def test_shm_get_async_waits(example_shm_link):
+    """Tests if get_async on an empty shm link wakes up for a later put."""
+
+    lnk = example_shm_link
+    task = asyncio.create_task(lnk.get_async())
+    await asyncio.sleep(0.1)
+    assert not task.done()
+    assert lnk.status == "pending"
+
+    await lnk.put_async("message")
+
+    assert await asyncio.wait_for(task, 1) == "message"
+    assert lnk.status == "done"
+    assert lnk.real_executor is None
+
+
+@pytest.mark.asyncio
+async def test_shm_get_async_from_process(example_shm_link):
+    """Tests if get_async wakes up for puts from another process."""
+
+    lnk = example_shm_link
+    p = multiprocessing.get_context("fork").Process(
+        target=_shm_producer, args=(lnk, 50)
+    )
+    p.start()
+    out = [await asyncio.wait_for(lnk.get_async(), 5) for _ in range(50)]
+    p.join()
+
+    assert out == list(range(50))
+
+
+@pytest.mark.asyncio
+async def test_shm_get_async_cancel(example_shm_link):
+    """Tests if a cancelled get_async stops watching the link."""
+
+    lnk = example_shm_link
+    task = asyncio.create_task(lnk.get_async())
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    lnk.put("message")
+    assert await asyncio.wait_for(lnk.get_async(), 1) == "message"
+
+
+def test_shm_multilink():
+    """Tests if every consumer of a shm multilink gets every message."""
+
+    lnk, ends = ShmMultiLink("Example", "start", ["end1", "end2"], capacity=1024)
+    lnk.put("message")
+
+    assert [e.get(timeout=1) for e in ends] == ["message", "message"]
+    for e in ends:
+        e.queue.unlink()
+
+
+@pytest.fixture
+def frame_link():
+    """Fixture to provide a link for 2x3 frames with 4 slots."""
+    lnk = FrameLink("Frames", "start", "end", shape=(2, 3), dtype="float32", slots=4)
+    yield lnk
+    lnk.queue.unlink()
+    lnk.frames.close()
+    lnk.frames.unlink()
+
+
+def test_frame_link_put_get(frame_link):
+    frame = np.arange(6, dtype="float32").reshape(2, 3)
+    frame_link.put(frame)
+
+    ref = frame_link.get(timeout=1)
+    assert np.array_equal(frame_link.frames.read(ref), frame)
+
+
+def test_frame_link_claim(frame_link):
+    """Tests if a frame written in place can be sent by its reference."""
+
+    frame_link.frames.claim()[:] = 2
+    frame_link.put(frame_link.frames.publish())
+
+    assert frame_link.frames.read(frame_link.get(timeout=1)).sum() == 12
+
+
+def test_frame_link_skips_overwritten(frame_link):
+    """Tests if a consumer that fell behind the buffer gets only live frames."""
+
+    for i in range(6):
+        frame_link.put(np.full((2, 3), i, dtype="float32"))
+
+    refs = [frame_link.get_nowait() for _ in range(4)]
+    assert [frame_link.frames.read(r)[0, 0] for r in refs] == [2, 3, 4, 5]
+    assert frame_link.dropped == 2
+    with pytest.raises(queue.Empty):
+        frame_link.get_nowait()
+
+
+def _frame_producer(lnk, n):
+    for i in range(n):
+        lnk.put(np.full((2, 3), i, dtype="float32"))
+
+
+def test_frame_link_across_processes(frame_link):
+    p = multiprocessing.get_context("fork").Process(
+        target=_frame_producer, args=(frame_link, 3)
+    )
+    p.start()
+    p.join(5)
+
+    refs = [frame_link.get(timeout=5) for _ in range(3)]
+    assert [frame_link.frames.read(r)[1, 2] for r in refs] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_frame_link_async(frame_link):
+    await frame_link.put_async(np.ones((2, 3)))
+    ref = await frame_link.get_async()
+
+    assert frame_link.frames.read(ref).sum() == 6
+    assert frame_link.frames.head == 1
+
+
+def test_frame_multilink():
+    """Tests if every consumer reads the same frame from one buffer."""
+
+    lnk, ends = FrameMultiLink("Frames", "start", ["end1", "end2"], shape=(8,))
+    lnk.put(np.arange(8))
+    refs = [e.get(timeout=1) for e in ends]
+
+    assert refs[0] == refs[1]
+    assert all(e.frames.read(r)[7] == 7 for e, r in zip(ends, refs))
+    assert lnk.frames.head == 1
+    lnk.queue.unlink()
+    lnk.frames.unlink()
+
+
+def test_factory_frame_link():
+    factory = LinkFactory()
+    lnk = factory.Link("Frames", "start", "end", link_type="frames", shape=(2, 2))
+    name = lnk.frames.shm_name
+    factory.shutdown()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+@pytest.fixture(params=["manager", "shm"])
+def make_link(request):
+    """Fixture to provide a function that makes links of either type."""
+    links = []
+
+    def make(**options):
+        if request.param == "manager":
+            lnk = Link("Example", "start", "end", **options)
+        else:
+            lnk = ShmLink("Example", "start", "end", capacity=4096, **options)
+        links.append(lnk)
+        return lnk
+
+    yield make
+    if request.param == "shm":
+        for lnk in links:
+            lnk.queue.unlink()
+
+
+@pytest.mark.parametrize(
+    ("policy", "expected"),
+    [("drop_oldest", [3, 4]), ("drop_newest", [0, 1]), ("latest", [4])],
+)
+def test_drop_policies(make_link, policy, expected):
+    """Tests which items a full link keeps under each drop policy."""
+
+    lnk = make_link(maxsize=2, policy=policy)
+    registry.reset()
+    for i in range(5):
+        lnk.put(i)
+
+    out = []
+    while True:
+        try:
+            out.append(lnk.get_nowait())
+        except queue.Empty:
+            break
+
+    assert out == expected
+    assert lnk.dropped == 5 - len(expected)
+    assert registry.counters[lnk.metric_name + ".dropped"] == 5 - len(expected)
+    registry.reset()
+
+
+def test_block_policy(make_link):
+    """Tests that a full link with the block policy refuses put_nowait."""
+
+    lnk = make_link(maxsize=2)
+    lnk.put(0)
+    lnk.put_nowait(1)
+    with pytest.raises(queue.Full):
+        lnk.put_nowait(2)
+    assert lnk.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_latest_put_async(make_link):
+    lnk = make_link(policy="latest")
+    for i in range(3):
+        await lnk.put_async(i)
+
+    assert await lnk.get_async() == 2
+
+
+@pytest.mark.parametrize(
+    ("options", "match"),
+    [
+        ({"policy": "newest"}, "Unknown link policy"),
+        ({"policy": "drop_oldest"}, "maxsize"),
+    ],
+)
+def test_bad_policy(options, match):
+    with pytest.raises(ValueError, match=match):
+        ShmLink("Example", "start", "end", capacity=1024, **options)
+
+
+@pytest.fixture
+def broadcast_link():
+    """Fixture to provide a function that makes small broadcast links."""
+    links = []
+
+    def make(n=3, **options):
+        ends = ["end" + str(i) for i in range(n)]
+        lnk, q_out = BroadcastLink("Example", "start", ends, capacity=1024, **options)
+        links.append(lnk)
+        return lnk, q_out
+
+    yield make
+    for lnk in links:
+        lnk.queue.unlink()
+
+
+def test_broadcast_put_get(broadcast_link):
+    """Tests if every consumer reads every item from a single put."""
+
+    lnk, q_out = broadcast_link()
+    messages = ["message", None, [1, 2], {"a": 1}]
+    for msg in messages:
+        lnk.put(msg)
+
+    assert lnk.lags() == {"end0": 4, "end1": 4, "end2": 4}
+    assert [q.get(timeout=1) for q in q_out for _ in messages] == messages * 3
+    assert lnk.qsize() == 0
+
+
+def test_broadcast_independent_cursors(broadcast_link):
+    """Tests if consumers read at their own pace and lag is per consumer."""
+
+    lnk, q_out = broadcast_link(n=2)
+    for i in range(5):
+        lnk.put(i)
+        assert q_out[0].get_nowait() == i
+
+    assert lnk.lags() == {"end0": 0, "end1": 5}
+    assert lnk.qsize() == 5
+    assert [q_out[1].get_nowait() for _ in range(5)] == list(range(5))
+    with pytest.raises(queue.Empty):
+        q_out[1].get_nowait()
+
+
+def test_broadcast_wraparound(broadcast_link):
+    """Tests if items that straddle the end of the log are intact."""
+
+    lnk, q_out = broadcast_link(n=2)
+    for i in range(100):
+        msg = str(i) * 30
+        lnk.put(msg)
+        assert [q.get_nowait() for q in q_out] == [msg, msg]
+
+
+def test_broadcast_slow_consumer_blocks(broadcast_link):
+    """Tests if a consumer that stopped reading fills up the log."""
+
+    lnk, q_out = broadcast_link(n=2, maxsize=3)
+    for i in range(3):
+        lnk.put(i)
+        q_out[0].get_nowait()
+
+    with pytest.raises(queue.Full):
+        lnk.put_nowait(3)
+    q_out[1].get_nowait()
+    lnk.put_nowait(3)
+
+
+def test_broadcast_overwrite(broadcast_link):
+    """Tests if the producer overruns a consumer that stopped reading."""
+
+    lnk, q_out = broadcast_link(n=2, maxsize=100, policy="drop_oldest")
+    registry.reset()
+    for i in range(200):
+        lnk.put("x" * 50 + str(i))
+        assert q_out[0].get_nowait() == "x" * 50 + str(i)
+
+    out = []
+    while True:
+        try:
+            out.append(q_out[1].get_nowait())
+        except queue.Empty:
+            break
+
+    # the log only had room for the newest few items
+    assert 0 < len(out) < 20
+    assert out[-1] == "x" * 50 + "199"
+    assert q_out[1].dropped == 200 - len(out)
+    assert q_out[0].dropped == 0
+    name = q_out[1].metric_name + ".dropped"
+    assert registry.counters[name] == 200 - len(out)
+    registry.reset()
+
+
+def test_broadcast_latest(broadcast_link):
+    lnk, q_out = broadcast_link(n=2, policy="latest")
+    for i in range(5):
+        lnk.put(i)
+
+    assert [q.get_nowait() for q in q_out] == [4, 4]
+
+
+@pytest.mark.asyncio
+async def test_broadcast_async(broadcast_link):
+    lnk, q_out = broadcast_link(n=2)
+    tasks = [asyncio.create_task(q.get_async()) for q in q_out]
+    await asyncio.sleep(0.05)
+    await lnk.put_async("message")
+
+    assert await asyncio.wait_for(asyncio.gather(*tasks), 1) == ["message"] * 2
+    assert all(q.real_executor is None for q in q_out)
+
+
+def _broadcast_consumer(q, n, results):
+    results.put([q.get(timeout=5) for _ in range(n)])
+
+
+def test_broadcast_across_processes(broadcast_link):
+    """Tests if forked consumers each read everything the producer puts."""
+
+    lnk, q_out = broadcast_link(n=2)
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=_broadcast_consumer, args=(q, 300, results)) for q in q_out
+    ]
+    for p in procs:
+        p.start()
+    for i in range(300):
+        lnk.put(i)
+    out = [results.get(timeout=10) for _ in procs]
+    for p in procs:
+        p.join()
+
+    assert out == [list(range(300))] * 2
+
+
+def _die_mid_update(log):
+    """Start updating the log's header as its producer, then die"""
+    buf = log._shm.buf
+    (version,) = log._VERSION.unpack_from(buf, 0)
+    log._PID.pack_into(buf, log._VERSION.size + log._WRITER.size, os.getpid())
+    log._VERSION.pack_into(buf, 0, version + 1)
+    os._exit(0)
+
+
+def test_broadcast_producer_died_mid_update(broadcast_link, monkeypatch):
+    """Tests if a consumer gives up on a producer that died while updating
+    the log, instead of spinning forever."""
+
+    monkeypatch.setattr("improv.link.WRITER_STALL_TIMEOUT", 0.1)
+    lnk, q_out = broadcast_link(n=1)
+    lnk.put("message")
+    p = multiprocessing.get_context("fork").Process(
+        target=_die_mid_update, args=(lnk.queue,)
+    )
+    p.start()
+    p.join()
+
+    start = time.monotonic()
+    with pytest.raises(EOFError, match="died"):
+        q_out[0].queue.get_nowait()
+    assert time.monotonic() - start < 5
+
+
+def test_link_factory_shares_managers():
+    """Tests if a factory spreads its links over a fixed pool of Managers."""
+
+    factory = LinkFactory(n_managers=2)
+    links = [factory.Link("L" + str(i), "start", "end") for i in range(5)]
+    multi, ends = factory.MultiLink("M", "start", ["end1", "end2"])
+    shm = factory.Link("S", "start", "end", link_type="shm", capacity=1024)
+
+    links[0].put("message")
+    multi.put("multi")
+    shm.put("shm")
+    stats = factory.stats()
+
+    try:
+        assert links[0].get(timeout=1) == "message"
+        assert [e.get(timeout=1) for e in ends] == ["multi", "multi"]
+        assert shm.get(timeout=1) == "shm"
+        assert stats["links"] == 7
+        assert stats["manager_processes"] == 2
+        assert factory.shm_queues == [shm.queue]
+    finally:
+        factory.shutdown()
+
+    assert factory.managers == []
+
+
+def test_link_factory_unknown_type():
+    factory = LinkFactory()
+    with pytest.raises(ValueError, match="Unknown link type"):
+        factory.Link("L", "start", "end", link_type="carrier pigeon")
+
+
+@pytest.fixture
+def zmq_link():
+    lnk = ZmqLink("Example", "start", "end")
+    yield lnk
+    lnk.queue.close()
+
+
+def test_zmq_put_get(zmq_link):
+    """Tests if messages come out of a zmq link in order."""
+
+    messages = ["message", None, [str(i) for i in range(5)], {"a": 1}]
+    for msg in messages:
+        zmq_link.put(msg)
+
+    assert [zmq_link.get(timeout=5) for _ in messages] == messages
+    with pytest.raises(queue.Empty):
+        zmq_link.get_nowait()
+    with pytest.raises(queue.Empty):
+        zmq_link.get(timeout=0.01)
+
+
+def test_zmq_across_spawn(zmq_link):
+    """Tests if a zmq link survives being pickled into a spawned process."""
+
+    p = multiprocessing.get_context("spawn").Process(
+        target=_shm_producer, args=(zmq_link, 100)
+    )
+    p.start()
+    out = [zmq_link.get(timeout=10) for _ in range(100)]
+    p.join()
+
+    assert out == list(range(100))
+
+
+def test_zmq_tcp(unused_tcp_port):
+    """Tests if a zmq link can bind one endpoint and connect to another."""
+
+    lnk = ZmqLink(
+        "Example",
+        "start",
+        "end",
+        address="tcp://127.0.0.1:{}".format(unused_tcp_port),
+        bind="tcp://*:{}".format(unused_tcp_port),
+    )
+    try:
+        lnk.put("message")
+        assert lnk.get(timeout=5) == "message"
+    finally:
+        lnk.queue.close()
+
+
+def test_zmq_producer_binds():
+    """Tests if a producer can bind any free port for consumers to find."""
+
+    lnk = ZmqLink(
+        "Example",
+        "start",
+        "end",
+        address="tcp://127.0.0.1:*",
+        bind="tcp://127.0.0.1:*",
+        producer_binds=True,
+    )
+    try:
+        lnk.queue.open()
+        assert not lnk.queue.address.endswith(":*")
+        # the producer only sends once a consumer has connected
+        with pytest.raises(queue.Empty):
+            lnk.get_nowait()
+        lnk.put("message")
+        assert lnk.get(timeout=5) == "message"
+    finally:
+        lnk.queue.close()
+
+
+def test_zmq_latest():
+    lnk = ZmqLink("Example", "start", "end", policy="latest")
+    try:
+        # the consumer binds first, so the producer is connected
+        with pytest.raises(queue.Empty):
+            lnk.get_nowait()
+        for i in range(5):
+            lnk.put(i)
+        time.sleep(0.2)
+        assert lnk.get(timeout=5) == 4
+        with pytest.raises(queue.Empty):
+            lnk.get_nowait()
+    finally:
+        lnk.queue.close()
+
+
+def test_zmq_drop_newest():
+    lnk = ZmqLink("Example", "start", "end", maxsize=2, policy="drop_newest")
+    try:
+        # no consumer has bound yet, so only the producer's buffer fills
+        for i in range(5):
+            lnk.put(i)
+        assert lnk.dropped == 3
+    finally:
+        lnk.queue.close()
+
+
+def test_zmq_drop_oldest():
+    with pytest.raises(ValueError, match="drop_oldest"):
+        ZmqLink("Example", "start", "end", maxsize=2, policy="drop_oldest")
+
+
+@pytest.mark.asyncio
+async def test_zmq_multi_link():
+    link, q_out = ZmqMultiLink("Example", "start", ["end1", "end2"])
+    try:
+        await link.put_async("message")
+        assert [await q.get_async() for q in q_out] == ["message", "message"]
+    finally:
+        for q in q_out:
+            q.queue.close()
+
+
+def test_inbox_link():
+    """Tests if inbox links from several actors reach one PULL socket."""
+
+    ctx = zmq.Context()
+    inbox = ctx.socket(zmq.PULL)
+    port = inbox.bind_to_random_port("tcp://127.0.0.1")
+    address = "tcp://127.0.0.1:{}".format(port)
+    links = [InboxLink(address, name, name, "Nexus") for name in ["A_comm", "B_comm"]]
+    try:
+        links[0].put(["ready"])
+        links[1].put_nowait({"b": 1})
+        received = {}
+        for _ in links:
+            assert inbox.poll(5000)
+            name, data = inbox.recv_multipart()
+            received[name.decode()] = pickle.loads(data)
+
+        assert links[0].received(received["A_comm"]) == ["ready"]
+        assert links[1].received(received["B_comm"]) == {"b": 1}
+        with pytest.raises(NotImplementedError):
+            links[0].qsize()
+    finally:
+        for lnk in links:
+            lnk.queue.close()
+        inbox.close(linger=0)
+        ctx.term()
@@ -0,0 +1,125 @@
+import json
+import time
+import threading
+
+import pytest
+
+from improv.metrics import Histogram, Metrics
+
+
+def test_histogram_summary():
+    h = Histogram()
+    for v in [1e-3] * 90 + [1e-1] * 10:
+        h.add(v)
+
+    summary = h.summary()
+    assert summary["count"] == 100
+    assert summary["min"] == 1e-3
+    assert summary["max"] == 1e-1
+    assert summary["mean"] == pytest.approx(0.0109)
+    # percentiles are bucket upper edges: within a factor of two
+    assert 1e-3 <= summary["p50"] < 2e-3
+    assert 1e-3 <= summary["p90"] < 2e-3
+    assert summary["p99"] == 1e-1
+
+
+def test_empty_histogram():
+    h = Histogram()
+    assert h.percentile(50) is None
+    assert h.summary() == {"count": 0}
+
+
+def test_histogram_merge():
+    a = Histogram()
+    b = Histogram()
+    a.add(1e-3)
+    b.add(1.0)
+    b.add(2.0)
+
+    a.merge(b.to_dict())
+
+    assert a.count == 3
+    assert a.min == 1e-3
+    assert a.max == 2.0
+    assert a.sum == pytest.approx(3.001)
+
+
+def test_histogram_merge_different_buckets():
+    with pytest.raises(ValueError, match="different buckets"):
+        Histogram().merge(Histogram(n_buckets=10))
+
+
+def test_timer():
+    m = Metrics()
+    with m.timer("sleep"):
+        time.sleep(0.01)
+
+    assert m.histograms["sleep"].count == 1
+    assert m.histograms["sleep"].min >= 0.01
+
+
+def test_threads():
+    """Tests that counts from several threads are not lost."""
+    m = Metrics()
+
+    def record():
+        for _ in range(10000):
+            m.count("items")
+            m.observe("latency", 1e-3)
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert m.counters["items"] == 40000
+    assert m.histograms["latency"].count == 40000
+
+
+def test_snapshot_reset():
+    m = Metrics()
+    m.observe("latency", 1e-3)
+    m.count("items", 2)
+    m.gauge("depth", 5)
+    m.gauge("depth", 1)
+
+    snap = m.snapshot(reset=True)
+
+    assert m.empty()
+    assert snap["counters"] == {"items": 2}
+    assert snap["gauges"] == {"depth": (1, 5)}
+    assert snap["histograms"]["latency"]["count"] == 1
+
+
+def test_merge_snapshots():
+    a = Metrics()
+    b = Metrics()
+    a.observe("latency", 1e-3)
+    a.count("items")
+    a.gauge("depth", 3)
+    b.observe("latency", 1e-2)
+    b.count("items", 4)
+    b.gauge("depth", 2)
+
+    total = Metrics()
+    total.merge(a.snapshot())
+    total.merge(b.snapshot())
+
+    summary = total.summary()
+    assert summary["histograms"]["latency"]["count"] == 2
+    assert summary["counters"]["items"] == 5
+    assert summary["gauges"]["depth"] == {"last": 2, "max": 3}
+
+
+def test_dump(tmp_path):
+    m = Metrics()
+    m.observe("latency", 1e-3)
+    filename = tmp_path / "metrics.json"
+
+    m.dump(filename)
+
+    with open(filename) as f:
+        dumped = json.load(f)
+    assert dumped["summary"]["histograms"]["latency"]["count"] == 1
+    assert dumped["snapshot"]["histograms"]["latency"]["count"] == 1
@@ -1,15 +1,27 @@
 import glob
+import json
+import pickle
+import asyncio
 import shutil
 import time
 import os
+import socket
 import pytest
 import logging
 import subprocess
 import signal
 import yaml
-
-from improv.nexus import Nexus
-from improv.store import StoreInterface
+import zmq
+import numpy as np
+from multiprocessing import shared_memory
+
+from improv.nexus import Nexus, port_free
+from improv.actor import Signal
+from improv.config import Config
+from improv.journal import JournalWriter, ReplayStore
+from improv.metrics import Metrics
+from improv.store import StoreInterface, ShmStoreInterface
+from improv.worker import RemoteActor, request
 
 # from improv.actor import Actor
 # from improv.store import StoreInterface
@@ -86,6 +98,7 @@ def test_init(setdir):
     [
         "good_config.yaml",
         "good_config_plasma.yaml",
+        "good_config_shm.yaml",
     ],
 )
 def test_createNexus(setdir, ports, cfg_name):
@@ -105,6 +118,251 @@ def test_createNexus(setdir, ports, cfg_name):
     assert True
 
 
+def test_redis_unix_socket(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal.yaml",
+        store_size=10000000,
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    socket_path = nex.store_socket
+    try:
+        assert os.path.exists(socket_path)
+        assert nex.store.uses_unix_socket()
+        for actor in nex.actors.values():
+            assert actor.store_socket == socket_path
+            assert actor.client.uses_unix_socket()
+    finally:
+        nex.destroyNexus()
+    assert not os.path.exists(os.path.dirname(socket_path))
+
+
+def test_shm_store(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="good_config_shm.yaml", control_port=ports[0], output_port=ports[1]
+    )
+    store_loc = nex.store_loc
+    assert isinstance(nex.store, ShmStoreInterface)
+    assert isinstance(nex.actors["Acquirer"].client, ShmStoreInterface)
+    assert nex.actors["Acquirer"].store_loc == store_loc
+    assert nex.store.n_slots == 1024
+
+    obj_id = nex.actors["Acquirer"].client.put(np.ones((256, 256)), "frame")
+    assert nex.store.getID(obj_id).sum() == 256 * 256
+
+    nex.destroyNexus()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=store_loc)
+
+
+def test_shm_connection(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_shm_link.yaml", control_port=ports[0], output_port=ports[1]
+    )
+    link = nex.data_queues["Generator.q_out"]
+    assert link is nex.data_queues["Processor.q_in"]
+    assert link.queue in nex.link_factory.shm_queues
+    assert link.queue.capacity == 1048576
+
+    link.put("message")
+    assert link.get(timeout=1) == "message"
+    nex.destroyNexus()
+
+
+def test_link_policy(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_link_policy.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    link = nex.data_queues["Generator.q_out"]
+    assert link.policy == "drop_oldest"
+
+    for i in range(3):
+        link.put(i)
+    assert link.get(timeout=1) == 1
+    assert link.dropped == 1
+    nex.destroyNexus()
+
+
+def test_broadcast_connection(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_broadcast.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    link = nex.data_queues["Generator.q_out"]
+    consumers = [nex.data_queues[q] for q in ["Processor.q_in", "Processor2.q_in"]]
+    assert nex.actors["Generator"].q_out is link
+    assert link.queue in nex.link_factory.shm_queues
+
+    link.put("message")
+    assert link.lags() == {"Processor.q_in": 1, "Processor2.q_in": 1}
+    assert [q.get(timeout=1) for q in consumers] == ["message", "message"]
+    nex.destroyNexus()
+
+
+def test_zmq_connection(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_zmq.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    link = nex.data_queues["Generator.q_out"]
+    consumers = [nex.data_queues[q] for q in ["Processor.q_in", "Processor2.q_in"]]
+    assert nex.actors["Generator"].q_out is link
+
+    link.put("message")
+    assert [q.get(timeout=5) for q in consumers] == ["message", "message"]
+    for q in consumers:
+        q.queue.close()
+    nex.destroyNexus()
+
+
+def test_frames_connection(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_frames.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    link = nex.data_queues["Generator.q_out"]
+    frame = np.random.rand(16, 16)
+
+    link.put(frame)
+    ref = nex.data_queues["Processor.q_in"].get(timeout=5)
+    assert np.array_equal(link.frames.read(ref), frame)
+    assert link.frames.slots == 8
+    nex.destroyNexus()
+
+
+def test_remote_actors(setdir, ports):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_remote.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    generator = nex.actors["Generator"]
+    q_sig = nex.sig_queues["Generator_sig"]
+    nex.destroyNexus()
+
+    assert isinstance(generator, RemoteActor)
+    assert generator.host == "worker1"
+    assert "host" not in generator.spec()["options"]
+    assert generator.spec()["links"]["q_sig"] is q_sig
+    # Nexus bound the signal link, so the worker knows where to connect
+    assert not q_sig.queue.address.endswith(":*")
+    assert nex.processes == []
+
+
+def test_remote_actor_needs_zmq_link(setdir, ports):
+    nex = Nexus("test")
+    with pytest.raises(ValueError, match="needs type zmq"):
+        nex.createNexus(
+            file="minimal_remote_manager_link.yaml",
+            control_port=ports[0],
+            output_port=ports[1],
+        )
+    nex.destroyNexus()
+
+
+@pytest.mark.parametrize(
+    ("name", "token", "reply"),
+    [
+        ("worker1", b"secret", "Registered"),
+        ("worker1", b"wrong", "Refused: bad token"),
+        ("worker3", b"secret", "Refused: unknown worker"),
+    ],
+)
+def test_worker_registration(setdir, ports, monkeypatch, name, token, reply):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_remote.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    nex.config.settings["worker_token"] = "secret"
+    registered = []
+    monkeypatch.setattr(nex, "registerWorker", lambda *args: registered.append(args))
+    frames = [Signal.register().encode(), name.encode(), b"tcp://10.0.0.9:1", token]
+
+    async def register():
+        answer = asyncio.to_thread(
+            request, "tcp://127.0.0.1:{}".format(ports[0]), frames, 5
+        )
+        return (await asyncio.gather(answer, nex.remote_input()))[0]
+
+    loop = asyncio.new_event_loop()
+    try:
+        answer = loop.run_until_complete(register())
+    finally:
+        loop.close()
+        nex.destroyNexus()
+
+    assert answer == [reply.encode()]
+    assert registered == ([(name, "tcp://10.0.0.9:1")] if reply == "Registered" else [])
+
+
+def test_links_share_manager(setdir, ports, caplog):
+    nex = Nexus("test")
+    nex.createNexus(
+        file="good_config.yaml", control_port=ports[0], output_port=ports[1]
+    )
+    stats = nex.link_factory.stats()
+    nex.destroyNexus()
+
+    # two sig links and one data link; comm links go to the inbox
+    assert stats["links"] == 3
+    assert stats["manager_processes"] == 1
+    assert any(
+        ["links on 1 Manager process(es)" in record.msg for record in caplog.records]
+    )
+
+
+def test_startup_times(setdir, ports, caplog):
+    nex = Nexus("test")
+    nex.createNexus(file="minimal.yaml", control_port=ports[0], output_port=ports[1])
+    times = nex.startup_times
+    nex.destroyNexus()
+
+    assert list(times) == ["config", "sockets", "store", "links", "actors", "total"]
+    assert times["total"] >= sum(times.values()) - times["total"]
+    assert any(["Startup took" in record.msg for record in caplog.records])
+
+
+@pytest.mark.parametrize("workers", [1, 8])
+def test_concurrent_startup_keeps_order(setdir, ports, monkeypatch, workers):
+    monkeypatch.setattr("improv.nexus.STARTUP_WORKERS", workers)
+    nex = Nexus("test")
+    nex.createNexus(
+        file="complex_graph.yaml", control_port=ports[0], output_port=ports[1]
+    )
+    actors = list(nex.actors)
+    sig_queues = list(nex.sig_queues)
+    data_queues = list(nex.data_queues)
+    nex.destroyNexus()
+
+    assert actors == ["Acquirer", "Analysis", "InputStim"]
+    assert sig_queues == ["Acquirer_sig", "Analysis_sig", "InputStim_sig"]
+    assert data_queues[:3] == ["Acquirer.q_out", "Analysis.q_in", "InputStim.q_in"]
+
+
+def test_port_free():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+        s.listen()
+        assert not port_free(port)
+    assert port_free(port)
+
+
 def test_config_logged(setdir, ports, caplog):
     nex = Nexus("test")
     nex.createNexus(
@@ -282,6 +540,180 @@ def test_queue_message(setdir, sample_nex):
     assert True
 
 
+def test_metrics_published(setdir, sample_nex, ports):
+    nex = sample_nex
+    ctx = zmq.Context()
+    sub = ctx.socket(zmq.SUB)
+    sub.connect("tcp://localhost:{}".format(ports[1]))
+    sub.setsockopt_string(zmq.SUBSCRIBE, "METRICS")
+    time.sleep(0.5)  # let the subscription reach the publisher
+
+    actor_metrics = Metrics()
+    actor_metrics.observe("actor.Acquirer.runStep", 1e-3)
+    actor_metrics.count("link.q_out->Analysis.items", 3)
+    nex.processActorSignal(
+        [Signal.metrics(), actor_metrics.snapshot()], "Acquirer_comm"
+    )
+
+    assert sub.poll(5000)
+    tag, body = sub.recv_multipart()
+    summary = json.loads(body)
+    sub.close(linger=0)
+    ctx.term()
+
+    assert tag == b"METRICS"
+    assert summary["histograms"]["actor.Acquirer.runStep"]["count"] == 1
+    assert summary["counters"]["link.q_out->Analysis.items"] == 3
+    assert nex.metrics.counters["link.q_out->Analysis.items"] == 3
+
+
+def test_inbox(setdir, sample_nex):
+    """Tests if messages put on comm links are handled from the inbox."""
+
+    nex = sample_nex
+    nex.actorStates = dict.fromkeys(nex.actors.keys())
+    nex.comm_queues["Acquirer_comm"].put([Signal.ready()])
+    nex.comm_queues["GUI_comm"].put([Signal.ready()])
+
+    inbox = zmq.Socket.shadow(nex.inbox.underlying)
+    for _ in range(2):
+        assert inbox.poll(5000)
+        nex.processInbox(inbox.recv_multipart())
+
+    assert nex.actorStates["Acquirer"] == Signal.ready()
+    assert nex.actorStates["GUI"] == Signal.ready()
+
+
+def read_checkpoint(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def test_restart_actor_from_checkpoint(setdir, ports, monkeypatch):
+    """Tests that a killed actor is restarted and restored, not set up."""
+
+    monkeypatch.setattr("improv.nexus.SUPERVISE_INTERVAL", 0.1)
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_restart.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    checkpoint = os.path.join("checkpoints", "Counter.pkl")
+    try:
+        nex.actorStates = dict.fromkeys(nex.actors.keys())
+        nex.processes = [nex._actorProcess("Counter", nex.actors["Counter"])]
+        nex.start()
+        nex.setup()
+        inbox = zmq.Socket.shadow(nex.inbox.underlying)
+        while not nex.allowStart:
+            assert inbox.poll(5000)
+            nex.processInbox(inbox.recv_multipart())
+        nex.run()
+
+        deadline = time.time() + 10
+        while not os.path.exists(checkpoint) and time.time() < deadline:
+            time.sleep(0.05)
+        first = nex.processes[0]
+        first.kill()
+        first.join()
+        saved = read_checkpoint(checkpoint)
+        assert not saved["restored"]
+
+        # let the supervisor notice, then stop it; in a loop of its own,
+        # as asyncio.run would leave no current loop for later tests
+        loop = asyncio.new_event_loop()
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run_until_complete(asyncio.wait_for(nex.superviseActors(), 1.0))
+        loop.close()
+        assert nex.restarts == {"Counter": 1}
+        assert nex.processes[0].pid != first.pid
+
+        while time.time() < deadline:
+            state = read_checkpoint(checkpoint)
+            if state["pid"] != first.pid:
+                break
+            time.sleep(0.05)
+        assert state["restored"]
+        assert state["count"] >= saved["count"]
+        assert nex.metrics.counters["actor.Counter.restarts"] == 1
+    finally:
+        for p in nex.processes:
+            p.kill()
+            p.join()
+        nex.destroyNexus()
+        shutil.rmtree("checkpoints", ignore_errors=True)
+
+
+def test_watcher_from_config(setdir, ports):
+    """Tests that use_watcher with a list of actors adds a Watcher actor."""
+
+    nex = Nexus("test")
+    nex.createNexus(
+        file="minimal_with_watcher.yaml",
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+    try:
+        watcher = nex.actors["Watcher"]
+        assert type(watcher).__name__ == "BasicWatcher"
+        assert watcher.filename == "watched.h5"
+        assert [link.name for link in watcher.watchin] == ["Generator_watch"]
+        assert nex.actors["Generator"].q_watchout is watcher.watchin[0]
+        assert nex.p_watch is None
+    finally:
+        nex.destroyNexus()
+
+
+def test_replay_from_journal(setdir, ports):
+    """Tests that a replay only creates the replayed actors and feeds
+    their links from their journals."""
+
+    writer = JournalWriter(os.path.join("journal", "Processor.journal"))
+    writer.message("q_in", [["key", "0"]])
+    writer.object("key", np.arange(3))
+    writer.close()
+
+    nex = Nexus("test")
+    try:
+        nex.createNexus(
+            file="minimal_replay.yaml",
+            control_port=ports[0],
+            output_port=ports[1],
+        )
+        assert list(nex.actors) == ["Processor"]
+        assert nex.replay["speed"] is None
+        processor = nex.actors["Processor"]
+        assert isinstance(processor.client, ReplayStore)
+        np.testing.assert_array_equal(processor.client.get("key"), np.arange(3))
+
+        assert nex.replayer.links == {
+            "Processor": {"q_in": nex.data_queues["Processor.q_in"]}
+        }
+        assert nex.replayer.run() == 1
+        assert processor.q_in.get(timeout=1) == [["key", "0"]]
+    finally:
+        nex.destroyNexus()
+        shutil.rmtree("journal", ignore_errors=True)
+
+
+def test_replay_to_broadcast_link(setdir, ports):
+    """Tests that replaying into a broadcast link is refused when the
+    config is loaded, as its consumer ends cannot be put to."""
+
+    nex = Nexus("test")
+    try:
+        with pytest.raises(ValueError, match="through broadcast link Generator.q_out"):
+            nex.createNexus(
+                file="minimal_replay_broadcast.yaml",
+                control_port=ports[0],
+                output_port=ports[1],
+            )
+        assert nex.data_queues == {}
+    finally:
+        nex.destroyNexus()
+
+
 @pytest.mark.asyncio
 @pytest.mark.skip(reason="This test is unfinished.")
 async def test_queue_readin(sample_nex, caplog):
@@ -525,6 +957,30 @@ def test_use_ephemeral_aof_dir(caplog, setdir, ports, server_port_num):
     logging.info("completed ephemeral db test")
 
 
+@pytest.mark.parametrize(
+    ("cfg_name", "policy"),
+    [
+        ("minimal.yaml", "noeviction"),
+        ("minimal_with_maxmemory_policy.yaml", "allkeys-lru"),
+    ],
+)
+def test_maxmemory_policy(setdir, ports, server_port_num, cfg_name, policy):
+    nex = Nexus("test")
+    nex.createNexus(
+        file=cfg_name,
+        store_size=10000000,
+        control_port=ports[0],
+        output_port=ports[1],
+    )
+
+    store = StoreInterface(server_port_num=server_port_num)
+    maxmemory_policy = store.client.config_get("maxmemory-policy")
+
+    nex.destroyNexus()
+
+    assert maxmemory_policy["maxmemory-policy"] == policy
+
+
 def test_save_no_schedule(caplog, setdir, ports, server_port_num):
     nex = Nexus("test")
     nex.createNexus(
@@ -588,6 +1044,117 @@ def test_save_every_write(caplog, setdir, ports, server_port_num):
     assert fsync_schedule["appendfsync"] == "always"
 
 
+def test_snapshot_durability(setdir, ports):
+    """Tests that persisted objects are saved in snapshots and put back
+    when the next server starts."""
+    nex = Nexus("test")
+    try:
+        nex.createNexus(
+            file="minimal_with_snapshots.yaml",
+            store_size=10000000,
+            control_port=ports[0],
+            output_port=ports[1],
+        )
+        assert nex.redis_durability == "snapshot"
+        assert nex.store.client.config_get("appendonly")["appendonly"] == "no"
+        key = nex.store.put(np.arange(5), persist=True)
+        nex.store.put("not persisted")
+
+        deadline = time.time() + 10
+        while not os.path.exists("snapshot.pkl") and time.time() < deadline:
+            time.sleep(0.05)
+        assert os.path.exists("snapshot.pkl")
+        nex.destroyNexus()
+
+        nex = Nexus("test")
+        nex.createNexus(
+            file="minimal_with_snapshots.yaml",
+            store_size=10000000,
+            control_port=ports[0],
+            output_port=ports[1],
+        )
+        np.testing.assert_array_equal(nex.store.get(key), np.arange(5))
+        assert nex.store.client.dbsize() == 1
+    finally:
+        nex.destroyNexus()
+        if os.path.exists("snapshot.pkl"):
+            os.remove("snapshot.pkl")
+
+
+@pytest.mark.parametrize(
+    ("redis_config", "durability"),
+    [
+        ({}, "none"),
+        ({"enable_saving": True}, "aof"),
+        ({"fsync_frequency": "every_second"}, "aof"),
+        ({"durability": "aof"}, "aof"),
+        ({"durability": "snapshot"}, "snapshot"),
+    ],
+)
+def test_durability_modes(redis_config, durability):
+    nex = Nexus("test")
+    nex.config = Config("test/configs/minimal.yaml")
+    nex.config.config["redis_config"] = redis_config
+    nex.configure_redis_persistence()
+
+    assert nex.redis_durability == durability
+    assert bool(nex.redis_saving_enabled) == (durability == "aof")
+
+
+@pytest.mark.parametrize(
+    ("redis_config", "message"),
+    [
+        ({"durability": "sometimes"}, "Unknown durability mode sometimes"),
+        (
+            {"durability": "none", "enable_saving": True},
+            "Cannot save every write with durability none",
+        ),
+        (
+            {"durability": "snapshot", "fsync_frequency": "every_write"},
+            "Cannot save every write with durability snapshot",
+        ),
+        (
+            {"durability": "aof", "enable_saving": False},
+            "Cannot persist to disk with saving disabled",
+        ),
+    ],
+)
+def test_invalid_durability(redis_config, message):
+    nex = Nexus("test")
+    nex.config = Config("test/configs/minimal.yaml")
+    nex.config.config["redis_config"] = redis_config
+    with pytest.raises(ValueError, match=message):
+        nex.configure_redis_persistence()
+
+
+def test_redis_access_for_workers():
+    """Tests that Redis listens at the hostname, with the worker token as
+    its password, when workers on other machines connect to it."""
+    nex = Nexus("test")
+    nex.config = Config("test/configs/minimal_remote.yaml")
+    nex.hostname = "10.0.0.1"
+    nex.store_port = 6379
+    with pytest.raises(ValueError, match="need settings: worker_token"):
+        nex.configure_redis_access()
+
+    nex.config.settings["worker_token"] = "secret"
+    nex.configure_redis_access()
+    command = nex.redis_command(10000)
+    assert nex.store_password == "secret"
+    # the password is given on stdin, not on the command line
+    assert command[:2] == ["redis-server", "-"]
+    assert "secret" not in command
+    assert command[-3:] == ["--bind", "127.0.0.1", "10.0.0.1"]
+
+    # otherwise only clients on this machine connect
+    nex.hostname = "127.0.0.1"
+    nex.configure_redis_access()
+    command = nex.redis_command(10000)
+    assert nex.store_password is None
+    assert "-" not in command
+    assert "--bind" not in command
+
+
 @pytest.mark.skip(reason="Nexus no longer deletes files on shutdown. Nothing to test.")
 def test_store_already_deleted_issues_warning(caplog):
     nex = Nexus("test")
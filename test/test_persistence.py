@@ -0,0 +1,153 @@
+import time
+from queue import Full
+
+import numpy as np
+import pytest
+
+from improv.persistence import BatchWriter, SavedObjects, series_name
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return str(tmp_path / "saved.h5")
+
+
+def test_series_name():
+    assert series_name(np.zeros((4, 3), dtype=np.uint16)) == "uint16_4x3"
+    assert series_name(np.float64(1.0)) == "pickled"
+    assert series_name(np.array(1.0)) == "float64_scalar"
+    assert series_name(np.array([{}], dtype=object)) == "pickled"
+    assert series_name({"a": 1}) == "pickled"
+
+
+def test_write_read(filename):
+    frames = [np.full((8, 8), i, dtype=np.uint16) for i in range(10)]
+    with BatchWriter(filename, batch_size=4) as writer:
+        for i, frame in enumerate(frames):
+            writer.put("Acquirer", str(i), frame)
+        writer.put("Acquirer", "small", np.arange(3.0))
+        writer.put("Processor", "estimates", {"A": [1, 2], "b": "x"})
+    assert writer.written == 12
+    assert writer.pending_bytes == 0
+
+    with SavedObjects(filename) as saved:
+        assert sorted(saved.actors()) == ["Acquirer", "Processor"]
+        assert set(saved.names("Acquirer")) == {str(i) for i in range(10)} | {"small"}
+        np.testing.assert_array_equal(saved.get("Acquirer", "7"), frames[7])
+        np.testing.assert_array_equal(saved.get("Acquirer", "small"), np.arange(3.0))
+        assert saved.get("Processor", "estimates") == {"A": [1, 2], "b": "x"}
+        with pytest.raises(KeyError):
+            saved.get("Acquirer", "missing")
+
+        items = dict(saved.items("Acquirer"))
+        assert len(items) == 11
+        np.testing.assert_array_equal(items["3"], frames[3])
+
+
+def test_arrays_are_copied(filename):
+    frame = np.zeros(4)
+    with BatchWriter(filename) as writer:
+        writer.put("Acquirer", "0", frame)
+        frame[:] = 1
+
+    with SavedObjects(filename) as saved:
+        np.testing.assert_array_equal(saved.get("Acquirer", "0"), np.zeros(4))
+
+
+def test_append(filename):
+    for i in range(2):
+        with BatchWriter(filename) as writer:
+            writer.put("Acquirer", str(i), np.full(4, i))
+            writer.put("Acquirer", "obj" + str(i), [i])
+
+    with SavedObjects(filename) as saved:
+        assert sorted(saved.names("Acquirer")) == ["0", "1", "obj0", "obj1"]
+        np.testing.assert_array_equal(saved.get("Acquirer", "1"), np.full(4, 1))
+        assert saved.get("Acquirer", "obj1") == [1]
+
+
+def test_flush(filename):
+    writer = BatchWriter(filename, batch_size=100, flush_interval=60)
+    writer.put("Acquirer", "0", np.zeros(4))
+    assert writer.flush(timeout=10)
+    assert writer.written == 1
+    writer.close()
+
+    with pytest.raises(ValueError, match="is closed"):
+        writer.put("Acquirer", "1", np.zeros(4))
+
+
+def test_backpressure(filename):
+    # nothing is written until a flush, so pending bytes only grow
+    writer = BatchWriter(
+        filename, batch_size=100, max_pending_bytes=1000, flush_interval=60
+    )
+    frame = np.zeros(100)  # 800 bytes
+    writer.put("Acquirer", "0", frame)
+    with pytest.raises(Full):
+        writer.put("Acquirer", "1", frame, timeout=0.1)
+    assert writer.pending_bytes == 800
+
+    writer.flush()
+    writer.put("Acquirer", "1", frame, timeout=0.1)
+    writer.close()
+    assert writer.written == 2
+
+
+def test_oversized_object_is_written_alone(filename):
+    with BatchWriter(filename, max_pending_bytes=10) as writer:
+        writer.put("Acquirer", "0", np.zeros(100), timeout=1)
+        writer.put("Acquirer", "1", np.zeros(100), timeout=1)
+    assert writer.written == 2
+
+
+def test_basic_watcher(setup_store, server_port_num, filename):
+    """Tests that a BasicWatcher saves the objects flagged on its links."""
+    from improv.link import Link
+    from improv.store import StoreInterface
+    from improv.watcher import BasicWatcher
+
+    store = StoreInterface(server_port_num=server_port_num)
+    link = Link("Generator_watch", "Generator", "Watcher")
+    watcher = BasicWatcher("Watcher", inputs=[link], filename=filename)
+    watcher.setStoreInterface(store)
+    watcher.setup()
+
+    frame = np.arange(12, dtype=np.int32).reshape(3, 4)
+    link.put([store.put(frame), "0"])
+    deadline = time.time() + 10
+    while watcher.numSaved == 0 and time.time() < deadline:
+        watcher.watchrun()
+    watcher.stop()
+    watcher.writer.close()
+    # let the pending get return, so its thread doesn't block exiting
+    link.put(None)
+    watcher.loop.run_until_complete(watcher.tasks[0])
+    watcher.loop.close()
+
+    with SavedObjects(filename) as saved:
+        np.testing.assert_array_equal(saved.get("Generator", "0"), frame)
+
+
+def test_store_watcher(setup_store, server_port_num, filename):
+    """Tests that a Watcher saves every object in a Redis store."""
+    from improv.store import RedisStoreInterface
+    from improv.watcher import Watcher
+
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    frame = np.arange(12, dtype=np.int32).reshape(3, 4)
+    frame_key = store.put(frame)
+    # its consumer count is not an object, and isn't saved
+    estimates_key = store.put({"A": [1, 2]}, consumers=2)
+
+    watcher = Watcher("watcher", store, filename=filename)
+    watcher.writer = BatchWriter(filename)
+    watcher.checkStoreInterface2()
+    watcher.checkStoreInterface2()
+    watcher.writer.close()
+
+    assert watcher.saved_ids == {frame_key, estimates_key}
+    with SavedObjects(filename) as saved:
+        assert sorted(saved.names("watcher")) == sorted([frame_key, estimates_key])
+        np.testing.assert_array_equal(saved.get("watcher", frame_key), frame)
+        assert saved.get("watcher", estimates_key) == {"A": [1, 2]}
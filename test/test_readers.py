@@ -0,0 +1,147 @@
+import queue
+import threading
+
+import h5py
+import numpy as np
+import pytest
+import tifffile
+
+from improv.readers import (
+    FolderReader,
+    HDF5Reader,
+    Prefetcher,
+    TiffReader,
+    open_reader,
+)
+
+
+def _frames(n, shape=(8, 8)):
+    return np.arange(n * shape[0] * shape[1], dtype="uint16").reshape((n,) + shape)
+
+
+@pytest.fixture
+def h5_file(tmp_path):
+    """Fixture to provide an HDF5 file of 50 frames in chunks of 7."""
+    path = tmp_path / "frames.h5"
+    with h5py.File(path, "w") as f:
+        f.create_dataset("data", data=_frames(50), chunks=(7, 8, 8))
+    return path
+
+
+@pytest.fixture
+def tiff_file(tmp_path):
+    """Fixture to provide a TIFF file of 10 pages."""
+    path = tmp_path / "frames.tif"
+    tifffile.imwrite(path, _frames(10), photometric="minisblack")
+    return path
+
+
+def test_hdf5_reader(h5_file):
+    with HDF5Reader(h5_file) as reader:
+        assert len(reader) == 50
+        assert reader.shape == (8, 8)
+        assert np.array_equal(np.array(list(reader)), _frames(50))
+        assert np.array_equal(reader[3], _frames(50)[3])
+
+
+def test_hdf5_reader_blocks_follow_chunks(h5_file):
+    """Tests if blocks are whole chunks, as many as fit in block_bytes."""
+    frame_bytes = 8 * 8 * 2
+
+    with HDF5Reader(h5_file, block_bytes=frame_bytes) as reader:
+        assert reader.block == 7
+    with HDF5Reader(h5_file, block_bytes=15 * frame_bytes) as reader:
+        assert reader.block == 14
+        assert len(list(reader)) == 50
+
+
+def test_hdf5_reader_contiguous(tmp_path):
+    path = tmp_path / "frames.h5"
+    with h5py.File(path, "w") as f:
+        f.create_dataset("first", data=np.zeros(3))
+        f.create_dataset("data", data=_frames(5))
+
+    with HDF5Reader(path, dataset="data", block_bytes=2 * 8 * 8 * 2) as reader:
+        assert reader.block == 2
+        assert np.array_equal(np.array(list(reader)), _frames(5))
+
+
+def test_tiff_reader(tiff_file):
+    with TiffReader(tiff_file) as reader:
+        assert len(reader) == 10
+        assert reader.shape == (8, 8)
+        assert np.array_equal(np.array(list(reader)), _frames(10))
+        assert np.array_equal(reader[9], _frames(10)[9])
+
+
+def test_open_reader(h5_file, tiff_file, tmp_path):
+    with open_reader(h5_file) as reader:
+        assert isinstance(reader, HDF5Reader)
+    with open_reader(tiff_file) as reader:
+        assert isinstance(reader, TiffReader)
+    with pytest.raises(ValueError, match="No reader"):
+        open_reader(tmp_path / "frames.npy")
+
+
+def test_folder_reader(tmp_path):
+    tifffile.imwrite(tmp_path / "b.tif", _frames(3)[1:], photometric="minisblack")
+    tifffile.imwrite(tmp_path / "a.tif", _frames(3)[0])
+    (tmp_path / "notes.txt").write_text("not a frame")
+
+    reader = FolderReader(tmp_path)
+    assert [f.name for f in reader.files()] == ["a.tif", "b.tif"]
+    assert np.array_equal(np.array(list(reader)), _frames(3))
+
+
+def test_folder_reader_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        FolderReader(tmp_path / "missing")
+
+
+def test_folder_reader_watch(tmp_path):
+    """Tests if a watching reader picks up files written after it started."""
+    tifffile.imwrite(tmp_path / "0.tif", _frames(1)[0])
+    reader = FolderReader(tmp_path, watch=True, poll_interval=0.01)
+
+    with Prefetcher(reader) as frames:
+        assert frames.get(timeout=5).sum() == _frames(1)[0].sum()
+        with pytest.raises(queue.Empty):
+            frames.get(timeout=0.1)
+        tifffile.imwrite(tmp_path / "1.tif", _frames(2)[1])
+        assert np.array_equal(frames.get(timeout=5), _frames(2)[1])
+
+
+def test_prefetcher_reads_ahead(h5_file):
+    """Tests if the prefetcher holds at most depth frames."""
+    reader = HDF5Reader(h5_file)
+    with Prefetcher(reader, depth=4) as frames:
+        first = next(frames)
+        threading.Event().wait(0.2)
+        assert frames._queue.qsize() == 4
+        rest = list(frames)
+
+    assert np.array_equal(np.array([first] + rest), _frames(50))
+    with pytest.raises(StopIteration):
+        next(frames)
+
+
+def test_prefetcher_raises_errors():
+    def broken():
+        yield np.zeros(2)
+        raise OSError("disk went away")
+
+    frames = Prefetcher(broken())
+    assert next(frames).shape == (2,)
+    with pytest.raises(OSError, match="disk went away"):
+        next(frames)
+    frames.close()
+
+
+def test_prefetcher_close_stops_thread(h5_file):
+    reader = HDF5Reader(h5_file)
+    frames = Prefetcher(reader, depth=2)
+    next(frames)
+    frames.close()
+
+    assert not frames._thread.is_alive()
+    assert not reader.file
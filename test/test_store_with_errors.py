@@ -1,7 +1,17 @@
 import pytest
 from pyarrow import plasma
 
+import gc
+import os
+import asyncio
+import time
+import subprocess
+import threading
+import multiprocessing
+
 from improv.store import StoreInterface, RedisStoreInterface, PlasmaStoreInterface
+from improv.store import ShmStoreInterface, ObjectNotFoundError
+from improv.store import AsyncRedisStoreInterface, AsyncStoreAdapter
 
 from pyarrow._plasma import PlasmaObjectExists
 from scipy.sparse import csc_matrix
@@ -10,6 +20,7 @@ import redis
 import logging
 
 from improv.store import CannotConnectToStoreInterfaceError
+from improv.store import OUT_OF_BAND_THRESHOLD, PERSIST_PREFIX, serialize, deserialize
 
 WAIT_TIMEOUT = 10
 
@@ -97,6 +108,13 @@ def test_init_empty(setup_store, server_port_num):
     assert store.get_all() == []
 
 
+def test_keys(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    assert list(store.keys()) == []
+    keys = [store.put(1), store.put(2, consumers=2)]
+    assert sorted(store.keys()) == sorted(keys)
+
+
 def test_plasma_init_empty(setup_plasma_store, set_store_loc):
     store = PlasmaStoreInterface(store_loc=set_store_loc)
     assert store.get_all() == {}
@@ -179,3 +197,504 @@ def test_redis_get_one(setup_store, server_port_num):
     store = RedisStoreInterface(server_port_num=server_port_num)
     key = store.put(3)
     assert 3 == store.get(key)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        1,
+        "string",
+        np.arange(10),
+        np.random.rand(512, 512).astype(np.float32),
+        np.asfortranarray(np.random.rand(300, 200)),
+        np.random.rand(400, 400)[::2, ::3],
+        {"frame": np.ones((256, 256)), "ids": [1, 2, 3], "small": np.zeros(3)},
+    ],
+)
+def test_serialize_round_trip(obj):
+    value = b"".join(bytes(part) for part in serialize(obj))
+    res = deserialize(value)
+    if isinstance(obj, dict):
+        assert res.keys() == obj.keys()
+        assert np.array_equal(res["frame"], obj["frame"])
+        assert res["ids"] == obj["ids"]
+    else:
+        assert np.array_equal(res, obj)
+
+
+def test_serialize_out_of_band():
+    """Tests if only large buffers are taken out of the pickle stream."""
+
+    assert len(serialize(np.zeros(10))) == 1
+
+    frame = np.random.rand(512, 512).astype(np.float32)
+    parts = serialize(frame)
+    assert len(parts) == 2
+    assert parts[1].nbytes == frame.nbytes >= OUT_OF_BAND_THRESHOLD
+    # the buffer part is a view on the array, not a copy
+    assert np.shares_memory(np.frombuffer(parts[1], dtype=np.float32), frame)
+
+
+def test_deserialize_zero_copy():
+    frame = np.random.rand(512, 512)
+    value = b"".join(bytes(part) for part in serialize(frame))
+    res = deserialize(value)
+
+    assert not res.flags.owndata
+    assert not res.flags.writeable
+    assert np.array_equal(res, frame)
+
+
+def test_deserialize_aligned():
+    """Tests if out-of-band buffers start aligned, whatever the pickle."""
+    obj = {"name": "x" * 13, "a": np.random.rand(512, 512), "b": np.ones(9999)}
+    parts = serialize(obj)
+    sizes = [memoryview(part).nbytes for part in parts]
+    starts = [sum(sizes[:i]) for i in range(len(parts))]
+    buffer_starts = [
+        start for size, start in zip(sizes, starts) if size >= OUT_OF_BAND_THRESHOLD
+    ]
+    assert len(buffer_starts) == 2
+    assert all(start % 64 == 0 for start in buffer_starts)
+
+    res = deserialize(b"".join(bytes(part) for part in parts))
+    for name in ("a", "b"):
+        assert res[name].flags.aligned
+        assert res[name].ctypes.data % 8 == 0
+        assert np.array_equal(res[name], obj[name])
+
+
+def test_redis_put_get_large_array(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    frame = np.random.rand(512, 512).astype(np.float32)
+    key = store.put(frame)
+
+    assert store.client.strlen(key) > frame.nbytes
+    res = store.get(key)
+    assert res.dtype == frame.dtype
+    assert np.array_equal(res, frame)
+
+
+@pytest.fixture
+def shm_store():
+    store = ShmStoreInterface.create(1 << 20, n_slots=8)
+    yield store
+    store.unlink()
+
+
+def test_shm_connect(shm_store):
+    store = ShmStoreInterface("client", shm_store.store_loc)
+    assert store.capacity == 1 << 20
+    assert store.n_slots == 8
+    assert store.get_all() == {}
+
+
+def test_shm_connect_missing():
+    with pytest.raises(CannotConnectToStoreInterfaceError):
+        ShmStoreInterface("client", "improv_store_missing")
+
+
+def test_shm_put_get(shm_store):
+    store = ShmStoreInterface("client", shm_store.store_loc)
+    mat = csc_matrix((3, 4), dtype=np.int8)
+    ids = [store.put(1, "one"), store.put("two"), store.put(mat, "matrix")]
+    assert ids == [1, 2, 3]
+    assert store.get(1) == 1
+    assert store.getList(ids[:2]) == [1, "two"]
+    assert isinstance(store.getID(3), csc_matrix)
+    assert list(shm_store.get_all().keys()) == ids
+    assert shm_store.keys() == ids
+
+    with pytest.raises(ObjectNotFoundError) as e:
+        store.getID(4)
+    assert e.value.obj_id_or_name == 4
+    with pytest.raises(ObjectNotFoundError) as e:
+        store.get_many([4])
+    assert e.value.obj_id_or_name == [4]
+
+
+def test_shm_get_zero_copy(shm_store):
+    frame = np.random.rand(256, 256)
+    obj_id = shm_store.put(frame)
+    res = shm_store.getID(obj_id)
+
+    assert np.array_equal(res, frame)
+    assert not res.flags.writeable
+    # the array lives in the arena and pins the object until it is collected
+    assert shm_store._slot(obj_id)[3] == 1
+    del res
+    gc.collect()
+    assert shm_store._slot(obj_id)[3] == 0
+
+
+def test_shm_get_aligned():
+    # a slot table that doesn't end on an aligned offset
+    store = ShmStoreInterface.create((1 << 20) + 3, n_slots=3)
+    try:
+        assert store.capacity == 1 << 20
+        store.put("x" * 5)
+        obj_id = store.put({"tag": "odd", "frame": np.random.rand(256, 256)})
+        res = store.getID(obj_id)["frame"]
+        assert res.ctypes.data % 64 == 0
+        del res
+    finally:
+        store.unlink()
+
+
+def test_shm_eviction(shm_store):
+    frame = np.random.rand(200, 256)  # two fit in the store
+    ids = [shm_store.put(frame) for _ in range(3)]
+    assert list(shm_store.get_all().keys()) == ids[1:]
+    with pytest.raises(ObjectNotFoundError):
+        shm_store.getID(ids[0])
+
+    # more objects than slots evicts the oldest ones too
+    ids = [shm_store.put(i) for i in range(10)]
+    assert list(shm_store.get_all().keys()) == ids[2:]
+
+
+def test_shm_pinned_not_evicted(shm_store):
+    frame = np.random.rand(200, 256)
+    obj_id = shm_store.put(frame)
+    res = shm_store.getID(obj_id)
+
+    assert shm_store.put(frame) is not None
+    assert shm_store.put(frame) is None
+    assert np.array_equal(res, frame)
+
+    del res
+    gc.collect()
+    assert shm_store.put(frame) is not None
+
+
+def _put_from_child(store_loc, q):
+    store = ShmStoreInterface("child", store_loc)
+    q.put(store.put({"frame": np.ones((256, 256))}))
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_shm_put_other_process(shm_store, method):
+    ctx = multiprocessing.get_context(method)
+    q = ctx.Queue()
+    p = ctx.Process(target=_put_from_child, args=(shm_store.store_loc, q))
+    p.start()
+    obj_id = q.get(timeout=WAIT_TIMEOUT)
+    p.join(WAIT_TIMEOUT)
+
+    assert shm_store.getID(obj_id)["frame"].sum() == 256 * 256
+
+
+def test_redis_put_many(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    frame = np.random.rand(256, 256)
+    keys = store.put_many([1, "two", frame])
+
+    assert len(set(keys)) == 3
+    assert store.get(keys[0]) == 1
+    assert store.get(keys[1]) == "two"
+    assert np.array_equal(store.get(keys[2]), frame)
+
+
+def test_redis_put_dict(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    keys = store.put_dict({"Cx": np.arange(5), "tune": [1, 2]})
+
+    assert list(keys.keys()) == ["Cx", "tune"]
+    assert np.array_equal(store.get(keys["Cx"]), np.arange(5))
+    assert store.get(keys["tune"]) == [1, 2]
+
+
+def test_redis_put_many_persist(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    keys = store.put_many([1, 2], persist=True)
+    named = store.put_dict({"Cx": 3}, persist=True)
+
+    assert all(key.startswith(PERSIST_PREFIX) for key in keys)
+    assert named["Cx"].startswith(PERSIST_PREFIX)
+    assert store.get_many(keys + [named["Cx"]]) == [1, 2, 3]
+    assert not store.put_many([4])[0].startswith(PERSIST_PREFIX)
+
+
+def test_plasma_put_dict(setup_plasma_store, set_store_loc):
+    store = PlasmaStoreInterface(store_loc=set_store_loc)
+    ids = store.put_dict({"one": 1, "two": 2})
+    assert store.getList([ids["one"], ids["two"]]) == [1, 2]
+    assert store.getList(store.put_many([3, 4], ["three", "four"])) == [3, 4]
+
+
+def test_shm_put_many(shm_store):
+    frame = np.random.rand(200, 256)  # two fit in the store
+    ids = shm_store.put_many([1, frame, frame, frame, "five"], list("abcde"))
+
+    # the objects of a batch are pinned until all are written, so the third
+    # frame can't evict the earlier ones
+    assert ids == [1, 2, 3, None, 4]
+    assert np.array_equal(shm_store.getID(2), frame)
+    assert shm_store.getList([1, 4]) == [1, "five"]
+    assert shm_store.put_dict({"x": 5}) == {"x": 5}
+
+
+def test_redis_get_many(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    frame = np.random.rand(256, 256)
+    keys = store.put_many([1, frame, {"a": 2}])
+
+    res = store.get_many(keys)
+    assert res[0] == 1
+    assert np.array_equal(res[1], frame)
+    assert res[2] == {"a": 2}
+    # get_list returns objects, as the other backends do
+    assert store.get_list(keys[:1]) == [1]
+
+
+def test_redis_get_many_missing(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    key = store.put(1)
+
+    with pytest.raises(ObjectNotFoundError) as e:
+        store.get_many([key, "missing1", "missing2"])
+    assert e.value.obj_id_or_name == ["missing1", "missing2"]
+
+    assert store.get_many([key, "missing1"], raise_on_missing=False) == [1, None]
+
+
+def test_redis_get_dict(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    keys = store.put_dict({"Cx": np.arange(5), "tune": [1, 2]})
+    res = store.get_dict(keys)
+
+    assert list(res.keys()) == ["Cx", "tune"]
+    assert np.array_equal(res["Cx"], np.arange(5))
+    assert res["tune"] == [1, 2]
+
+
+def test_plasma_get_many(setup_plasma_store, set_store_loc):
+    store = PlasmaStoreInterface(store_loc=set_store_loc)
+    mat = csc_matrix((3, 4), dtype=np.int8)
+    ids = store.put_dict({"one": 1, "matrix": mat})
+    res = store.get_dict(ids)
+    assert res["one"] == 1
+    assert isinstance(res["matrix"], csc_matrix)
+
+    missing = plasma.ObjectID.from_random()
+    with pytest.raises(ObjectNotFoundError):
+        store.get_many([ids["one"], missing])
+    assert store.get_many([missing], raise_on_missing=False) == [None]
+
+
+def test_shm_get_many(shm_store):
+    frame = np.random.rand(200, 256)
+    ids = shm_store.put_many([1, frame])
+
+    res = shm_store.get_dict({"one": ids[0], "frame": ids[1]})
+    assert res["one"] == 1
+    assert np.array_equal(res["frame"], frame)
+
+    with pytest.raises(ObjectNotFoundError) as e:
+        shm_store.get_many([ids[0], 7])
+    assert e.value.obj_id_or_name == [7]
+    assert shm_store.get_many([7, ids[0]], raise_on_missing=False) == [None, 1]
+
+
+def test_redis_put_ttl(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    key = store.put(1, ttl=10)
+    assert 0 < store.client.pttl(key) <= 10000
+    assert store.client.pttl(store.put(2)) == -1
+
+    # the interface-wide default
+    store = RedisStoreInterface(server_port_num=server_port_num, ttl=5)
+    keys = store.put_many([np.random.rand(256, 256), 3])
+    assert all(0 < store.client.pttl(key) <= 5000 for key in keys)
+
+
+def test_redis_release_consumers(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    key = store.put(np.random.rand(256, 256), consumers=2)
+
+    assert store.release(key) == 1
+    assert store.get(key).shape == (256, 256)
+    assert store.release(key) == 0
+    with pytest.raises(ObjectNotFoundError):
+        store.get(key)
+    assert store.client.dbsize() == 0
+
+    # objects without a consumer count are left alone
+    key = store.put(1)
+    assert store.release(key) == -1
+    assert store.get(key) == 1
+
+
+def test_redis_put_to_full_store(setup_store, server_port_num):
+    """Tests that puts to a full store without eviction return None."""
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    frame = np.zeros(2**18)  # 2 MB, in a store of 10 MB
+    keys = [store.put(frame) for _ in range(10)]
+
+    assert None in keys
+    stored = [key for key in keys if key is not None]
+    assert sorted(store.keys()) == sorted(stored)
+    assert store.put_many([frame, frame]) == [None, None]
+    assert store.put_dict({"frame": frame}) == {"frame": None}
+
+
+def test_redis_delete_and_stats(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    keys = store.put_many([1, 2, 3], consumers=1)
+    stats = store.stats()
+    assert stats["keys"] == 6
+    assert stats["bytes"] > 0
+
+    assert store.delete(keys[:2]) == 2
+    assert store.delete(keys[2]) == 1
+    assert store.delete([]) == 0
+    assert store.stats()["keys"] == 0
+
+
+def test_redis_snapshot(setup_store, server_port_num, tmp_path):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+    kept = store.put(np.arange(10), persist=True)
+    expiring = store.put("soon", ttl=60, persist=True)
+    other = store.put(2)
+    assert kept.startswith(PERSIST_PREFIX)
+    assert not other.startswith(PERSIST_PREFIX)
+
+    filename = str(tmp_path / "snapshot.pkl")
+    assert store.snapshot(filename) == 2
+    store.client.flushall()
+
+    assert store.restore_snapshot(filename) == 2
+    np.testing.assert_array_equal(store.get(kept), np.arange(10))
+    assert store.get(expiring) == "soon"
+    assert 0 < store.client.pttl(expiring) <= 60000
+    assert store.client.pttl(kept) == -1
+    with pytest.raises(ObjectNotFoundError):
+        store.get(other)
+
+
+@pytest.fixture
+def unix_socket_store(tmp_path):
+    """A Redis server that only listens on a Unix socket"""
+    path = str(tmp_path / "redis.sock")
+    p = subprocess.Popen(
+        ["redis-server", "--save", '""', "--port", "0", "--unixsocket", path],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 10
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    yield path
+    p.terminate()
+    p.wait(10)
+
+
+def test_redis_unix_socket(unix_socket_store):
+    store = RedisStoreInterface(
+        server_port_num=1234, unix_socket_path=unix_socket_store
+    )
+    assert store.uses_unix_socket()
+    assert store.client.connection_pool.connection_kwargs["path"] == unix_socket_store
+    key = store.put(np.arange(10))
+    np.testing.assert_array_equal(store.get(key), np.arange(10))
+
+    # the socket is only used for servers on this machine
+    store.hostname = "store.example.org"
+    assert not store.uses_unix_socket()
+
+
+def test_redis_unix_socket_falls_back_to_tcp(setup_store, server_port_num, tmp_path):
+    store = RedisStoreInterface(
+        server_port_num=server_port_num,
+        unix_socket_path=str(tmp_path / "missing.sock"),
+    )
+    assert not store.uses_unix_socket()
+    assert store.client.connection_pool.connection_kwargs["port"] == server_port_num
+    assert store.client.ping()
+
+
+def test_redis_max_connections(setup_store, server_port_num):
+    """Tests that threads share a bounded pool of connections."""
+    store = RedisStoreInterface(server_port_num=server_port_num, max_connections=2)
+    keys = []
+
+    def put():
+        for i in range(20):
+            keys.append(store.put(np.full(1000, i)))
+
+    threads = [threading.Thread(target=put) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(keys) == 160
+    assert len(store.client.connection_pool._connections) <= 2
+    assert len(store.get_many(keys)) == 160
+
+
+def test_async_redis_store(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+
+    async def main():
+        astore = AsyncRedisStoreInterface.from_interface(store)
+        frame = np.random.rand(200, 200)
+        key = await astore.put(frame, consumers=1)
+        np.testing.assert_array_equal(store.get(key), frame)
+
+        keys = await astore.put_many([1, "two"])
+        persisted = await astore.put_many([5], persist=True)
+        assert persisted[0].startswith(PERSIST_PREFIX)
+        gets = [astore.get(k) for k in [store.put(3)] + keys]
+        assert await asyncio.gather(*gets) == [3, 1, "two"]
+        assert await astore.get_many(keys + ["missing"], False) == [1, "two", None]
+        with pytest.raises(ObjectNotFoundError):
+            await astore.get("missing")
+
+        assert await astore.release(key) == 0
+        assert await astore.delete(keys) == 2
+        await astore.close()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(main())
+    loop.close()
+
+
+def test_async_store_adapter(setup_store, server_port_num):
+    store = RedisStoreInterface(server_port_num=server_port_num)
+
+    async def main():
+        astore = AsyncStoreAdapter(store)
+        key = await astore.put(np.arange(10))
+        np.testing.assert_array_equal(await astore.get(key), np.arange(10))
+        values = await astore.get_many([key, "missing"], raise_on_missing=False)
+        np.testing.assert_array_equal(values[0], np.arange(10))
+        assert values[1] is None
+        await astore.close()
+
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(main())
+    loop.close()
+
+
+def test_shm_consumers(shm_store):
+    frame = np.random.rand(200, 256)
+    obj_id = shm_store.put(frame, "frame", consumers=1)
+    shm_store.put(frame)
+
+    # not evicted until released by its consumer
+    assert shm_store.put(frame) is None
+    shm_store.release(obj_id)
+    assert shm_store.put(frame) is not None
+
+
+def test_shm_delete_and_stats(shm_store):
+    ids = shm_store.put_many([1, 2, 3])
+    res = shm_store.getID(shm_store.put(np.ones((256, 256))))
+    assert shm_store.stats()["objects"] == 4
+    assert shm_store.stats()["pinned"] == 1
+
+    assert shm_store.delete(ids[:2]) == 2
+    assert shm_store.delete(4) == 0  # in use
+    assert shm_store.stats()["objects"] == 2
+    assert res.sum() == 256 * 256
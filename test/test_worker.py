@@ -0,0 +1,106 @@
+import pickle
+import threading
+
+import pytest
+import zmq
+
+from improv.actor import Signal
+from improv.worker import RemoteActor, Worker, request
+
+
+@pytest.fixture
+def nexus_socket(unused_tcp_port):
+    """REP socket standing in for Nexus's control port"""
+    ctx = zmq.Context.instance()
+    socket = ctx.socket(zmq.REP)
+    socket.bind("tcp://127.0.0.1:{}".format(unused_tcp_port))
+    yield socket, "127.0.0.1:{}".format(unused_tcp_port)
+    socket.close(linger=0)
+
+
+@pytest.fixture
+def registered_worker(nexus_socket):
+    socket, address = nexus_socket
+    worker = Worker("worker1", address, token="secret")
+    thread = threading.Thread(target=worker.run, kwargs={"timeout": 5})
+    thread.start()
+
+    assert socket.poll(5000)
+    command, name, worker_address, token = socket.recv_multipart()
+    socket.send_string("Registered")
+
+    assert command.decode() == Signal.register()
+    assert name == b"worker1"
+    assert token == b"secret"
+    yield worker, worker_address.decode()
+
+    if thread.is_alive():
+        request(worker_address.decode(), [Signal.quit().encode(), token], timeout=5)
+    thread.join(5)
+
+
+def test_register_and_quit(registered_worker):
+    worker, address = registered_worker
+
+    assert address == worker.address
+    assert address.startswith("tcp://127.0.0.1:")
+    quit = [Signal.quit().encode(), b"secret"]
+    assert request(address, quit, timeout=5) == [b"quit"]
+
+
+def test_start_error(registered_worker):
+    worker, address = registered_worker
+    actor = RemoteActor("Missing", "no_such_package", "Actor", "worker1")
+    spec = pickle.dumps(actor.spec())
+
+    reply = request(address, [b"start", b"secret", spec], timeout=5)
+
+    assert reply[0] == b"error"
+    assert worker.processes == {}
+
+
+@pytest.mark.parametrize("token", [b"", b"wrong"])
+def test_refuses_bad_token(registered_worker, token):
+    worker, address = registered_worker
+    spec = pickle.dumps(
+        RemoteActor("Generator", "actors.sample_generator", "Generator", "w1").spec()
+    )
+
+    reply = request(address, [b"start", token, spec], timeout=5)
+    assert reply == [b"error", b"unauthorized"]
+    reply = request(address, [Signal.quit().encode(), token], timeout=5)
+    assert reply == [b"error", b"unauthorized"]
+    assert worker.processes == {}
+
+
+def test_network_worker_needs_token():
+    with pytest.raises(ValueError, match="needs a token"):
+        Worker("worker1", "10.0.0.1:6000", hostname="10.0.0.2")
+
+
+def test_refused_registration(nexus_socket):
+    socket, address = nexus_socket
+    worker = Worker("worker1", address)
+    errors = []
+
+    def run():
+        try:
+            worker.run(timeout=5)
+        except PermissionError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert socket.poll(5000)
+    socket.recv_multipart()
+    socket.send_string("Refused: unknown worker")
+    thread.join(5)
+
+    assert len(errors) == 1
+    assert "unknown worker" in str(errors[0])
+
+
+def test_remote_actor_does_not_run():
+    actor = RemoteActor("Generator", "actors.sample_generator", "Generator", "w1")
+    with pytest.raises(NotImplementedError, match="runs on worker w1"):
+        actor.run()